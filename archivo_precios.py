@@ -0,0 +1,205 @@
+# archivo_precios.py
+# Archivo Parquet de las listas de precios que envía Intcomex.
+# Cada CSV de categoría que se parsea con éxito queda copiado (sólo las columnas que usa la
+# ingesta; precio como float y stock como entero, ya parseados por ingesta_csv, y el resto como
+# texto) en data_activa/archivo_precios/AAAA-MM-DD/HHMMSS_<categoria>.parquet, particionado por
+# fecha de la corrida. Un CSV con el mismo contenido que uno ya archivado de la categoría no se
+# vuelve a archivar, y los días más antiguos que ARCHIVO_RETENCION_DIAS se eliminan.
+# Sirve de registro de auditoría de lo que llegó en cada corrida y para re-ingestar sin volver a
+# leer el TSV UTF-16: la lectura es columnar, con memory-map y sin detectar codificación ni saltar el preámbulo.
+# pyarrow es opcional: sin él no se archiva y el modo local sigue leyendo los CSV de downloads/.
+
+import os
+import re
+import json
+import shutil
+from datetime import datetime, timedelta
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Opcional: sin pyarrow no se archiva y se re-ingestan los CSV
+    pa = pq = None
+
+from state_store import DATA_PATH
+
+ARCHIVO_DIR = os.path.join(DATA_PATH, "archivo_precios")
+ARCHIVAR_CSV = os.getenv("ARCHIVAR_CSV", "true").lower() == "true"
+# Días de archivo que se conservan (0 = sin límite)
+ARCHIVO_RETENCION_DIAS = int(os.getenv("ARCHIVO_RETENCION_DIAS", "180"))
+EXTENSION = ".parquet"
+_FORMATO_DIA = "%Y-%m-%d"
+# Clave de los metadatos del archivo (categoría, CSV de origen, hash, fecha de la corrida)
+_CLAVE_METADATOS = b"intcomex"
+
+
+def _slug(categoria):
+    return re.sub(r"[^\w]+", "_", str(categoria or "sin_categoria").lower()).strip("_") or "sin_categoria"
+
+
+def disponible():
+    """True si se puede archivar (pyarrow instalado y ARCHIVAR_CSV activo)."""
+    return ARCHIVAR_CSV and pq is not None
+
+
+def es_archivo(path):
+    """True si la ruta es un archivo Parquet del archivo (y no un CSV)."""
+    return str(path).endswith(EXTENSION)
+
+
+def ruta_archivo(categoria, momento=None):
+    """Ruta nueva (que no pisa otra corrida) para el archivo de la categoría."""
+    momento = momento or datetime.now()
+    directorio = os.path.join(ARCHIVO_DIR, momento.strftime(_FORMATO_DIA))
+    base = f"{momento.strftime('%H%M%S')}_{_slug(categoria)}"
+    path = os.path.join(directorio, base + EXTENSION)
+    sufijo = 1
+    while os.path.exists(path):
+        path = os.path.join(directorio, f"{base}_{sufijo}{EXTENSION}")
+        sufijo += 1
+    return path
+
+
+class EscritorArchivo:
+    """
+    Escribe el Parquet de una categoría bloque a bloque, a la par de la lectura del CSV
+    (en memoria queda sólo el bloque actual). El archivo aparece recién con confirmar();
+    descartar() borra lo escrito si el CSV no se pudo procesar.
+    El tipo de cada columna sale del dtype del primer bloque: float64 y enteros se guardan
+    como tales (ingesta_csv entrega precio y stock ya parseados), lo demás como texto.
+    """
+
+    def __init__(self, categoria, origen, hash_origen=None, momento=None):
+        if pq is None:
+            raise RuntimeError("el paquete 'pyarrow' no está instalado")
+        self.momento = momento or datetime.now()
+        self.path = ruta_archivo(categoria, self.momento)
+        self.tmp_path = self.path + ".tmp"
+        self.metadatos = {
+            "categoria": categoria,
+            "origen": os.path.basename(origen),
+            "hash_origen": hash_origen,
+            "ts": self.momento.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self.esquema = None
+        self.escritor = None
+        self.filas = 0
+
+    def escribir(self, bloque):
+        if self.escritor is None:
+            tipos = {"f": pa.float64(), "i": pa.int64(), "u": pa.int64()}
+            self.esquema = pa.schema([(str(col), tipos.get(bloque[col].dtype.kind, pa.string()))
+                                      for col in bloque.columns]).with_metadata(
+                {_CLAVE_METADATOS: json.dumps(self.metadatos, ensure_ascii=False).encode('utf-8')})
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.escritor = pq.ParquetWriter(self.tmp_path, self.esquema, compression="zstd")
+        textos = [campo.name for campo in self.esquema if campo.type == pa.string()]
+        bloque = bloque.astype({col: object for col in textos})
+        tabla = pa.Table.from_pandas(bloque, schema=self.esquema, preserve_index=False)
+        self.escritor.write_table(tabla)
+        self.filas += len(bloque)
+
+    def confirmar(self):
+        """Cierra y publica el archivo. Devuelve su ruta (None si no se escribió ningún bloque)."""
+        if self.escritor is None:
+            return None
+        self.escritor.close()
+        self.escritor = None
+        os.replace(self.tmp_path, self.path)
+        purgar(self.momento)
+        return self.path
+
+    def descartar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+            self.escritor = None
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def metadatos(path):
+    """Metadatos de un archivo: {"categoria", "origen", "hash_origen", "ts"}."""
+    if pq is None:
+        raise RuntimeError("el paquete 'pyarrow' no está instalado")
+    crudos = pq.read_schema(path, memory_map=True).metadata or {}
+    return json.loads(crudos.get(_CLAVE_METADATOS, b"{}").decode('utf-8'))
+
+
+def leer_archivo_por_bloques(path, filas_por_bloque):
+    """
+    Los bloques del archivo como DataFrames (mismas columnas que leer_csv_por_bloques), con precio
+    (float64) y stock (int64) ya parseados.
+    """
+    if pq is None:
+        raise RuntimeError(f"el paquete 'pyarrow' no está instalado, no se puede leer {path}")
+    archivo = pq.ParquetFile(path, memory_map=True)
+    for lote in archivo.iter_batches(batch_size=filas_por_bloque):
+        bloque = lote.to_pandas()
+        if not bloque.empty:
+            yield bloque
+
+
+def listar_archivos(categoria=None):
+    """Archivos existentes (de la categoría, si se indica), en orden cronológico."""
+    if not os.path.isdir(ARCHIVO_DIR):
+        return []
+    patron = re.compile(rf"^\d{{6}}_{re.escape(_slug(categoria))}(_\d+)?{re.escape(EXTENSION)}$") if categoria else None
+    archivos = []
+    for dia in sorted(os.listdir(ARCHIVO_DIR)):
+        directorio = os.path.join(ARCHIVO_DIR, dia)
+        if not os.path.isdir(directorio):
+            continue
+        for nombre in sorted(os.listdir(directorio), key=lambda n: (n[:6], len(n), n)):
+            if nombre.endswith(EXTENSION) and (patron is None or patron.match(nombre)):
+                archivos.append(os.path.join(directorio, nombre))
+    return archivos
+
+
+def ya_archivado(categoria, hash_origen):
+    """Archivo de la categoría con el mismo hash de origen (el más reciente), o None."""
+    if pq is None or not hash_origen:
+        return None
+    for path in reversed(listar_archivos(categoria)):
+        try:
+            if metadatos(path).get("hash_origen") == hash_origen:
+                return path
+        except Exception:
+            continue
+    return None
+
+
+def purgar(hasta=None, retencion_dias=None):
+    """Elimina los días de archivo anteriores a la retención. Devuelve cuántos días se borraron."""
+    retencion_dias = ARCHIVO_RETENCION_DIAS if retencion_dias is None else retencion_dias
+    if retencion_dias <= 0 or not os.path.isdir(ARCHIVO_DIR):
+        return 0
+    limite = (hasta or datetime.now()).date() - timedelta(days=retencion_dias)
+    borrados = 0
+    for nombre in os.listdir(ARCHIVO_DIR):
+        try:
+            dia = datetime.strptime(nombre, _FORMATO_DIA).date()
+        except ValueError:
+            continue
+        if dia < limite:
+            shutil.rmtree(os.path.join(ARCHIVO_DIR, nombre), ignore_errors=True)
+            borrados += 1
+    return borrados
+
+
+def ultimo_archivo(categoria):
+    """El archivo más reciente de la categoría, o None (también si sin pyarrow no se podría leer)."""
+    if pq is None:
+        return None
+    archivos = listar_archivos(categoria)
+    return archivos[-1] if archivos else None
+
+
+if __name__ == "__main__":
+    import sys
+    if pq is None:
+        print("❌ pyarrow no está instalado: no hay archivo Parquet.")
+        sys.exit(1)
+    for path in listar_archivos(sys.argv[1] if len(sys.argv) > 1 else None):
+        meta = metadatos(path)
+        filas = pq.ParquetFile(path, memory_map=True).metadata.num_rows
+        print(f"{meta.get('ts')} | {meta.get('categoria')} | {filas:,} filas | {meta.get('origen')} | {path}")
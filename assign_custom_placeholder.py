@@ -1,9 +1,8 @@
-import os
-import json
 import time
 import requests
 from woocommerce import API
 from requests.auth import HTTPBasicAuth
+from state_store import load_state, update_fields, query_skus, publish_index_counts
 
 # --- Configuración y Carga de Credenciales ---
 try:
@@ -18,9 +17,6 @@ except ImportError:
     print("ERROR: No se encontró credentials.py")
     exit(1)
 
-DATA_PATH = "data_activa"
-STATE_FILE = os.path.join(DATA_PATH, "estado_productos.json")
-
 # URL entregada por el usuario
 CUSTOM_PLACEHOLDER_URL = "https://tupartnerti.cl/tienda/wp-content/uploads/2026/03/Flow_6f1163a766.jpeg"
 
@@ -32,16 +28,6 @@ wcapi = API(
     timeout=60
 )
 
-def load_json(filepath):
-    if os.path.exists(filepath):
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
-
-def save_json(filepath, data):
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
-
 def get_placeholder_media_id():
     """Obtiene el ID del medio en WordPress o lo sube si no existe / no se encuentra."""
     print(" Buscando Media ID para el placeholder personalizado...")
@@ -67,18 +53,14 @@ def assign_custom_placeholders():
     print("🎨 ASIGNANDO PLACEHOLDER PERSONALIZADO A PRODUCTOS SIN IMAGEN")
     print("="*60)
     
-    state = load_json(STATE_FILE)
+    state = load_state()
     if not state:
         print("✗ No se encontraron datos de estado.")
         return
         
     # Identificamos productos activos que no tienen imagen local 
     # y que NO se les ha asignado aún el placeholder personalizado.
-    skus_to_update = []
-    for sku, data in state.items():
-        if data.get("stock", 0) > 0 and not data.get("tiene_imagen", False):
-            if not data.get("placeholder_personalizado", False):
-                skus_to_update.append(sku)
+    skus_to_update = query_skus("sin_placeholder")
                 
     if not skus_to_update:
         print("✅ No hay productos pendientes de asignar placeholder.")
@@ -104,10 +86,9 @@ def assign_custom_placeholders():
                 
                 if update_res.status_code == 200:
                     print("    [✓] Placeholder asignado en WooCommerce.")
-                    state[sku]["placeholder_personalizado"] = True
                     # Set subido_a_woo to True to avoid image_uploader trying to override this
-                    state[sku]["subido_a_woo"] = True 
-                    save_json(STATE_FILE, state)
+                    cambios = {"placeholder_personalizado": True, "subido_a_woo": True}
+                    update_fields(sku, cambios)
                     success_count += 1
                 else:
                     print(f"    [✗] Error WooCommerce {update_res.status_code}: {update_res.text[:100]}")
@@ -118,6 +99,7 @@ def assign_custom_placeholders():
             
         time.sleep(1)
         
+    publish_index_counts()
     print(f"\\n✅ Proceso completado. Asignados {success_count} de {len(skus_to_update)} productos.")
         
 if __name__ == "__main__":
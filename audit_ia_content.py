@@ -1,6 +1,5 @@
-import os
-import json
 from woocommerce import API
+from state_store import load_state, save_state
 
 try:
     from credentials import WC_URL, WC_CONSUMER_KEY, WC_CONSUMER_SECRET
@@ -8,9 +7,6 @@ except ImportError:
     print("Error cargando credenciales.")
     exit(1)
 
-DATA_PATH = "data_activa"
-STATE_FILE = os.path.join(DATA_PATH, "estado_productos.json")
-
 wcapi = API(
     url=WC_URL,
     consumer_key=WC_CONSUMER_KEY,
@@ -33,13 +29,11 @@ def looks_like_ai_content(html):
 
 def audit_descriptions():
     print("🔍 Iniciando auditoría real de descripciones en WooCommerce...")
-    if not os.path.exists(STATE_FILE):
+    state = load_state()
+    if not state:
         print("Error: No existe el archivo de estado local.")
         return
 
-    with open(STATE_FILE, 'r', encoding='utf-8') as f:
-        state = json.load(f)
-
     subidos = [sku for sku, data in state.items() if data.get("subido_a_woo")]
     print(f"Productos a auditar: {len(subidos)}")
 
@@ -65,8 +59,7 @@ def audit_descriptions():
             print(f"Error auditando {sku}: {e}")
             continue
 
-    with open(STATE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(state, f, indent=4, ensure_ascii=False)
+    save_state(state)
     
     print("\n" + "="*50)
     print("✅ AUDITORÍA FINALIZADA")
@@ -0,0 +1,92 @@
+# benchmark_estado.py
+# Mide tiempo de guardado/carga y tamaño en disco del snapshot de estado
+# en formato JSON (indent=4) y compacto, con catálogos sintéticos.
+#
+# Uso: python benchmark_estado.py [cantidad_skus ...]   (por defecto 10000 50000 200000)
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+from datetime import datetime
+
+from state_store import JsonStateBackend, msgpack
+
+CATEGORIAS = ["Notebooks", "Monitores", "Impresoras", "Almacenamiento", "Redes", "Accesorios", "Componentes"]
+TAMANOS_DEFECTO = [10_000, 50_000, 200_000]
+
+
+def generar_estado(cantidad, semilla=42):
+    """Catálogo sintético con la misma forma que los registros que crea sync_bot.sincronizar_csv."""
+    rnd = random.Random(semilla)
+    ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    state = {}
+    for i in range(cantidad):
+        sku = f"SKU{i:07d}"
+        costo = rnd.randint(5_000, 2_000_000)
+        data = {
+            "tiene_imagen": rnd.random() < 0.8,
+            "subido_a_woo": rnd.random() < 0.7,
+            "ia_mejorado": rnd.random() < 0.4,
+            "ia_intentos": rnd.randint(0, 3),
+            "sku": sku,
+            "nombre": f"Producto sintético {i} {rnd.choice(CATEGORIAS)} modelo {rnd.randint(100, 999)}",
+            "cost_price": costo,
+            "sale_price": int(costo * 1.25),
+            "stock": rnd.randint(0, 500),
+            "categoria_principal": rnd.choice(CATEGORIAS),
+            "categoria_csv": rnd.choice(CATEGORIAS),
+            "subcategoria_csv": f"Sub {rnd.randint(1, 40)}",
+            "last_updated": ahora,
+            "pendiente_sync_woo": rnd.random() < 0.3,
+            "en_csv_reciente": True,
+        }
+        if data["tiene_imagen"]:
+            data["imagenes_locales"] = [f"product_images/{sku}_001.jpg"]
+        state[sku] = data
+    return state
+
+
+def medir(state, formato, directorio):
+    path = os.path.join(directorio, f"estado_{formato}.json")
+    backend = JsonStateBackend(path=path, journal_path=path + ".journal.jsonl", formato=formato)
+
+    inicio = time.perf_counter()
+    backend.save(state)
+    t_guardar = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    cargado = backend.load()
+    t_cargar = time.perf_counter() - inicio
+
+    if cargado != state:
+        raise AssertionError(f"El formato '{formato}' no reproduce el estado original")
+
+    archivo = backend.compacto_path if formato == "compacto" else backend.path
+    return t_guardar, t_cargar, os.path.getsize(archivo)
+
+
+def main():
+    tamanos = [int(x) for x in sys.argv[1:]] or TAMANOS_DEFECTO
+    print("=" * 72)
+    print(f"📊 BENCHMARK SNAPSHOT DE ESTADO (códec compacto: {'msgpack' if msgpack else 'JSON minificado'})")
+    print("=" * 72)
+    print(f"{'SKUs':>8} | {'formato':<9} | {'guardar (s)':>11} | {'cargar (s)':>10} | {'tamaño (MB)':>11}")
+    print("-" * 72)
+
+    directorio = tempfile.mkdtemp(prefix="bench_estado_")
+    try:
+        for cantidad in tamanos:
+            state = generar_estado(cantidad)
+            for formato in ("json", "compacto"):
+                t_guardar, t_cargar, tamano = medir(state, formato, directorio)
+                print(f"{cantidad:>8} | {formato:<9} | {t_guardar:>11.3f} | {t_cargar:>10.3f} | {tamano / 1024 / 1024:>11.2f}")
+            print("-" * 72)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
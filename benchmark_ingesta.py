@@ -0,0 +1,62 @@
+# benchmark_ingesta.py
+# Compara la normalización fila a fila (df.iterrows) con la vectorizada de ingesta_csv
+# sobre CSVs sintéticos con el formato de Intcomex (generador_csv.py), y verifica que ambas
+# den el mismo resultado.
+#
+# Uso: python benchmark_ingesta.py [cantidad_filas ...]   (por defecto 50000)
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import contextlib
+
+from generador_csv import generar_csv
+from ingesta_csv import leer_csv_intcomex, mapear_columnas, normalizar_filas, normalizar_vectorizado
+
+TAMANOS_DEFECTO = [50_000]
+VALOR_DOLAR = 950.5
+MARGEN = 0.20
+KEYWORDS = ["notebook", "portátil"]
+
+
+def medir(df, columnas, normalizador):
+    inicio = time.perf_counter()
+    # Las advertencias de precios inválidos se imprimen por fila: no cuentan para la medición
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        resultado = normalizador(df, columnas, KEYWORDS, VALOR_DOLAR, MARGEN)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    tamanos = [int(x) for x in sys.argv[1:]] or TAMANOS_DEFECTO
+    print("=" * 72)
+    print("📊 BENCHMARK INGESTA CSV (fila a fila vs vectorizada)")
+    print("=" * 72)
+    print(f"{'filas':>8} | {'ruta':<12} | {'tiempo (s)':>10} | {'filas/s':>12} | {'aceptadas':>9}")
+    print("-" * 72)
+
+    directorio = tempfile.mkdtemp(prefix="bench_ingesta_")
+    try:
+        for cantidad in tamanos:
+            path = os.path.join(directorio, f"categoria_{cantidad}.csv")
+            generar_csv(path, cantidad)
+            df = leer_csv_intcomex(path)
+            columnas = mapear_columnas(df.columns)
+
+            referencia, t_filas = medir(df, columnas, normalizar_filas)
+            vectorizado, t_vector = medir(df, columnas, normalizar_vectorizado)
+            if referencia != vectorizado:
+                raise AssertionError("La ruta vectorizada no reproduce el resultado fila a fila")
+
+            for ruta, tiempo in (("filas", t_filas), ("vectorizada", t_vector)):
+                print(f"{len(df):>8} | {ruta:<12} | {tiempo:>10.3f} | {len(df) / tiempo:>12,.0f} | {len(referencia[0]['sku']):>9}")
+            print(f"{'':>8} | ✓ resultados idénticos, {t_filas / t_vector:.1f}x más rápido")
+            print("-" * 72)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmark_navegacion.py
+# Compara el tiempo de carga de las páginas de categoría de Intcomex con el perfil completo de
+# Chrome y con el perfil rápido (perfil_rapido.py): para cada perfil abre un navegador, inicia
+# sesión (reutiliza la guardada si sigue válida), y mide driver.get() + close_banners() sobre las
+# primeras categorías de config.py. Necesita Selenium, Chrome y las credenciales de config.py.
+#
+# Uso: python benchmark_navegacion.py [cantidad_categorias]
+
+import sys
+import time
+
+from sync_bot import URLS, USERNAME, PASSWORD, crear_driver, iniciar_sesion_intcomex, close_banners
+
+CATEGORIAS_DEFECTO = 5
+PERFILES = (("completo", False), ("rápido", True))
+
+
+def medir_perfil(rapido, urls):
+    """{categoria: segundos} de carga de cada página con el perfil indicado (None si falla el login)."""
+    driver = crear_driver(rapido)
+    try:
+        if not iniciar_sesion_intcomex(driver, USERNAME, PASSWORD):
+            return None
+        tiempos = {}
+        for categoria, url in urls.items():
+            inicio = time.perf_counter()
+            try:
+                driver.get(url)
+                close_banners(driver)
+                tiempos[categoria] = time.perf_counter() - inicio
+            except Exception as e:
+                print(f"  ⚠ {categoria}: {e}")
+        return tiempos
+    finally:
+        driver.quit()
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else CATEGORIAS_DEFECTO
+    urls = dict(list(URLS.items())[:cantidad])
+
+    resultados = {}
+    for nombre, rapido in PERFILES:
+        print(f"🧭 Perfil {nombre}...")
+        tiempos = medir_perfil(rapido, urls)
+        if tiempos is None:
+            print("✗ No se pudo iniciar sesión, se cancela el benchmark.")
+            return 1
+        resultados[nombre] = tiempos
+
+    print("=" * 70)
+    print("📊 BENCHMARK NAVEGACIÓN: PERFIL COMPLETO vs RÁPIDO")
+    print("=" * 70)
+    print(f"{'categoría':<30} | {'completo':>9} | {'rápido':>9} | {'mejora':>7}")
+    print("-" * 70)
+    for categoria in urls:
+        completo, rapido = resultados["completo"].get(categoria), resultados["rápido"].get(categoria)
+        if completo is None or rapido is None:
+            print(f"{categoria[:30]:<30} | {'n/d':>9} | {'n/d':>9} | {'':>7}")
+            continue
+        print(f"{categoria[:30]:<30} | {completo:>8.2f}s | {rapido:>8.2f}s | {completo / rapido:>6.1f}x")
+    print("-" * 70)
+    total_completo = sum(resultados["completo"].values())
+    total_rapido = sum(resultados["rápido"].values())
+    if total_rapido:
+        print(f"{'TOTAL':<30} | {total_completo:>8.2f}s | {total_rapido:>8.2f}s | {total_completo / total_rapido:>6.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# benchmark_parsers.py
+# Micro-benchmark de los parsers de precio y stock de ingesta_csv: escalar sin memo, escalar con
+# memo (LRU por texto) y vectorizado (parse_prices / parse_stock), sobre celdas que repiten unos
+# pocos miles de valores distintos, como los CSV de Intcomex entre categorías y corridas.
+#
+# Uso: python benchmark_parsers.py [cantidad_celdas] [valores_distintos]   (por defecto 200000 3000)
+
+import os
+import sys
+import time
+import random
+import contextlib
+
+import pandas as pd
+
+import ingesta_csv
+from ingesta_csv import clean_price_to_float, extract_stock_number, parse_prices, parse_stock
+
+
+def generar_celdas(cantidad, distintos, semilla=11):
+    rnd = random.Random(semilla)
+    precios, stocks = [], []
+    for _ in range(distintos):
+        valor = rnd.uniform(5, 3000)
+        precios.append(rnd.choice([
+            f"{valor:.2f}".replace(".", ","),
+            f"$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
+            f"USD {valor:.2f}",
+        ]))
+        stocks.append(rnd.choice([f"Más de {rnd.randint(5, 50)}", f"Disponible: {rnd.randint(1, 999)} unidades",
+                                  str(rnd.randint(0, 500)), "Disponible", "Agotado"]))
+    return [rnd.choice(precios) for _ in range(cantidad)], [rnd.choice(stocks) for _ in range(cantidad)]
+
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        resultado = funcion()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    distintos = int(sys.argv[2]) if len(sys.argv) > 2 else 3_000
+    precios, stocks = generar_celdas(cantidad, distintos)
+    serie_precios, serie_stocks = pd.Series(precios), pd.Series(stocks)
+
+    print("=" * 72)
+    print(f"📊 BENCHMARK PARSERS ({cantidad:,} celdas, {distintos:,} valores distintos)")
+    print("=" * 72)
+    print(f"{'parser':<8} | {'método':<22} | {'tiempo (s)':>10} | {'celdas/s':>12}")
+    print("-" * 72)
+
+    casos = [
+        ("precio", precios, serie_precios, ingesta_csv._precio_desde_texto, clean_price_to_float,
+         ingesta_csv._precio_texto, lambda s: parse_prices(s).tolist()),
+        ("stock", stocks, serie_stocks, ingesta_csv._stock_desde_texto, extract_stock_number,
+         ingesta_csv._stock_texto, lambda s: parse_stock(s).tolist()),
+    ]
+    for nombre, celdas, serie, sin_memo, escalar, memo, vectorizado in casos:
+        base, t_base = medir(lambda: [sin_memo(v) for v in celdas])
+        memo.cache_clear()
+        frio, t_frio = medir(lambda: [escalar(v) for v in celdas])
+        tibio, t_tibio = medir(lambda: [escalar(v) for v in celdas])
+        vector, t_vector = medir(lambda: vectorizado(serie))
+        if not (base == frio == tibio == vector):
+            raise AssertionError(f"Los parsers de {nombre} no coinciden")
+        for metodo, tiempo in (("sin memo", t_base), ("memo (primera pasada)", t_frio),
+                               ("memo (caché caliente)", t_tibio), ("vectorizado", t_vector)):
+            print(f"{nombre:<8} | {metodo:<22} | {tiempo:>10.3f} | {cantidad / tiempo:>12,.0f}")
+        print("-" * 72)
+    print("✓ resultados idénticos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# benchmark_sincronizacion.py
+# Mide la ingesta completa de un CSV de categoría, con los mismos pasos que sync_bot.sincronizar_csv
+# (cargar la categoría, leer y normalizar el CSV, fusionar en el estado, guardar el estado y la
+# serie de precios), sobre listas sintéticas de generador_csv.py y sin Selenium ni credenciales.
+# Cada tamaño corre en un proceso nuevo, en un directorio temporal, para que el RSS pico sea el
+# de esa ingesta. Se mide una corrida inicial (todos los SKUs nuevos) y una repetida con el 5% de
+# precios/stock cambiados, como la lista del día siguiente.
+#
+# Umbral de regresión: --guardar-base guarda los resultados como referencia y las corridas
+# siguientes se comparan contra ella (filas/s, RSS pico y tiempo de guardado, con --tolerancia);
+# --min-filas-s exige un mínimo absoluto. Si algo empeora, sale con código 1 (para correr antes
+# de desplegar).
+#
+# Uso: python benchmark_sincronizacion.py [cantidad_filas ...] [--backend json|sqlite|particionado]
+#          [--guardar-base | --comparar RUTA] [--tolerancia 0.25] [--min-filas-s N]
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows: sin RSS pico
+    resource = None
+
+TAMANOS_DEFECTO = [10_000, 50_000]
+BASE_DEFECTO = os.path.join("data_activa", "benchmark_sincronizacion.json")
+CATEGORIA = "Notebooks"
+KEYWORDS = ["Notebook", "Portátiles", "Laptops"]
+VALOR_DOLAR = 950.5
+MARGEN = 0.20
+CORRIDAS = (("inicial", 0.0), ("repetida", 0.05))
+# Diferencias menores a esto no cuentan como regresión (ruido de disco/planificador)
+HOLGURA_SEGUNDOS = 0.05
+HOLGURA_MB = 10
+
+
+def rss_pico_mb():
+    """RSS máximo del proceso hasta ahora, en MB (None si la plataforma no lo informa)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo informa en KB, macOS en bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def _medir_tamano(cantidad, backend, directorio):
+    """Corre en un proceso propio: genera el CSV, lo ingesta dos veces y devuelve las métricas."""
+    os.chdir(directorio)
+    os.environ["STATE_BACKEND"] = backend
+    # Importados acá: cada proceso arranca con el backend y el directorio de datos del benchmark
+    from generador_csv import generar_csv
+    from ingesta_csv import normalizar_csv, fusionar_en_estado
+    from series_precios import registrar_corrida
+    from state_store import load_category, save_state
+
+    rss_base = rss_pico_mb()
+    path = os.path.join(directorio, f"{CATEGORIA}.csv")
+    resultados = {}
+    for corrida, variacion in CORRIDAS:
+        generar_csv(path, cantidad, variacion=variacion)
+        stats = {"procesados": 0, "creados": 0, "actualizados": 0, "cambios_woo": 0, "filtrados": 0, "errores": 0}
+        tiempos = {}
+        # Las advertencias por fila de la ingesta no cuentan para la medición
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            inicio = time.perf_counter()
+            state = load_category(CATEGORIA)
+            tiempos["carga"] = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            filas, conteo, filas_leidas = normalizar_csv(path, KEYWORDS, VALOR_DOLAR, MARGEN, categoria=CATEGORIA)
+            tiempos["parseo"] = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            presentes = set(filas["sku"])
+            for sku, data in state.items():
+                if sku not in presentes and data.en_csv_reciente:
+                    data.en_csv_reciente = False
+            fusionar_en_estado(state, filas, CATEGORIA, stats)
+            tiempos["fusion"] = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            save_state(state)
+            tiempos["guardado"] = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            registrar_corrida(CATEGORIA, filas["sku"], filas["cost_price"], filas["sale_price"], filas["stock"])
+            tiempos["serie"] = time.perf_counter() - inicio
+
+        total = sum(tiempos.values())
+        resultados[corrida] = {
+            "filas": filas_leidas,
+            "aceptadas": len(filas["sku"]),
+            "cambios_woo": stats["cambios_woo"],
+            "filas_s": filas_leidas / total if total else 0.0,
+            "rss_mb": rss_pico_mb(),
+            "rss_base_mb": rss_base,
+            **{f"{paso}_s": t for paso, t in tiempos.items()},
+            "total_s": total,
+        }
+    return resultados
+
+
+def medir(cantidad, backend):
+    directorio = tempfile.mkdtemp(prefix="bench_sync_")
+    try:
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+            return pool.submit(_medir_tamano, cantidad, backend, directorio).result()
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def _mb(valor):
+    return f"{valor:>8.0f}" if valor is not None else f"{'n/d':>8}"
+
+
+def regresiones(resultados, base, tolerancia, min_filas_s=None):
+    """Lista de textos con lo que empeoró respecto de la base (y del mínimo absoluto de filas/s)."""
+    problemas = []
+    for cantidad, corridas in resultados.items():
+        for corrida, actual in corridas.items():
+            etiqueta = f"{cantidad} filas, {corrida}"
+            if min_filas_s and actual["filas_s"] < min_filas_s:
+                problemas.append(f"{etiqueta}: {actual['filas_s']:,.0f} filas/s < mínimo {min_filas_s:,.0f}")
+            previo = base.get(cantidad, {}).get(corrida)
+            if not previo:
+                continue
+            if actual["filas_s"] < previo["filas_s"] * (1 - tolerancia):
+                problemas.append(f"{etiqueta}: {actual['filas_s']:,.0f} filas/s (base {previo['filas_s']:,.0f})")
+            if actual["guardado_s"] > previo["guardado_s"] * (1 + tolerancia) + HOLGURA_SEGUNDOS:
+                problemas.append(f"{etiqueta}: guardado {actual['guardado_s']:.3f}s (base {previo['guardado_s']:.3f}s)")
+            if actual.get("rss_mb") and previo.get("rss_mb") and actual["rss_mb"] > previo["rss_mb"] * (1 + tolerancia) + HOLGURA_MB:
+                problemas.append(f"{etiqueta}: RSS pico {actual['rss_mb']:.0f} MB (base {previo['rss_mb']:.0f} MB)")
+    return problemas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la ingesta de CSV (sincronizar_csv) con listas sintéticas.")
+    parser.add_argument("tamanos", nargs="*", type=int, help="cantidades de filas (por defecto 10000 50000)")
+    parser.add_argument("--backend", default=os.getenv("STATE_BACKEND", "json"), help="STATE_BACKEND a medir")
+    parser.add_argument("--comparar", default=BASE_DEFECTO, help="resultados de referencia (JSON)")
+    parser.add_argument("--guardar-base", action="store_true", help="guardar estos resultados como referencia")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="empeoramiento admitido (0.25 = 25%%)")
+    parser.add_argument("--min-filas-s", type=float, default=None, help="mínimo absoluto de filas/s")
+    args = parser.parse_args()
+    tamanos = args.tamanos or TAMANOS_DEFECTO
+
+    print("=" * 105)
+    print(f"📊 BENCHMARK SINCRONIZACIÓN CSV -> ESTADO (backend {args.backend})")
+    print("=" * 105)
+    print(f"{'filas':>8} | {'corrida':<8} | {'carga':>6} | {'parseo':>7} | {'fusión':>7} | {'guardado':>8} | {'serie':>6} | "
+          f"{'total':>7} | {'filas/s':>10} | {'RSS pico':>8} | {'cambios':>7}")
+    print("-" * 105)
+
+    resultados = {}
+    for cantidad in tamanos:
+        corridas = medir(cantidad, args.backend)
+        resultados[str(cantidad)] = corridas
+        for corrida, r in corridas.items():
+            print(f"{cantidad:>8} | {corrida:<8} | {r['carga_s']:>6.3f} | {r['parseo_s']:>7.3f} | {r['fusion_s']:>7.3f} | {r['guardado_s']:>8.3f} | "
+                  f"{r['serie_s']:>6.3f} | {r['total_s']:>7.3f} | {r['filas_s']:>10,.0f} | {_mb(r['rss_mb'])} | {r['cambios_woo']:>7}")
+        print(f"{'':>8} | RSS del proceso antes de la ingesta: {_mb(corridas['inicial']['rss_base_mb']).strip()} MB")
+        print("-" * 105)
+
+    if args.guardar_base:
+        os.makedirs(os.path.dirname(args.comparar) or ".", exist_ok=True)
+        with open(args.comparar, 'w', encoding='utf-8') as f:
+            json.dump({"backend": args.backend, "resultados": resultados}, f, indent=4)
+        print(f"✓ Resultados guardados como referencia en {args.comparar}")
+        return 0
+
+    base = {}
+    if os.path.exists(args.comparar):
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            guardada = json.load(f)
+        if guardada.get("backend") == args.backend:
+            base = guardada.get("resultados", {})
+        else:
+            print(f"⚠ La referencia {args.comparar} es del backend '{guardada.get('backend')}', no se compara.")
+    elif not args.min_filas_s:
+        print(f"⚠ Sin referencia en {args.comparar}: corre con --guardar-base para crearla.")
+        return 0
+
+    problemas = regresiones(resultados, base, args.tolerancia, args.min_filas_s)
+    if problemas:
+        print(f"❌ Regresión de rendimiento (tolerancia {args.tolerancia:.0%}):")
+        for problema in problemas:
+            print(f"  ✗ {problema}")
+        return 1
+    print(f"✓ Sin regresiones respecto de {args.comparar if base else 'los mínimos indicados'} (tolerancia {args.tolerancia:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+# benchmark_validador.py
+# Compara la validación de categoría por palabras clave del loop original
+# (any(kw.lower() in texto.lower() ...)) con validador_categorias: por fila (regex compilada)
+# y vectorizada (Series.str), verificando que las tres den el mismo resultado.
+#
+# Uso: python benchmark_validador.py [cantidad_textos]   (por defecto 200000)
+
+import sys
+import time
+import random
+
+import pandas as pd
+
+from validador_categorias import cargar_validacion, es_valida, mascara_valida
+
+CANTIDAD_DEFECTO = 200_000
+TEXTOS_BASE = ["Computadores Notebooks", "Computadores Portátiles Gamer", "Almacenamiento SSD NVMe M.2",
+               "Accesorios Mouse", "Impresoras Láser Monocromo", "Vigilancia Cámara IP Domo",
+               "Memoria RAM DDR4 SODIMM", "Monitores Gaming", "Proyectores Video Proyector", "Redes Switch"]
+
+
+def loop_original(textos, valid_keywords):
+    return [any(kw.lower() in texto.lower() for kw in valid_keywords) for texto in textos]
+
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else CANTIDAD_DEFECTO
+    validacion = cargar_validacion()
+    if not validacion:
+        print("❌ No hay CATEGORY_VALIDATION en config/categories.json")
+        return
+
+    rnd = random.Random(3)
+    textos = [f"{rnd.choice(TEXTOS_BASE)} {rnd.randint(1, 99)}" for _ in range(cantidad)]
+    serie = pd.Series(textos)
+
+    print("=" * 72)
+    print(f"📊 BENCHMARK VALIDADOR DE CATEGORÍAS ({cantidad:,} textos x {len(validacion)} categorías)")
+    print("=" * 72)
+    totales = {"loop": 0.0, "regex": 0.0, "vectorizado": 0.0}
+    for categoria, palabras in validacion.items():
+        esperado, t_loop = medir(lambda: loop_original(textos, palabras))
+        por_fila, t_regex = medir(lambda: [es_valida(texto, palabras) for texto in textos])
+        vectorizado, t_vector = medir(lambda: mascara_valida(serie, palabras).tolist())
+        if not (esperado == por_fila == vectorizado):
+            raise AssertionError(f"El validador compilado no reproduce el loop original en '{categoria}'")
+        totales["loop"] += t_loop
+        totales["regex"] += t_regex
+        totales["vectorizado"] += t_vector
+
+    print(f"{'método':<14} | {'tiempo total (s)':>16} | {'textos/s':>12}")
+    print("-" * 72)
+    for metodo, tiempo in totales.items():
+        print(f"{metodo:<14} | {tiempo:>16.3f} | {cantidad * len(validacion) / tiempo:>12,.0f}")
+    print("-" * 72)
+    print(f"✓ resultados idénticos en {len(validacion)} categorías")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,7 @@
-import json
-import os
+from state_store import load_state
 
-STATE_FILE = r"C:\Users\marco\Documents\GitHub\intcomex-bot\data_activa\estado_productos.json"
-if os.path.exists(STATE_FILE):
-    with open(STATE_FILE, 'r', encoding='utf-8') as f:
-        state = json.load(f)
-    
+state = load_state()
+if state:
     pending = [sku for sku, data in state.items() if not data.get("subido_a_woo")]
     print(f"Total Pendientes: {len(pending)}")
     for sku in pending[:5]:
@@ -2,6 +2,7 @@ import os
 import json
 import time
 from woocommerce import API
+from state_store import load_state, update_fields, publish_index_counts
 
 # --- Configuración y Carga de Credenciales ---
 try:
@@ -16,7 +17,6 @@ except ImportError:
 
 # URLs y Archivos
 DATA_PATH = "data_activa"
-STATE_FILE = os.path.join(DATA_PATH, "estado_productos.json")
 MAP_FILE = os.path.join(DATA_PATH, "mapa_imagenes.json")
 IMAGE_DIR = "product_images"
 
@@ -35,16 +35,12 @@ def load_json(filepath):
             return json.load(f)
     return {}
 
-def save_json(filepath, data):
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
-
 def clean_generic_images():
     print("="*60)
     print("🧹 LIMPIEZA DE IMÁGENES GENÉRICAS (NOIMAGE)")
     print("="*60)
     
-    state = load_json(STATE_FILE)
+    state = load_state()
     image_map = load_json(MAP_FILE)
     
     if not state or not image_map:
@@ -94,12 +90,10 @@ def clean_generic_images():
                                 print(f"    [!] No se pudo eliminar el archivo local: {e}")
                                 
                     # 3. Actualizar estado local
-                    state[sku]["tiene_imagen"] = False
-                    state[sku]["imagenes_locales"] = []
                     # Eliminamos para que no vuelva a intentar subir la imagen genérica
-                    
-                    # Guardamos progreso
-                    save_json(STATE_FILE, state)
+                    cambios = {"tiene_imagen": False, "imagenes_locales": []}
+                    # Guardamos progreso (sólo los campos de este SKU)
+                    update_fields(sku, cambios)
                     success_count += 1
                 else:
                     print(f"    [✗] Error WooCommerce al limpiar imagen: {update_res.status_code}")
@@ -110,6 +104,7 @@ def clean_generic_images():
             
         time.sleep(1) # Pequeña pausa para no saturar la API
         
+    publish_index_counts()
     print(f"\n✅ Proceso completado. Limpiados {success_count} de {len(skus_to_clean)} productos.")
         
 if __name__ == "__main__":
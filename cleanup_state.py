@@ -1,48 +1,31 @@
 import json
 import os
-import shutil
 from datetime import datetime
+from state_store import load_state, save_state
+from validador_categorias import cargar_validacion, es_valida
 
 # Configuración
 DATA_PATH = "data_activa"
-STATE_FILE = os.path.join(DATA_PATH, "estado_productos.json")
 BACKUP_FILE = os.path.join(DATA_PATH, f"estado_productos_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
 
-# Diccionario de validación (sincronizado con sync_bot.py)
-CATEGORY_VALIDATION = {
-    "Notebooks": ["Notebook", "Portátiles", "Laptops"],
-    "Monitores": ["Monitores", "Monitor", "Pantallas"],
-    "Monitores_TV": ["Televisores", "TV", "Monitores"],
-    "Desktop": ["Desktop", "Computadores", "CPU"],
-    "Tablets": ["Tablet", "Tabletas"],
-    "Impresoras_Inkjet": ["Inkjet", "Inyección"],
-    "Impresoras_Label": ["Label", "Etiquetas"],
-    "Impresoras_Laser": ["Laser", "Láser"],
-    "Impresoras_MFP": ["Multifuncionales", "Multifunción", "MFP"],
-    "Scanners": ["Scanner", "Escáner"],
-    "All_in_One": ["Todo-en-Uno", "All-in-One"]
-}
+# Palabras clave por categoría: las mismas de config/categories.json que usa la ingesta
+CATEGORY_VALIDATION = cargar_validacion()
 
 def cleanup():
     print("="*60)
     print("🧹 SCRIPT DE LIMPIEZA DE ESTADO: INTCOMEX BOT")
     print("="*60)
     
-    if not os.path.exists(STATE_FILE):
-        print(f"❌ No se encontró el archivo {STATE_FILE}")
+    # 1. Cargar estado
+    state = load_state()
+    if not state:
+        print("❌ No se encontró el estado de productos")
         return
 
-    # 1. Crear respaldo
+    # 2. Crear respaldo (independiente del backend de estado configurado)
     print(f"📦 Creando respaldo en: {BACKUP_FILE}")
-    shutil.copy2(STATE_FILE, BACKUP_FILE)
-
-    # 2. Cargar estado
-    try:
-        with open(STATE_FILE, 'r', encoding='utf-8') as f:
-            state = json.load(f)
-    except Exception as e:
-        print(f"❌ Error al cargar el JSON: {e}")
-        return
+    with open(BACKUP_FILE, 'w', encoding='utf-8') as f:
+        json.dump({sku: dict(data) for sku, data in state.items()}, f, indent=4, ensure_ascii=False)
 
     initial_count = len(state)
     print(f"🔍 Productos iniciales registrados: {initial_count}")
@@ -61,7 +44,7 @@ def cleanup():
         
         if valid_keywords:
             # Si la categoría tiene reglas de validación, aplicarlas
-            if not any(kw.lower() in full_csv_text for kw in valid_keywords):
+            if not es_valida(full_csv_text, valid_keywords):
                 if removed_count < 10: # Mostrar los primeros 10 para debug
                     print(f"  🗑️ Filtrando SKU {sku}: {data.get('nombre')[:40]}...")
                     print(f"      - Cat Principal: {main_cat}")
@@ -82,12 +65,8 @@ def cleanup():
     print(f"📊 Productos restantes: {len(cleaned_state)}")
     print("="*60)
 
-    try:
-        with open(STATE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cleaned_state, f, indent=4, ensure_ascii=False)
-        print(f"💾 Archivo {STATE_FILE} actualizado exitosamente.")
-    except Exception as e:
-        print(f"❌ Error al guardar el archivo: {e}")
+    save_state(cleaned_state)
+    print("💾 Estado de productos actualizado exitosamente.")
 
 if __name__ == "__main__":
     cleanup()
@@ -56,6 +56,7 @@ async function initDashboard() {
     const productsObj = await fetchData('../data_activa/estado_productos_dashboard.json') || {};
     allProducts = Object.values(productsObj);
     const allActivities = await fetchData('../data_activa/actividades.json') || [];
+    const indices = await fetchData('../data_activa/indices_estado.json');
 
     if (allStats.length > 0) {
         const latest = allStats[allStats.length - 1];
@@ -102,6 +103,8 @@ async function initDashboard() {
         updateBotStatus(latest);
     }
 
+    updatePendingCounts(indices);
+
     initActivities(allActivities);
     initNavigation();
     
@@ -120,6 +123,15 @@ function updateBotStatus(latest) {
     }
 }
 
+function updatePendingCounts(indices) {
+    // Conteos mantenidos por los índices del estado (data_activa/indices_estado.json)
+    const statusText = document.getElementById('bot-status-info');
+    if (!indices || !indices.conteos || !statusText) return;
+    const c = indices.conteos;
+    statusText.title = `Sin imagen: ${c.sin_imagen || 0} | Pend. Woo: ${c.pendiente_woo || 0} | Pend. IA: ${c.pendiente_ia || 0} | Stock bajo: ${c.stock_bajo || 0}`;
+    statusText.innerText += ` · Pend. Woo ${c.pendiente_woo || 0} · IA ${c.pendiente_ia || 0}`;
+}
+
 function initNavigation() {
     const navItems = document.querySelectorAll('.nav-item[id^="nav-"]');
     navItems.forEach(item => {
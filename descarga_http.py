@@ -0,0 +1,183 @@
+# descarga_http.py
+# Descarga de los CSV de categoría por HTTP, sin navegador, con la sesión autenticada de Selenium.
+# Tras el login (sync_bot.login_intcomex) las cookies del driver se copian a un requests.Session
+# con un pool de conexiones, y todos los CSV se bajan a la vez (DESCARGA_HTTP_HILOS) directo a
+# downloads/<categoria>.csv. La URL del botón CSV de cada categoría (a.priceListButtom[href*='Csv'])
+# se resuelve una sola vez leyendo el HTML de la página y queda en data_activa/urls_csv.json.
+# Las categorías que fallen por HTTP se devuelven para que sync_bot las baje con el navegador.
+
+import os
+import re
+import json
+import hashlib
+from datetime import datetime
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from state_store import DATA_PATH, escritura_atomica
+
+DESCARGA_HTTP = os.getenv("DESCARGA_HTTP", "true").lower() == "true"
+# Descargas simultáneas (y tamaño del pool de conexiones de la sesión)
+DESCARGA_HTTP_HILOS = int(os.getenv("DESCARGA_HTTP_HILOS", "4"))
+DESCARGA_HTTP_TIMEOUT = int(os.getenv("DESCARGA_HTTP_TIMEOUT", "60"))
+URLS_CSV_FILE = os.path.join(DATA_PATH, "urls_csv.json")
+
+# <a ...> con class priceListButtom y href a la exportación CSV (mismo criterio que DOWNLOAD_BUTTON_SELECTOR)
+_ETIQUETA_A = re.compile(r'<a\b[^>]*>', re.IGNORECASE)
+_CLASE = re.compile(r'class\s*=\s*[\'"]([^\'"]*)[\'"]', re.IGNORECASE)
+_HREF = re.compile(r'href\s*=\s*[\'"]([^\'"]+)[\'"]', re.IGNORECASE)
+
+
+class SesionExpirada(Exception):
+    """El sitio devolvió HTML (login) en vez del CSV."""
+    pass
+
+
+def sesion_desde_cookies(cookies, user_agent=None, hilos=None):
+    """requests.Session con las cookies (formato de driver.get_cookies()) y un pool de conexiones."""
+    hilos = hilos or DESCARGA_HTTP_HILOS
+    sesion = requests.Session()
+    for cookie in cookies:
+        sesion.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"),
+                           path=cookie.get("path", "/"), secure=cookie.get("secure", False))
+    if user_agent:
+        sesion.headers["User-Agent"] = user_agent
+    reintentos = Retry(total=3, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+    adaptador = HTTPAdapter(pool_connections=hilos, pool_maxsize=hilos, max_retries=reintentos)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    return sesion
+
+
+def sesion_desde_driver(driver, hilos=None):
+    """requests.Session con las cookies y el user-agent del driver autenticado."""
+    try:
+        user_agent = driver.execute_script("return navigator.userAgent")
+    except Exception:
+        user_agent = None
+    return sesion_desde_cookies(driver.get_cookies(), user_agent, hilos)
+
+
+def cargar_urls_csv(path=URLS_CSV_FILE):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠ No se pudo leer {path}, se resolverán de nuevo las URLs de CSV: {e}")
+        return {}
+
+
+def guardar_urls_csv(urls, path=URLS_CSV_FILE):
+    try:
+        escritura_atomica(path, lambda f: json.dump(urls, f, indent=4, ensure_ascii=False))
+    except Exception as e:
+        print(f"⚠ No se pudo guardar {path}: {e}")
+
+
+def url_csv_en_html(html, url_pagina):
+    """href absoluto del botón de descarga CSV en el HTML de la página de categoría, o None."""
+    for etiqueta in _ETIQUETA_A.findall(html):
+        clase, href = _CLASE.search(etiqueta), _HREF.search(etiqueta)
+        if clase and href and "priceListButtom" in clase.group(1).split() and "Csv" in href.group(1):
+            return urljoin(url_pagina, href.group(1).replace("&amp;", "&"))
+    return None
+
+
+def resolver_url_csv(sesion, url_pagina):
+    """Lee la página de la categoría por HTTP y devuelve la URL del CSV (None si no está en el HTML)."""
+    respuesta = sesion.get(url_pagina, timeout=DESCARGA_HTTP_TIMEOUT)
+    respuesta.raise_for_status()
+    return url_csv_en_html(respuesta.text, respuesta.url)
+
+
+def descargar_csv(sesion, url_csv, destino):
+    """
+    Baja el CSV a `destino` por bloques (sin tenerlo entero en memoria) y lo publica de forma atómica.
+    Lanza SesionExpirada si el sitio responde con una página HTML. Devuelve el sha256 del contenido.
+    """
+    with sesion.get(url_csv, stream=True, timeout=DESCARGA_HTTP_TIMEOUT) as respuesta:
+        respuesta.raise_for_status()
+        if "html" in respuesta.headers.get("Content-Type", "").lower():
+            raise SesionExpirada(f"respuesta HTML en vez de CSV ({respuesta.url})")
+        h = hashlib.sha256()
+
+        def escribir(f):
+            for trozo in respuesta.iter_content(chunk_size=1 << 16):
+                if not trozo:
+                    continue
+                if f.tell() == 0 and trozo.lstrip()[:15].lower().startswith((b"<!doctype", b"<html")):
+                    raise SesionExpirada(f"respuesta HTML en vez de CSV ({respuesta.url})")
+                h.update(trozo)
+                f.write(trozo)
+
+        escritura_atomica(destino, escribir, binario=True)
+    return h.hexdigest()
+
+
+def descargar_csvs_http(sesion, urls, directorio, resolver=None, hilos=None):
+    """
+    Descarga los CSV de {categoria: url_pagina} en paralelo.
+    resolver(categoria, url_pagina) -> url_csv es el respaldo (p. ej. con el navegador) para las
+    páginas cuyo HTML no trae el botón. Devuelve ({categoria: ruta_csv}, [categorias_fallidas]).
+    """
+    hilos = hilos or DESCARGA_HTTP_HILOS
+    cache = cargar_urls_csv()
+    resueltas = {}
+
+    # 1. URLs del CSV: de la caché si la página no cambió; si no, del HTML de la página (en paralelo)
+    por_resolver = [cat for cat, url in urls.items()
+                    if cache.get(cat, {}).get("pagina") != url or not cache[cat].get("csv")]
+    for cat in urls:
+        if cat not in por_resolver:
+            resueltas[cat] = cache[cat]["csv"]
+    if por_resolver:
+        print(f"  🔗 Resolviendo URL del CSV de {len(por_resolver)} categorías...")
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            futuros = {cat: pool.submit(resolver_url_csv, sesion, urls[cat]) for cat in por_resolver}
+        for cat, futuro in futuros.items():
+            try:
+                url_csv = futuro.result()
+            except Exception as e:
+                print(f"  ⚠ {cat}: no se pudo leer la página por HTTP: {e}")
+                url_csv = None
+            if not url_csv and resolver:
+                try:
+                    url_csv = resolver(cat, urls[cat])
+                except Exception as e:
+                    print(f"  ⚠ {cat}: no se encontró el botón CSV: {e}")
+            if url_csv:
+                resueltas[cat] = url_csv
+                cache[cat] = {"pagina": urls[cat], "csv": url_csv,
+                              "resuelto": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        guardar_urls_csv(cache)
+
+    # 2. Descargas en paralelo, directo a downloads/<categoria>.csv
+    def bajar(cat):
+        destino = os.path.join(directorio, f"{cat}.csv")
+        descargar_csv(sesion, resueltas[cat], destino)
+        return destino
+
+    descargadas, fallidas = {}, [cat for cat in urls if cat not in resueltas]
+    print(f"  ⏳ Descargando {len(resueltas)} CSVs por HTTP ({hilos} a la vez)...")
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        futuros = {cat: pool.submit(bajar, cat) for cat in resueltas}
+    for cat, futuro in futuros.items():
+        try:
+            descargadas[cat] = futuro.result()
+            print(f"  ✓ {cat}: {os.path.getsize(descargadas[cat]) / 1024:,.0f} KB")
+        except Exception as e:
+            print(f"  ✗ {cat}: falló la descarga HTTP: {e}")
+            fallidas.append(cat)
+            if not isinstance(e, SesionExpirada):
+                # La URL guardada pudo quedar obsoleta: se vuelve a resolver en la próxima corrida
+                cache.pop(cat, None)
+    if len(descargadas) < len(resueltas):
+        guardar_urls_csv(cache)
+
+    return {cat: descargadas[cat] for cat in urls if cat in descargadas}, [cat for cat in urls if cat in fallidas]
@@ -0,0 +1,166 @@
+# esperas.py
+# Esperas explícitas para los flujos Selenium (sync_bot, image_bot), en lugar de time.sleep fijos.
+# Cada espera termina apenas se cumple su condición (DOM listo, red quieta, elemento presente,
+# cambio de URL...) o al vencer el timeout de su paso, y registra cuánto tardó realmente.
+# Al final de la corrida resumen_esperas() imprime por paso cantidad, promedio, p95, máximo y
+# timeouts, y lo acumula en data_activa/esperas.json (últimas ESPERAS_HISTORIAL corridas) con un
+# timeout sugerido para ajustar los valores con datos.
+# Timeouts por paso: TIMEOUTS, o la variable de entorno ESPERA_<PASO> en segundos
+# (p. ej. ESPERA_CATEGORIA_CARGA=20).
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+from state_store import DATA_PATH, escritura_atomica
+
+ESPERAS_FILE = os.path.join(DATA_PATH, "esperas.json")
+ESPERAS_REGISTRO = os.getenv("ESPERAS_REGISTRO", "true").lower() == "true"
+ESPERAS_HISTORIAL = int(os.getenv("ESPERAS_HISTORIAL", "30"))
+# Cada cuánto se vuelve a evaluar la condición
+ESPERA_INTERVALO = float(os.getenv("ESPERA_INTERVALO", "0.1"))
+
+# Timeout (segundos) de cada paso; el valor anterior con sleep fijo está comentado al lado
+TIMEOUTS = {
+    "documento": 15,
+    "red_inactiva": 5,
+    "login_envio": 20,          # antes sleep(5)
+    "login_confirmacion": 3,    # antes sleep(3) por vuelta del ciclo de 2FA
+    "2fa_envio": 10,            # antes sleep(3)
+    "2fa_verificacion": 20,     # antes sleep(5)
+    "categoria_carga": 15,      # antes sleep(4) (y sleep(3) al re-navegar)
+    "boton_csv": 15,
+    "boton_csv_clic": 2,        # antes sleep(1) tras el scroll
+    "banner_cierre": 2,         # antes sleep(1) por banner
+    "dolar": 5,                 # antes sleep(2)
+    "imagen_sesion": 10,        # antes sleep(3)
+    "imagen_sku": 3,            # antes sleep(3) por SKU
+}
+
+_registro = {}
+_cerrojo = threading.Lock()
+
+
+def timeout_paso(paso, defecto=None):
+    valor = os.getenv(f"ESPERA_{paso.upper()}")
+    if valor:
+        try:
+            return float(valor)
+        except ValueError:
+            print(f"  ⚠ ESPERA_{paso.upper()}={valor} no es un número, se usa el valor por defecto.")
+    return TIMEOUTS.get(paso, defecto if defecto is not None else 10)
+
+
+def registrar(paso, segundos, cumplida):
+    with _cerrojo:
+        _registro.setdefault(paso, []).append((segundos, cumplida))
+
+
+def esperar(driver, paso, condicion, timeout=None):
+    """
+    Espera hasta que condicion(driver) devuelva algo verdadero o venza el timeout del paso.
+    Devuelve el valor de la condición (p. ej. el elemento) o None si venció. Registra la duración.
+    """
+    timeout = timeout_paso(paso) if timeout is None else timeout
+    inicio = time.perf_counter()
+    try:
+        resultado = WebDriverWait(driver, timeout, poll_frequency=ESPERA_INTERVALO).until(condicion)
+    except TimeoutException:
+        resultado = None
+    registrar(paso, time.perf_counter() - inicio, resultado is not None)
+    return resultado
+
+
+def documento_listo(driver, paso="documento", completo=False, timeout=None):
+    """DOM cargado (readyState interactive; con completo=True espera también imágenes e iframes)."""
+    estados = ("complete",) if completo else ("interactive", "complete")
+    return esperar(driver, paso, lambda d: d.execute_script("return document.readyState") in estados, timeout)
+
+
+def red_inactiva(driver, paso="red_inactiva", quieto=0.5, timeout=None):
+    """
+    Sin recursos nuevos (performance resource entries: XHR, fetch, scripts...) durante `quieto`
+    segundos: los pedidos que la página lanza después de cargar ya respondieron.
+    """
+    ultimo = {"cantidad": -1, "desde": time.perf_counter()}
+
+    def quieta(d):
+        cantidad = d.execute_script("return performance.getEntriesByType('resource').length")
+        ahora = time.perf_counter()
+        if cantidad != ultimo["cantidad"]:
+            ultimo["cantidad"], ultimo["desde"] = cantidad, ahora
+            return False
+        return ahora - ultimo["desde"] >= quieto
+
+    return esperar(driver, paso, quieta, timeout)
+
+
+def cargar_pagina(driver, url, paso, condicion=None, timeout=None):
+    """
+    driver.get(url) y espera el DOM listo y, si se indica, la condición (p. ej. el elemento que
+    el flujo necesita), en una sola espera con el timeout del paso. Devuelve el valor de la
+    condición (True sin condición) o None si venció.
+    """
+    driver.get(url)
+
+    def lista(d):
+        if d.execute_script("return document.readyState") not in ("interactive", "complete"):
+            return False
+        return condicion(d) if condicion is not None else True
+
+    return esperar(driver, paso, lista, timeout)
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p * (len(ordenados) - 1))))]
+
+
+def resumen_esperas(titulo="ESPERAS", path=ESPERAS_FILE):
+    """Imprime el resumen de las esperas registradas, lo acumula en esperas.json y limpia el registro."""
+    with _cerrojo:
+        registro = dict(_registro)
+        _registro.clear()
+    if not registro:
+        return {}
+
+    resumen = {}
+    for paso, mediciones in sorted(registro.items()):
+        duraciones = [s for s, _ in mediciones]
+        p95 = _percentil(duraciones, 0.95)
+        resumen[paso] = {
+            "esperas": len(mediciones),
+            "timeouts": sum(1 for _, cumplida in mediciones if not cumplida),
+            "total_s": round(sum(duraciones), 3),
+            "promedio_s": round(sum(duraciones) / len(duraciones), 3),
+            "p95_s": round(p95, 3),
+            "max_s": round(max(duraciones), 3),
+            "timeout_s": timeout_paso(paso),
+        }
+        # Holgura sobre lo observado, sin bajar de 1 segundo; si hubo vencimientos no se sabe cuánto faltó
+        resumen[paso]["timeout_sugerido_s"] = (resumen[paso]["timeout_s"] if resumen[paso]["timeouts"]
+                                               else round(max(1.0, p95 * 2), 1))
+
+    print(f"\n⏳ {titulo}: tiempo de espera por paso")
+    print(f"  {'paso':<20} | {'n':>4} | {'total':>7} | {'prom.':>6} | {'p95':>6} | {'máx.':>6} | {'venc.':>5} | {'timeout':>7}")
+    for paso, r in resumen.items():
+        print(f"  {paso:<20} | {r['esperas']:>4} | {r['total_s']:>6.1f}s | {r['promedio_s']:>5.2f}s | {r['p95_s']:>5.2f}s | "
+              f"{r['max_s']:>5.2f}s | {r['timeouts']:>5} | {r['timeout_s']:>6.1f}s")
+
+    if ESPERAS_REGISTRO:
+        try:
+            historial = []
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    historial = json.load(f)
+            historial.append({"corrida": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "flujo": titulo, "pasos": resumen})
+            historial = historial[-ESPERAS_HISTORIAL:]
+            escritura_atomica(path, lambda f: json.dump(historial, f, indent=4, ensure_ascii=False))
+        except Exception as e:
+            print(f"  ⚠ No se pudo guardar {path}: {e}")
+    return resumen
@@ -1,8 +1,8 @@
 import os
-import json
 import time
 import hashlib
 from woocommerce import API
+from state_store import load_state, update_fields, publish_index_counts
 
 # --- Configuración y Carga de Credenciales ---
 try:
@@ -15,8 +15,6 @@ except ImportError:
     print("ERROR: No se encontró credentials.py")
     exit(1)
 
-DATA_PATH = "data_activa"
-STATE_FILE = os.path.join(DATA_PATH, "estado_productos.json")
 IMAGE_DIR = "product_images"
 CUSTOM_PLACEHOLDER_URL = "https://tupartnerti.cl/tienda/wp-content/uploads/2026/03/Flow_6f1163a766.jpeg"
 GENERIC_FILE_HASH = "a280946523d04c60eba5c478cfb2cb5c"
@@ -29,16 +27,6 @@ wcapi = API(
     timeout=60
 )
 
-def load_json(filepath):
-    if os.path.exists(filepath):
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
-
-def save_json(filepath, data):
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
-
 def get_hash(path):
     try:
         with open(path, 'rb') as f:
@@ -51,7 +39,7 @@ def fix_bad_images():
     print("🔍 BUSCANDO Y LIMPIANDO IMÁGENES GENÉRICAS POR HASH DE ARCHIVO")
     print("="*60)
     
-    state = load_json(STATE_FILE)
+    state = load_state()
     if not state:
         print("✗ No se encontraron datos de estado.")
         return
@@ -108,11 +96,13 @@ def fix_bad_images():
                     print("    [✓] Placeholder de Tu Partner TI forzado en WooCommerce.")
                     
                     if sku in state:
-                        state[sku]["tiene_imagen"] = False
-                        state[sku]["imagenes_locales"] = []
-                        state[sku]["subido_a_woo"] = True
-                        state[sku]["placeholder_personalizado"] = True
-                        save_json(STATE_FILE, state)
+                        cambios = {
+                            "tiene_imagen": False,
+                            "imagenes_locales": [],
+                            "subido_a_woo": True,
+                            "placeholder_personalizado": True
+                        }
+                        update_fields(sku, cambios)
                         
                     success_count += 1
                 else:
@@ -124,6 +114,7 @@ def fix_bad_images():
             
         time.sleep(1)
         
+    publish_index_counts()
     print(f"\\n✅ Limpieza profunda completada. Arreglados {success_count} de {len(skus_to_fix)} productos.")
         
 if __name__ == "__main__":
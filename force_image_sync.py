@@ -1,16 +1,11 @@
-import json
-import os
-
-STATE_FILE = "data_activa/estado_productos.json"
+from state_store import load_state, save_state
 
 def main():
-    if not os.path.exists(STATE_FILE):
-        print(f"Error: No se encontró el archivo {STATE_FILE}")
+    estado = load_state()
+    if not estado:
+        print("Error: No se encontró el estado de productos")
         return
 
-    with open(STATE_FILE, "r", encoding="utf-8") as f:
-        estado = json.load(f)
-
     modificados = 0
 
     for sku, data in estado.items():
@@ -25,8 +20,7 @@ def main():
             print(f"[{sku}] Estado reiniciado para forzar sincronización de imagen.")
 
     if modificados > 0:
-        with open(STATE_FILE, "w", encoding="utf-8") as f:
-            json.dump(estado, f, indent=4, ensure_ascii=False)
+        save_state(estado)
         print(f"\n¡Éxito! Se resetearon {modificados} productos.")
     else:
         print("\nNo se encontraron productos que requieran reinicio de imagen.")
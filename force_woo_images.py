@@ -1,7 +1,7 @@
-import json
 from woocommerce import API
 from credentials import WC_URL, WC_CONSUMER_KEY, WC_CONSUMER_SECRET
 from woo_batch_manager import WooBatchManager
+from state_store import load_state
 
 def main():
     wcapi = API(
@@ -12,8 +12,7 @@ def main():
         timeout=60
     )
     
-    with open("data_activa/estado_productos.json", "r", encoding="utf-8") as f:
-        estado = json.load(f)
+    estado = load_state()
         
     skus = list(estado.keys())
     
@@ -0,0 +1,114 @@
+# generador_csv.py
+# Listas de precios sintéticas con el formato de los CSV de Intcomex, para medir la ingesta sin
+# descargar nada: UTF-16 con BOM, tabuladas, con líneas de preámbulo antes de la cabecera,
+# precios con coma decimal ("487,50", "$ 1.234,56"), stock como texto ("Más de 20", "Disponible"),
+# categorías/subcategorías en castellano, SKUs con sufijo de variante (-B1, -RC, ...) y filas
+# de liquidación/oferta que la ingesta filtra.
+#
+# Uso: python generador_csv.py salida.csv [cantidad_filas] [semilla]   (por defecto 50000 7)
+
+import sys
+import random
+
+CABECERA = ["Categoría", "Subcategoría", "Sku", "Mpn", "Nombre", "Atributos", "Precio", "Moneda", "Disponibilidad"]
+PREAMBULO = ["Lista de precios Intcomex Chile", "Precios en USD, no incluyen IVA", ""]
+
+# (categoría, subcategoría, productos, atributos): la primera de cada lista es la de Notebooks,
+# que es la que valida la categoría en los benchmarks (palabras clave "Notebook", "Portátiles")
+CATEGORIAS = [
+    ("Computadores", "Notebooks", ["Notebook", "Notebook Gamer", "Notebook Empresarial"],
+     ["Intel Core i5 8GB RAM 512GB SSD", "Intel Core i7 16GB RAM 1TB SSD", "AMD Ryzen 5 8GB RAM 256GB SSD"]),
+    ("Computadores", "Portátiles Gamer", ["Portátil Gamer", "Notebook Gamer"],
+     ["RTX 4060 16GB RAM", "RTX 3050 8GB RAM"]),
+    ("Computadores", "Notebooks Empresariales", ["Notebook Empresarial", "Notebook"],
+     ["Windows 11 Pro 16GB RAM", "Ubuntu 8GB RAM"]),
+    ("Accesorios", "Mouse y Teclados", ["Mouse Inalámbrico", "Teclado USB", "Combo Teclado y Mouse"],
+     ["USB 2.0", "Bluetooth 5.0"]),
+    ("Almacenamiento", "Discos SSD Internos", ["Unidad de Estado Sólido", "SSD NVMe M.2"],
+     ["500GB PCIe 4.0", "1TB SATA III"]),
+    ("Monitores", "Monitores LED", ["Monitor", "Monitor Gamer Curvo"],
+     ["24 pulgadas Full HD", "27 pulgadas QHD 165Hz"]),
+]
+MARCAS = ["Lenovo", "HP", "Dell", "Asus", "Acer", "MSI", "Samsung", "Kingston", "Logitech"]
+SUFIJOS = ["-B1", "-RC", "-EX", "-S"]
+LIQUIDACION = [" LIQUIDACION", " Oferta", " - OFERTA"]
+
+
+def _precio(rnd, valor):
+    """Texto de precio en USD con los formatos que trae el CSV (mayoría con coma decimal)."""
+    formato = rnd.random()
+    if formato < 0.70:
+        return f"{valor:.2f}".replace(".", ",")                                       # 487,50
+    if formato < 0.85:
+        return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")  # 1.234,56
+    if formato < 0.92:
+        return f"$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")  # $ 1.234,56
+    if formato < 0.96:
+        return f"USD {valor:.2f}"                                                     # USD 487.50
+    if formato < 0.98:
+        return ""                                                                     # sin precio
+    return rnd.choice(["Consultar", "0"])                                             # no se publica
+
+
+def _stock(rnd, unidades):
+    formato = rnd.random()
+    if formato < 0.45:
+        return f"Más de {unidades}"
+    if formato < 0.75:
+        return str(unidades)
+    if formato < 0.85:
+        return "Disponible"
+    if formato < 0.90:
+        return f"Disponible: {unidades} unidades"
+    return rnd.choice(["Agotado", "Sin stock", ""])
+
+
+def generar_filas(cantidad, semilla=7, variacion=0.0, sufijos=0.05, liquidaciones=0.03, otras_categorias=0.25):
+    """
+    Filas (listas de textos en el orden de CABECERA). Con la misma semilla se obtienen los mismos
+    SKUs y productos; `variacion` es la fracción de filas a las que se les cambia precio y stock,
+    para simular la lista del día siguiente sin alterar el resto.
+    """
+    rnd = random.Random(semilla)
+    cambios = random.Random(semilla + 1)
+    propias, otras = CATEGORIAS[:3], CATEGORIAS[3:]
+    for i in range(cantidad):
+        categoria, subcategoria, productos, atributos = rnd.choice(otras if rnd.random() < otras_categorias else propias)
+        sku = f"{categoria[:2].upper()}{i:07d}" + (rnd.choice(SUFIJOS) if rnd.random() < sufijos else "")
+        nombre = f"{rnd.choice(productos)} {rnd.choice(MARCAS)} {rnd.randint(100, 999)}"
+        if rnd.random() < liquidaciones:
+            nombre += rnd.choice(LIQUIDACION)
+        valor = rnd.uniform(5, 3000)
+        unidades = rnd.randint(1, 500)
+        # Los cambios usan su propio generador: el resto de la lista es idéntico al de la misma semilla
+        if variacion and cambios.random() < variacion:
+            valor *= cambios.uniform(0.9, 1.1)
+            unidades = cambios.randint(0, 500)
+        precio, stock = _precio(rnd, valor), _stock(rnd, unidades)
+        yield [categoria, subcategoria if rnd.random() > 0.02 else "", sku, f"MPN-{rnd.randint(10000, 99999)}",
+               nombre, rnd.choice(atributos), precio, "USD", stock]
+
+
+def generar_csv(path, cantidad, semilla=7, variacion=0.0, **kwargs):
+    """Escribe una lista sintética en `path` (UTF-16 tabulado, con preámbulo). Devuelve la ruta."""
+    with open(path, "w", encoding="utf-16", newline="") as f:
+        f.write("\n".join(PREAMBULO + ["\t".join(CABECERA)]) + "\n")
+        lote = []
+        for fila in generar_filas(cantidad, semilla, variacion, **kwargs):
+            lote.append("\t".join(fila))
+            if len(lote) >= 10_000:
+                f.write("\n".join(lote) + "\n")
+                lote = []
+        if lote:
+            f.write("\n".join(lote) + "\n")
+    return path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python generador_csv.py salida.csv [cantidad_filas] [semilla]")
+        sys.exit(1)
+    cantidad = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    semilla = int(sys.argv[3]) if len(sys.argv) > 3 else 7
+    generar_csv(sys.argv[1], cantidad, semilla)
+    print(f"✓ {cantidad:,} filas sintéticas escritas en {sys.argv[1]}")
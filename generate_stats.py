@@ -1,10 +1,10 @@
 import os
 import json
 from datetime import datetime
+from state_store import load_state
 
 # --- Configuración ---
 DATA_PATH = "data_activa"
-STATE_FILE = os.path.join(DATA_PATH, "estado_productos.json")
 HISTORICO_FILE = os.path.join(DATA_PATH, "historico_stats.json")
 
 # Lógica de HH (Horas Hombre) ahorradas por producto
@@ -28,16 +28,16 @@ def save_json(filepath, data):
 def generate_daily_snapshot(nuevos_count=0, duration=0):
     print("📊 Generando Snapshot de Estadísticas...")
     
-    state = load_json(STATE_FILE)
+    state = load_state()
     if not state:
         print("✗ No se encontró estado_productos.json")
         return
 
     total_productos = len(state)
-    en_woo = sum(1 for p in state.values() if p.get("subido_a_woo"))
-    con_imagen = sum(1 for p in state.values() if p.get("tiene_imagen"))
-    con_ia = sum(1 for p in state.values() if p.get("ia_mejorado"))
-    agotados = sum(1 for p in state.values() if p.get("stock", 0) <= 0)
+    en_woo = sum(1 for p in state.values() if p.subido_a_woo)
+    con_imagen = sum(1 for p in state.values() if p.tiene_imagen)
+    con_ia = sum(1 for p in state.values() if p.ia_mejorado)
+    agotados = sum(1 for p in state.values() if p.stock <= 0)
     
     # Cálculo de HH Ahorradas Estructurales (Una sola vez por producto)
     hh_estructurales = (en_woo * HH_SYNC) + (con_imagen * HH_IMG) + (con_ia * HH_IA)
@@ -120,14 +120,15 @@ def generate_daily_snapshot(nuevos_count=0, duration=0):
     print(f"✅ Snapshot guardado para {today}.")
     print(f"   Total HH: {round(hh_totales, 2)} | Ganadas Hoy: {round(hh_hoy_ganadas, 2)} | Velocidad: {velocidad}x")
     
-    # Sanitizar estado para el dashboard
-    sanitize_product_state()
+    # Sanitizar estado para el dashboard (reutiliza el catálogo ya cargado)
+    sanitize_product_state(state)
     
     return snapshot
 
-def sanitize_product_state():
+def sanitize_product_state(state=None):
     print("🔒 Generando catálogo sanitizado para el dashboard...")
-    state = load_json(STATE_FILE)
+    if state is None:
+        state = load_state()
     if not state:
         print("✗ No se pudo cargar el catálogo original para sanitizar.")
         return
@@ -140,10 +141,10 @@ def sanitize_product_state():
             "nombre": p.get("nombre"),
             "sale_price": p.get("sale_price"),
             "precio_original": p.get("sale_price"),  # Alias para compatibilidad
-            "stock": p.get("stock", 0),
-            "subido_a_woo": p.get("subido_a_woo", False),
-            "ia_mejorado": p.get("ia_mejorado", False),
-            "tiene_imagen": p.get("tiene_imagen", False)
+            "stock": p.stock,
+            "subido_a_woo": p.subido_a_woo,
+            "ia_mejorado": p.ia_mejorado,
+            "tiene_imagen": p.tiene_imagen
         }
         
     dashboard_file = os.path.join(DATA_PATH, "estado_productos_dashboard.json")
@@ -1,11 +1,10 @@
 import os
-import json
-import time
 import requests
 from woocommerce import API
 from datetime import datetime
 import concurrent.futures
 from woo_batch_manager import WooBatchManager
+from state_store import load_state, apply_changes, query_skus, publish_index_counts, CAMPO_ELIMINADO
 
 # --- Configuración y Carga de Credenciales ---
 try:
@@ -20,7 +19,6 @@ except ImportError:
 
 # URLs y Archivos
 DATA_PATH = "data_activa"
-STATE_FILE = os.path.join(DATA_PATH, "estado_productos.json")
 # En Docker: usar el nombre del contenedor n8n. En local: localhost.
 N8N_HOST = os.environ.get("N8N_HOST", "n8n-automation")
 N8N_WEBHOOK_URL = f"http://{N8N_HOST}:5678/webhook/ia-transformer"
@@ -37,16 +35,6 @@ wcapi = API(
 # Cache de IDs para evitar GETs repetidos (Se cargará al inicio)
 SKU_ID_MAP = {}
 
-def load_state():
-    if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
-
-def save_state(state):
-    with open(STATE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(state, f, indent=4, ensure_ascii=False)
-
 def preload_wc_ids(pending_skus):
     """Carga todos los IDs de productos de una vez para evitar GETs individuales (Optimización Pro)."""
     print(f"    [Woo] Pre-cargando IDs para {len(pending_skus)} SKUs...")
@@ -128,20 +116,15 @@ def process_ai_enrichment(limit=None, max_workers=5):
     print("🧠 VINI-TURBO: IA ENRICHMENT (PARALLEL & BATCH)")
     print("="*50)
     
-    state = load_state()
-    
     # Pendientes: Que estén en woo, NO estén mejorados, y tengan menos de 3 intentos fallidos
-    pending_skus = []
-    for sku, data in state.items():
-        if data.get("subido_a_woo") and not data.get("ia_mejorado", False):
-            intentos = data.get("ia_intentos", 0)
-            if intentos < 3:
-                pending_skus.append(sku)
+    pending_skus = query_skus("pendiente_ia")
     
     if not pending_skus:
         print("✓ No hay productos pendientes/elegibles para enriquecimiento.")
         return 0
 
+    state = load_state()
+
     if limit:
         pending_skus = pending_skus[:limit]
         print(f"ℹ Procesando límite de {limit} productos.")
@@ -186,19 +169,23 @@ def process_ai_enrichment(limit=None, max_workers=5):
     # 5. Guardar estado local (Una sola vez al final para mayor velocidad)
     if results_to_save:
         print(f"\n💾 Actualizando estado local para {len(results_to_save)} productos...")
+        cambios = {}
         for sku, content, status in results_to_save:
             if status == "success":
-                state[sku]["ia_mejorado"] = True
-                state[sku]["ia_intentos"] = 0
-                state[sku]["ultima_ia"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                cambios[sku] = {
+                    "ia_mejorado": True,
+                    "ia_intentos": 0,
+                    "ultima_ia": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
                 # Limpiar error anterior si existía
-                if "ultimo_error_ia" in state[sku]: del state[sku]["ultimo_error_ia"]
+                if "ultimo_error_ia" in state[sku]: cambios[sku]["ultimo_error_ia"] = CAMPO_ELIMINADO
             else:
                 # Incrementar fallitos
                 actual_intentos = state[sku].get("ia_intentos", 0)
-                state[sku]["ia_intentos"] = actual_intentos + 1
-                state[sku]["ultimo_error_ia"] = status
-        save_state(state)
+                cambios[sku] = {"ia_intentos": actual_intentos + 1, "ultimo_error_ia": status}
+        # Sólo se escriben los SKUs procesados, no el catálogo completo
+        apply_changes(cambios)
+        publish_index_counts()
 
     print("\n" + "="*50)
     print(f"✅ VINI-TURBO FINALIZADO")
@@ -1,6 +1,4 @@
 import os
-import json
-import time
 import requests
 import concurrent.futures
 from datetime import datetime
@@ -16,12 +14,14 @@ try:
 except ImportError:
     INTCOMEX_USERNAME = None
     INTCOMEX_PASSWORD = None
-from sync_bot import login_intcomex
+from sync_bot import iniciar_sesion_intcomex
+from state_store import load_state, apply_changes, query_skus, publish_index_counts
+import perfil_rapido
+import esperas
 
 DATA_PATH = "data_activa"
 DOWNLOAD_DIR = "downloads"
 IMAGE_DIR = "product_images"
-STATE_FILE = os.path.join(DATA_PATH, "estado_productos.json")
 MAPA_IMAGENES_PATH = os.path.join(DATA_PATH, "mapa_imagenes.json")
 
 # URL de búsqueda directa
@@ -30,18 +30,6 @@ SEARCH_URL_TEMPLATE = "https://store.intcomex.com/es-XCL/Products/ByKeyword?term
 # Crear carpetas necesarias
 os.makedirs(IMAGE_DIR, exist_ok=True)
 
-def load_state():
-    if os.path.exists(STATE_FILE):
-        try:
-            with open(STATE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except: return {}
-    return {}
-
-def save_state(state):
-    with open(STATE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(state, f, indent=4, ensure_ascii=False)
-
 def download_image(url, sku):
     """Descarga una imagen y la guarda localmente."""
     if not url or not isinstance(url, str): return None
@@ -73,8 +61,12 @@ def setup_driver():
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+    # Perfil rápido: carga eager y sin imágenes/fuentes/publicidad (el src de la imagen sigue en el HTML)
+    perfil_rapido.aplicar_opciones(options)
     service = ChromeService(ChromeDriverManager().install())
-    return webdriver.Chrome(service=service, options=options)
+    driver = webdriver.Chrome(service=service, options=options)
+    perfil_rapido.aplicar_bloqueos(driver)
+    return driver
 
 def extract_image_from_html(html, sku, current_url=""):
     """
@@ -192,12 +184,11 @@ def run_image_bot(skus_to_process=None, max_workers=10):
     
     state = load_state()
     if skus_to_process:
-        target_skus = [sku for sku in state.keys() if sku in skus_to_process]
+        solicitados = set(skus_to_process)
+        target_skus = [sku for sku in state.keys() if sku in solicitados]
     else:
         # Procesar SKUs que no tienen imagen o tienen placeholder personalizado
-        target_skus = [sku for sku, data in state.items() 
-                       if (not data.get("tiene_imagen") or data.get("placeholder_personalizado")) 
-                       and data.get("stock", 0) > 0]
+        target_skus = query_skus("sin_imagen")
 
     if not target_skus:
         print("✅ No hay SKUs pendientes de imagen.")
@@ -229,16 +220,21 @@ def run_image_bot(skus_to_process=None, max_workers=10):
             if INTCOMEX_USERNAME and INTCOMEX_PASSWORD:
                 print("🔑 Iniciando sesión en Intcomex para acceder a productos protegidos...")
                 try:
-                    login_intcomex(driver, INTCOMEX_USERNAME, INTCOMEX_PASSWORD)
-                    time.sleep(3) # Esperar a que se asiente la sesión
-                    print("    ✅ Sesión iniciada con éxito en Selenium.")
+                    if iniciar_sesion_intcomex(driver, INTCOMEX_USERNAME, INTCOMEX_PASSWORD):
+                        # Esperar a que se asiente la sesión (sin pedidos pendientes en la página)
+                        esperas.red_inactiva(driver, "imagen_sesion")
+                        print("    ✅ Sesión iniciada con éxito en Selenium.")
+                    else:
+                        print("    ⚠️ No se pudo iniciar sesión en Selenium. Continuando sin autenticación...")
                 except Exception as le:
                     print(f"    ⚠️ Error de inicio de sesión en Selenium: {le}. Continuando sin autenticación...")
             for sku in failed_skus:
                 search_url = SEARCH_URL_TEMPLATE.format(sku=sku)
                 try:
-                    driver.get(search_url)
-                    time.sleep(3)
+                    # La página del producto o el resultado sin imagen, lo primero que aparezca
+                    esperas.cargar_pagina(driver, search_url, "imagen_sku",
+                                          lambda d: d.find_elements(By.CSS_SELECTOR, ".mainImageDiv img, img.img-products")
+                                          or d.execute_script("return document.readyState") == "complete")
                     
                     img_url = extract_image_from_html(driver.page_source, sku, driver.current_url)
                     
@@ -273,19 +269,23 @@ def run_image_bot(skus_to_process=None, max_workers=10):
         finally:
             if driver:
                 driver.quit()
+            esperas.resumen_esperas("ESPERAS DEL RESPALDO SELENIUM (IMÁGENES)")
 
     # Actualizar estado global
     if results:
-        for sku, path in results.items():
-            state[sku].update({
+        # Sólo se escriben los SKUs con imagen nueva, no el catálogo completo
+        apply_changes({
+            sku: {
                 "tiene_imagen": True,
                 "imagenes_locales": [path],
                 "placeholder_personalizado": False,  # Resetear flag de placeholder
                 "subido_a_woo": False,
                 "pendiente_sync_woo": True,
                 "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            })
-        save_state(state)
+            }
+            for sku, path in results.items()
+        })
+        publish_index_counts()
         
     print(f"\n✅ Proceso finalizado. {downloaded_count} imágenes descargadas en total.")
     return downloaded_count
@@ -1,11 +1,11 @@
 import os
-import json
-import time
 import requests
 import concurrent.futures
 from woocommerce import API
 from requests.auth import HTTPBasicAuth
 from woo_batch_manager import WooBatchManager
+from state_store import load_state, save_state, query_skus
+from product_record import ProductRecord
 
 # Importar credenciales
 try:
@@ -22,7 +22,6 @@ except ImportError:
 
 # Configuración
 DATA_PATH = "data_activa"
-STATE_FILE = os.path.join(DATA_PATH, "estado_productos.json")
 IMAGE_DIR = "product_images"
 
 # Inicializar WooCommerce API
@@ -36,16 +35,6 @@ wcapi = API(
 
 SKU_ID_MAP = {}
 
-def load_state():
-    if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
-
-def save_state(state):
-    with open(STATE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(state, f, indent=4, ensure_ascii=False)
-
 def preload_wc_ids(skus):
     """Carga IDs de productos en paralelo."""
     print(f"    [Woo] Pre-cargando IDs para {len(skus)} SKUs...")
@@ -88,25 +77,23 @@ def run_image_uploader(max_workers=5):
     print("🚀 VINI-TURBO: IMAGE UPLOADER (PARALLEL & BATCH)")
     print("="*60)
     
-    state = load_state()
-    skus_to_sync = []
-    for sku, data in state.items():
-        if data.get("pendiente_sync_woo") or (data.get("tiene_imagen") and not data.get("subido_a_woo")):
-            skus_to_sync.append(sku)
+    skus_to_sync = query_skus("pendiente_woo")
     
     if not skus_to_sync:
         print("[OK] Todo sincronizado.")
         return 0
 
+    state = load_state()
+
     # 1. Pre-cargar IDs
     preload_wc_ids(skus_to_sync)
     
     # 2. Subir imágenes en paralelo
     images_to_upload = []
     for sku in skus_to_sync:
-        data = state.get(sku, {})
-        if data.get("tiene_imagen") and not data.get("subido_a_woo"):
-            local_list = data.get("imagenes_locales") or [None]
+        data = state.get(sku) or ProductRecord()
+        if data.tiene_imagen and not data.subido_a_woo:
+            local_list = data.imagenes_locales or [None]
             local_path = local_list[0]
             if not local_path or not os.path.exists(local_path):
                 # Auto-discovery
@@ -132,11 +119,11 @@ def run_image_uploader(max_workers=5):
     
     skus_added_to_batch = []
     for sku in skus_to_sync:
-        data = state.get(sku, {})
+        data = state.get(sku) or ProductRecord()
         pid = SKU_ID_MAP.get(sku)
         
         payload = {
-            "name": data.get("nombre"),
+            "name": data.nombre,
             "regular_price": str(data.get("sale_price")),
             "sku": sku,
             "manage_stock": True,
@@ -146,7 +133,7 @@ def run_image_uploader(max_workers=5):
         
         # Categorías
         categories_list = []
-        cat_name = data.get("categoria_csv") or data.get("categoria_principal")
+        cat_name = data.categoria_csv or data.categoria_principal
         # (Para simplicidad del batch, omitimos la creación de categorías on-the-fly aquí, 
         # asumimos que ya existen o se crearán en una fase previa si es necesario, 
         # o usamos IDs conocidos si los tuviéramos. Por ahora enviamos el nombre si es nuevo?)
@@ -154,9 +141,9 @@ def run_image_uploader(max_workers=5):
         # Vincular imagen
         if sku in media_results:
             payload["images"] = [{"id": media_results[sku]["id"]}]
-        elif not data.get("tiene_imagen") and not data.get("placeholder_personalizado"):
+        elif not data.tiene_imagen and not data.placeholder_personalizado:
             payload["images"] = [{"src": "https://tupartnerti.cl/tienda/wp-content/uploads/2026/03/Flow_6f1163a766.jpeg"}]
-            state[sku]["placeholder_personalizado"] = True
+            data.placeholder_personalizado = True
 
         if pid:
             batch_manager.add_update(pid, payload)
@@ -176,21 +163,22 @@ def run_image_uploader(max_workers=5):
     # pero para forzar el avance, asumiremos éxito parcial si el batch no falló.
     if results is not None:
         for sku in skus_added_to_batch:
+            producto = state[sku]
             if sku in media_results:
-                state[sku]["subido_a_woo"] = True
-                state[sku]["woo_media_id"] = media_results[sku]["id"]
-                state[sku]["woo_image_url"] = media_results[sku]["url"]
+                producto.subido_a_woo = True
+                producto.woo_media_id = media_results[sku]["id"]
+                producto.woo_image_url = media_results[sku]["url"]
             
             # Si era nuevo, intentamos pescar su ID del resultado para mayor precisión
             if not SKU_ID_MAP.get(sku) and 'create' in results:
                 for created_item in results['create']:
                     if str(created_item.get('sku')) == str(sku):
-                        state[sku]["subido_a_woo"] = True
+                        producto.subido_a_woo = True
                         break
             elif SKU_ID_MAP.get(sku):
-                state[sku]["subido_a_woo"] = True # Ya existía
+                producto.subido_a_woo = True # Ya existía
             
-            state[sku]["pendiente_sync_woo"] = False
+            producto.pendiente_sync_woo = False
 
     save_state(state)
     
@@ -0,0 +1,963 @@
+# ingesta_csv.py
+# Ingesta de los CSV de precios de Intcomex hacia el estado local, en tres etapas:
+#   1. Lectura: leer_csv_por_bloques() -> DataFrames por bloque y mapear_columnas() para ubicar SKU, precio, etc.
+#      Cada CSV leído con éxito se archiva en Parquet (archivo_precios.py), que también se puede re-ingestar.
+#   2. Normalización: filtros de categoría / sufijo / liquidación, precio USD -> costo y venta CLP, stock.
+#      normalizar_vectorizado() lo hace con operaciones de columna (pandas/NumPy); normalizar_filas()
+#      es la versión fila a fila original (df.iterrows), que se mantiene como referencia de equivalencia.
+#   3. Fusión: fusionar_en_estado() vuelca las filas normalizadas en el estado de la categoría.
+# No depende de Selenium: benchmark_ingesta.py y otros scripts pueden usarlo sin credenciales.
+
+import os
+import json
+import codecs
+import hashlib
+import re
+from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from state_store import DATA_PATH, escritura_atomica, find_product
+from product_record import ProductRecord
+from pool_navegadores import memoria_disponible_mb
+from validador_categorias import es_valida, mascara_valida
+import archivo_precios
+
+# "vectorizado" (por defecto) o "filas" (ruta de referencia con df.iterrows)
+INGESTA_MODO = os.getenv("INGESTA_MODO", "vectorizado").lower()
+
+COLUMNAS_NORMALIZADAS = ("sku", "nombre", "cost_price", "sale_price", "stock", "categoria_csv", "subcategoria_csv")
+
+# Procesos para parsear varios CSV a la vez (normalizar_en_paralelo): 0 = automático, un proceso
+# por núcleo hasta INGESTA_PROCESOS_MAX y según la memoria libre (el contenedor también corre Chrome)
+INGESTA_PROCESOS = int(os.getenv("INGESTA_PROCESOS", "0"))
+INGESTA_PROCESOS_MAX = int(os.getenv("INGESTA_PROCESOS_MAX", "4"))
+# Memoria que se reserva por proceso de ingesta (pandas/pyarrow con un bloque de FILAS_POR_BLOQUE)
+MB_POR_PROCESO_INGESTA = int(os.getenv("MB_POR_PROCESO_INGESTA", "400"))
+
+# Último CSV procesado de cada categoría: hash del contenido, parámetros y resultado.
+# Un CSV idéntico (con el mismo dólar, margen y palabras clave) no se vuelve a procesar.
+CACHE_CSV_FILE = os.path.join(DATA_PATH, "cache_csv.json")
+INGESTA_CACHE = os.getenv("INGESTA_CACHE", "true").lower() == "true"
+
+# Por encima de este monto (CLP) un valor deja de ser exacto en float64/int64 y se calcula fila a fila
+_LIMITE_EXACTO = 1e15
+
+
+# Patrones precompilados de los parsers de precio y stock
+_SIMBOLOS_PRECIO = re.compile(r'[\$\sCLPUSD]', re.IGNORECASE)
+_PRIMER_NUMERO = re.compile(r'\d+')
+# Textos de precio/stock distintos que se recuerdan ya convertidos: los mismos pocos miles
+# de valores se repiten entre categorías y corridas
+MEMO_PARSERS = int(os.getenv("MEMO_PARSERS", "65536"))
+
+
+def _precio_desde_texto(price_text):
+    """Conversión de un texto de precio (sin memo). Lanza ValueError si no es un número."""
+    # Remover símbolos de moneda y espacios (USD, CLP, $)
+    cleaned = _SIMBOLOS_PRECIO.sub('', price_text.strip())
+
+    # Detectar si usa coma decimal o punto decimal
+    # Si tiene coma y punto, el punto es separador de miles y la coma es decimal
+    if ',' in cleaned and '.' in cleaned:
+        # Formato: "1.234,56" -> punto es miles, coma es decimal
+        cleaned = cleaned.replace('.', '')  # Remover puntos (miles)
+        cleaned = cleaned.replace(',', '.')  # Coma -> punto decimal
+    elif ',' in cleaned:
+        # Solo tiene coma: puede ser decimal (ej: "487,50") o miles
+        # Si hay más de una coma o la coma está antes del último grupo de 3 dígitos, es separador de miles
+        parts = cleaned.split(',')
+        if len(parts) == 2 and len(parts[1]) <= 2:
+            # Es formato decimal: "487,50"
+            cleaned = cleaned.replace(',', '.')
+        else:
+            # Es separador de miles: "1,234"
+            cleaned = cleaned.replace(',', '')
+    elif '.' in cleaned:
+        # Solo tiene punto: si el punto está antes de los últimos 3 dígitos, es separador de miles
+        parts = cleaned.split('.')
+        if not (len(parts) == 2 and len(parts[1]) <= 2):
+            # Es separador de miles: "1.234" (si no, ya es decimal: "487.50")
+            cleaned = cleaned.replace('.', '')
+
+    return float(cleaned)
+
+
+@lru_cache(maxsize=MEMO_PARSERS)
+def _precio_texto(price_text):
+    try:
+        return _precio_desde_texto(price_text)
+    except (ValueError, AttributeError, TypeError) as e:
+        # Con el memo, la advertencia sale una vez por texto distinto
+        print(f"⚠ Error al convertir precio '{price_text}' a float: {e}")
+        return None
+
+
+def clean_price_to_float(price_text):
+    """
+    Convierte un texto de precio CLP (ej: "$ 150.000" o "$150.000" o "487,50") a float.
+    Intcomex usa formato con coma decimal (ej: "487,50").
+
+    Args:
+        price_text: String con el precio (ej: "487,50" o "$150.000")
+
+    Returns:
+        float: Precio como número, o None si no se puede convertir
+    """
+    if isinstance(price_text, str):
+        return _precio_texto(price_text)
+
+    if pd.isna(price_text) or price_text is None:
+        return None
+
+    # Si ya es un número, retornarlo
+    if isinstance(price_text, (int, float)):
+        return float(price_text)
+
+    try:
+        return _precio_desde_texto(str(price_text))
+    except (ValueError, AttributeError, TypeError) as e:
+        print(f"⚠ Error al convertir precio '{price_text}' a float: {e}")
+        return None
+
+
+def _stock_desde_texto(stock_text):
+    text = stock_text.lower().strip()
+
+    # Buscar el primer número en el texto
+    numero = _PRIMER_NUMERO.search(text)
+    if numero:
+        return int(numero.group())
+
+    # Si no hay números pero dice algo de disponibilidad
+    if 'disponible' in text or 'en stock' in text:
+        return 1 # Asumir al menos 1 si no hay número pero indica disponibilidad
+
+    return 0
+
+
+@lru_cache(maxsize=MEMO_PARSERS)
+def _stock_texto(stock_text):
+    try:
+        return _stock_desde_texto(stock_text)
+    except Exception:
+        return 0
+
+
+def extract_stock_number(stock_text):
+    """
+    Extrae el número de stock de un texto (ej: "Disponible: 100 unidades" o "Más de 20").
+    Si el texto contiene "más de X", retorna X.
+    """
+    if stock_text is None:
+        return 0
+
+    if isinstance(stock_text, (int, float)):
+        return int(stock_text)
+
+    if isinstance(stock_text, str):
+        return _stock_texto(stock_text)
+
+    try:
+        return _stock_desde_texto(str(stock_text))
+    except Exception:
+        return 0
+
+
+# --- Etapa 1: lectura ---
+
+# Filas por bloque al parsear el CSV: acota la memoria a un bloque más las filas ya normalizadas
+FILAS_POR_BLOQUE = int(os.getenv("INGESTA_FILAS_POR_BLOQUE", "50000"))
+# Columnas del CSV que usa la normalización ("atributos" se ubica pero no se lee)
+COLUMNAS_USADAS = ("sku", "precio", "stock", "descripcion", "categoria", "subcategoria")
+
+
+def detectar_codificacion(archivo_csv, muestra=65536):
+    """
+    Detecta la codificación leyendo una sola muestra del inicio del archivo.
+    Intcomex entrega UTF-16 con BOM; también acepta UTF-16 sin BOM, UTF-8 (con o sin BOM) y latin-1.
+    """
+    with open(archivo_csv, 'rb') as f:
+        inicio = f.read(muestra)
+
+    if inicio.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    if inicio.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    # UTF-16 sin BOM: texto ASCII con un byte nulo en cada par
+    if len(inicio) >= 2:
+        pares = inicio[:len(inicio) // 2 * 2]
+        if pares[1::2].count(0) > len(pares) // 4:
+            return 'utf-16-le'
+        if pares[0::2].count(0) > len(pares) // 4:
+            return 'utf-16-be'
+    try:
+        # final=False: la muestra puede cortar un carácter multibyte al final
+        codecs.getincrementaldecoder('utf-8')().decode(inicio, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def _es_cabecera(linea):
+    l = linea.lower()
+    return 'sku' in l or 'categoría' in l or 'nombre' in l
+
+
+def leer_csv_por_bloques(archivo_csv, filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Lee el CSV de Intcomex (tabulado, con líneas de preámbulo antes de la cabecera) en bloques
+    de DataFrame, sin cargar el archivo completo: salta el preámbulo línea a línea y parsea el
+    resto con el motor C, sólo las columnas que se usan y todas como texto.
+    Lanza excepción si no encuentra la cabecera.
+    """
+    encoding = detectar_codificacion(archivo_csv)
+    with open(archivo_csv, 'r', encoding=encoding, newline='') as f:
+        cabecera = None
+        for _ in range(20):
+            posicion = f.tell()
+            linea = f.readline()
+            if not linea:
+                break
+            if _es_cabecera(linea):
+                cabecera = linea
+                break
+        if cabecera is None:
+            raise Exception("No se encontró la fila de cabecera en el CSV")
+        # Volver al inicio de la cabecera para que pandas la lea como nombres de columna
+        f.seek(posicion)
+
+        nombres = [n.strip().strip('"') for n in cabecera.rstrip('\r\n').split('\t')]
+        columnas = mapear_columnas(nombres)
+        usadas = {columnas[clave] for clave in COLUMNAS_USADAS if columnas[clave]}
+        usadas.add(nombres[0])  # primera columna: se descartan las filas que no la traen
+
+        lector = pd.read_csv(f, sep='\t', engine='c', dtype=str, on_bad_lines='skip',
+                             usecols=lambda col: str(col).strip() in usadas, chunksize=filas_por_bloque)
+        with lector:
+            for bloque in lector:
+                bloque = bloque.dropna(subset=[bloque.columns[0]])
+                if not bloque.empty:
+                    yield bloque
+
+
+def leer_csv_intcomex(archivo_csv):
+    """El CSV completo (sólo columnas usadas) en un DataFrame."""
+    bloques = list(leer_csv_por_bloques(archivo_csv))
+    return pd.concat(bloques, ignore_index=True) if bloques else pd.DataFrame()
+
+
+def mapear_columnas(nombres):
+    """Ubica las columnas relevantes entre los nombres de la cabecera (None si el CSV no la trae)."""
+    return {
+        "sku": next((col for col in nombres if 'sku' in str(col).lower()), None),
+        "precio": next((col for col in nombres if 'precio' in str(col).lower()), None),
+        "stock": next((col for col in nombres if any(x in str(col).lower() for x in ['disponibilidad', 'existencia', 'disponibil'])), None),
+        "descripcion": next((col for col in nombres if any(x in str(col).lower() for x in ['nombre', 'descripción'])), None),
+        "atributos": next((col for col in nombres if 'atrib' in str(col).lower()), None),
+        "categoria": next((col for col in nombres if 'categor' in str(col).lower() and 'sub' not in str(col).lower()), None),
+        "subcategoria": next((col for col in nombres if 'subcategor' in str(col).lower()), None),
+    }
+
+
+# --- Caché de CSV ya procesados ---
+
+def hash_archivo(path, bloque=1 << 20):
+    """sha256 del contenido del archivo, leído por bloques."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for trozo in iter(lambda: f.read(bloque), b""):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def cargar_cache_csv(path=CACHE_CSV_FILE):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠ No se pudo leer {path}, se procesarán todos los CSV: {e}")
+        return {}
+
+
+def guardar_cache_csv(cache, path=CACHE_CSV_FILE):
+    try:
+        escritura_atomica(path, lambda f: json.dump(cache, f, indent=4, ensure_ascii=False))
+    except Exception as e:
+        print(f"⚠ No se pudo guardar {path}: {e}")
+
+
+def hash_origen(archivo_csv):
+    """Hash del CSV; para un archivo Parquet, el del CSV del que se archivó."""
+    if archivo_precios.es_archivo(archivo_csv):
+        return archivo_precios.metadatos(archivo_csv).get("hash_origen") or hash_archivo(archivo_csv)
+    return hash_archivo(archivo_csv)
+
+
+def firma_csv(archivo_csv, valid_keywords, valor_dolar, margen):
+    """Todo lo que determina el resultado de procesar un CSV: su contenido y los parámetros de la corrida."""
+    return {
+        "hash": hash_origen(archivo_csv),
+        "valor_dolar": valor_dolar,
+        "margen": margen,
+        "keywords": sorted(valid_keywords),
+    }
+
+
+def csv_sin_cambios(cache, categoria, firma):
+    """True si el último CSV procesado de la categoría tenía la misma firma."""
+    previa = cache.get(categoria)
+    return INGESTA_CACHE and previa is not None and all(previa.get(k) == v for k, v in firma.items())
+
+
+def registrar_en_cache(cache, categoria, firma, stats):
+    cache[categoria] = dict(firma, filas=stats.get("filas_leidas", 0), resultado=stats,
+                            procesado=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+
+# --- Etapa 2: normalización ---
+
+def _filas_vacias():
+    return {campo: [] for campo in COLUMNAS_NORMALIZADAS}
+
+
+def _valores_fila(row, columnas, valor_dolar, margen):
+    """Precio y stock de una fila ya filtrada: (costo, venta, stock) o None si no tiene precio válido."""
+    precio_usd = clean_price_to_float(row[columnas["precio"]])
+    if precio_usd is None or precio_usd <= 0:
+        return None
+
+    precio_costo_clp = round(precio_usd * valor_dolar)
+    precio_venta_clp = round(precio_costo_clp / (1 - margen))
+
+    stock_col = columnas["stock"]
+    stock = extract_stock_number(row[stock_col]) if stock_col and pd.notna(row[stock_col]) else 0
+    return precio_costo_clp, precio_venta_clp, stock
+
+
+def normalizar_filas(df, columnas, valid_keywords, valor_dolar, margen):
+    """
+    Ruta de referencia fila a fila (df.iterrows), tal como la hacía sincronizar_csv.
+    Devuelve (filas, conteo): filas es un dict de listas alineadas (COLUMNAS_NORMALIZADAS)
+    y conteo = {"filtrados": n, "errores": n}.
+    """
+    sku_col, desc_col = columnas["sku"], columnas["descripcion"]
+    cat_col, subcat_col = columnas["categoria"], columnas["subcategoria"]
+    filas = _filas_vacias()
+    conteo = {"filtrados": 0, "errores": 0}
+
+    for idx, row in df.iterrows():
+        try:
+            sku = str(row[sku_col]).strip() if sku_col and pd.notna(row[sku_col]) else None
+            if not sku: continue
+
+            # --- VALIDACIÓN DE CATEGORÍA ---
+            if valid_keywords:
+                cat_text = ""
+                if cat_col and pd.notna(row[cat_col]):
+                    cat_text += str(row[cat_col])
+                if subcat_col and pd.notna(row[subcat_col]):
+                    cat_text += " " + str(row[subcat_col])
+
+                # Si no hay ninguna palabra clave en el texto de categoría, saltar
+                if not es_valida(cat_text, valid_keywords):
+                    # Opcional: Loguear solo los primeros fallos para no saturar
+                    if conteo["filtrados"] < 3:
+                        print(f"    ⚠ Filtrado por categoría incorrecta: SKU {sku} ({cat_text[:30]}...)")
+                    conteo["filtrados"] += 1
+                    continue
+            # -------------------------------
+
+            description = str(row[desc_col]) if desc_col and pd.notna(row[desc_col]) else "Sin descripción"
+
+            # --- FILTRADO GENERALIZADO POR SUFIJO Y LIQUIDACIONES ---
+            sku_upper = sku.upper()
+            name_upper = description.upper()
+
+            # Excluir SKUs con sufijos especiales (ej: -B1, -RC, -EX, -S)
+            # Buscamos la presencia de un guión que indica una variante
+            is_special_suffix = '-' in sku_upper
+
+            # Excluir Liquidaciones y Ofertas (términos solicitados por el usuario)
+            is_liquidation = 'LIQUIDACION' in name_upper or 'OFERTA' in name_upper
+
+            if is_special_suffix or is_liquidation:
+                if conteo["filtrados"] < 10: # Loguear algunos ejemplos más
+                    motivo = f"Sufijo especial ({sku_upper})" if is_special_suffix else "Liquidación/Oferta"
+                    print(f"    🚫 Filtrado por {motivo}: SKU {sku} - {description[:40]}...")
+                conteo["filtrados"] += 1
+                continue
+            # --------------------------------------------------------
+
+            valores = _valores_fila(row, columnas, valor_dolar, margen)
+            if valores is None: continue
+
+            filas["sku"].append(sku)
+            filas["nombre"].append(description)
+            filas["cost_price"].append(valores[0])
+            filas["sale_price"].append(valores[1])
+            filas["stock"].append(valores[2])
+            filas["categoria_csv"].append(str(row[cat_col]) if cat_col and pd.notna(row[cat_col]) else None)
+            filas["subcategoria_csv"].append(str(row[subcat_col]) if subcat_col and pd.notna(row[subcat_col]) else None)
+        except:
+            conteo["errores"] += 1
+
+    return filas, conteo
+
+
+def _texto(df, col):
+    """(textos, presentes): la columna como str(valor) y la máscara de no nulos. None si no existe."""
+    if col is None:
+        return None, pd.Series(False, index=df.index)
+    serie = df[col]
+    presentes = serie.notna()
+    return serie.astype(object).where(presentes, "").astype(str), presentes
+
+
+def _es_numerica(serie):
+    return pd.api.types.is_numeric_dtype(serie.dtype)
+
+
+def _por_valores_distintos(serie, convertir, rellenos):
+    """
+    Aplica `convertir` (que devuelve una tupla de Series) sólo a los valores distintos de la
+    Series y expande el resultado a todas las filas. Los nulos reciben `rellenos`.
+    Devuelve None si no hay valores repetidos (no vale la pena).
+    """
+    codigos, distintos = pd.factorize(serie.astype(object))
+    if len(distintos) == len(serie):
+        return None
+    resultados = convertir(pd.Series(distintos, dtype=object))
+    expandidos = []
+    for resultado, relleno in zip(resultados, rellenos):
+        valores = resultado.to_numpy()
+        expandido = valores[codigos] if len(valores) else np.full(len(codigos), relleno, dtype=valores.dtype)
+        expandido[codigos < 0] = relleno
+        expandidos.append(pd.Series(expandido, index=serie.index))
+    return tuple(expandidos)
+
+
+def _precios_vectorizados(serie):
+    """
+    Precio USD de cada valor con la lógica de clean_price_to_float, por columnas.
+    Devuelve (precios float64 con NaN = sin precio, exoticos): los exóticos (tipos mezclados,
+    textos que no son un número limpio, infinitos) quedan para la ruta fila a fila.
+    """
+    if _es_numerica(serie):
+        precios = serie.astype("float64")
+        return precios, ~np.isfinite(precios) & precios.notna()
+
+    # Los mismos precios se repiten entre filas: cada texto distinto se convierte una vez
+    repetidos = _por_valores_distintos(serie, _precios_vectorizados, (np.nan, False))
+    if repetidos is not None:
+        return repetidos
+
+    valores = serie.astype(object)
+    presentes = valores.notna()
+    es_texto = valores.map(lambda v: isinstance(v, str))
+    exoticos = presentes & ~es_texto
+
+    limpio = valores.where(es_texto, "").astype(str).str.strip()
+    limpio = limpio.str.replace(_SIMBOLOS_PRECIO, '', regex=True)
+
+    coma = limpio.str.contains(",", regex=False)
+    punto = limpio.str.contains(".", regex=False)
+    largo = limpio.str.len()
+    decimal_coma = (limpio.str.count(",") == 1) & (largo - limpio.str.rfind(",") - 1 <= 2)
+    decimal_punto = (limpio.str.count(r"\.") == 1) & (largo - limpio.str.rfind(".") - 1 <= 2)
+
+    sin_puntos = limpio.str.replace(".", "", regex=False)
+    sin_comas = limpio.str.replace(",", "", regex=False)
+    coma_a_punto = limpio.str.replace(",", ".", regex=False)
+    limpio = limpio.mask(coma & punto, sin_puntos.str.replace(",", ".", regex=False))
+    limpio = limpio.mask(coma & ~punto & decimal_coma, coma_a_punto)
+    limpio = limpio.mask(coma & ~punto & ~decimal_coma, sin_comas)
+    limpio = limpio.mask(punto & ~coma & ~decimal_punto, sin_puntos)
+
+    numeros = pd.to_numeric(limpio.where(es_texto), errors="coerce").astype("float64")
+    validos = es_texto & numeros.notna() & np.isfinite(numeros.fillna(0))
+
+    precios = pd.Series(np.nan, index=serie.index, dtype="float64")
+    if validos.any():
+        try:
+            # float() de Python (vía astype) para que el redondeo sea bit a bit el de clean_price_to_float
+            precios[validos] = limpio[validos].astype(object).to_numpy().astype("float64")
+        except ValueError:
+            validos &= False
+    exoticos |= es_texto & ~validos
+    return precios, exoticos
+
+
+def _stocks_vectorizados(serie):
+    """Stock con la lógica de extract_stock_number: (stocks int64, exoticos para la ruta fila a fila)."""
+    presentes = serie.notna()
+    stocks = pd.Series(0, index=serie.index, dtype="int64")
+
+    if _es_numerica(serie):
+        numeros = serie.astype("float64")
+        seguros = presentes & np.isfinite(numeros.fillna(0)) & (numeros.abs() < _LIMITE_EXACTO)
+        stocks[seguros] = numeros[seguros].astype("int64")
+        return stocks, presentes & ~seguros
+
+    repetidos = _por_valores_distintos(serie, _stocks_vectorizados, (0, False))
+    if repetidos is not None:
+        return repetidos
+
+    valores = serie.astype(object)
+    es_texto = valores.map(lambda v: isinstance(v, str))
+    texto = valores.where(es_texto, "").astype(str).str.lower().str.strip()
+    digitos = texto.str.extract(f"({_PRIMER_NUMERO.pattern})", expand=False)
+    con_numero = es_texto & digitos.notna()
+    # Dígitos no ASCII (int() los acepta) o números enormes: fila a fila
+    seguros = con_numero & digitos.fillna("").str.fullmatch(r"[0-9]{1,18}")
+    stocks[seguros] = digitos[seguros].astype("int64")
+
+    disponible = texto.str.contains("disponible", regex=False) | texto.str.contains("en stock", regex=False)
+    stocks[es_texto & ~con_numero & disponible] = 1
+    return stocks, presentes & ~es_texto | con_numero & ~seguros
+
+
+def parse_prices(serie):
+    """
+    clean_price_to_float sobre una Series completa ("1.234,56", "487,50", "$ 150.000", números...).
+    Devuelve float64 con NaN donde la versión escalar devuelve None.
+    """
+    precios, exoticos = _precios_vectorizados(serie)
+    if exoticos.any():
+        convertidos = [clean_price_to_float(v) for v in serie[exoticos].astype(object)]
+        precios[exoticos] = [np.nan if v is None else v for v in convertidos]
+    return precios
+
+
+def parse_stock(serie):
+    """
+    extract_stock_number sobre una Series completa ("Más de 20", "Disponible", "15"...), con 0 en
+    los nulos (igual que la ingesta). int64, u object si algún valor no cabe en 64 bits.
+    """
+    stocks, exoticos = _stocks_vectorizados(serie)
+    if exoticos.any():
+        convertidos = [extract_stock_number(v) for v in serie[exoticos].astype(object)]
+        if any(abs(v) >= 2 ** 63 for v in convertidos):
+            stocks = stocks.astype(object)
+        stocks[exoticos] = convertidos
+    return stocks
+
+
+def _mostrar_filtrados(skus, textos_cat, descripciones, por_categoria):
+    """Reproduce los ejemplos de filtrado que imprime la ruta fila a fila (los primeros 10)."""
+    for n, (sku, cat_text, description, categoria) in enumerate(zip(skus, textos_cat, descripciones, por_categoria)):
+        if categoria:
+            if n < 3:
+                print(f"    ⚠ Filtrado por categoría incorrecta: SKU {sku} ({cat_text[:30]}...)")
+        else:
+            sku_upper = sku.upper()
+            motivo = f"Sufijo especial ({sku_upper})" if '-' in sku_upper else "Liquidación/Oferta"
+            print(f"    🚫 Filtrado por {motivo}: SKU {sku} - {description[:40]}...")
+
+
+def normalizar_vectorizado(df, columnas, valid_keywords, valor_dolar, margen):
+    """
+    Igual que normalizar_filas, pero con máscaras y operaciones sobre columnas completas.
+    Las filas con valores fuera de lo común (tipos mezclados, precios no parseables, números
+    enormes) se resuelven con la misma función fila a fila, así el resultado es idéntico.
+    """
+    conteo = {"filtrados": 0, "errores": 0}
+    if df.empty:
+        return _filas_vacias(), conteo
+    df = df.reset_index(drop=True)
+
+    skus, con_sku = _texto(df, columnas["sku"])
+    if skus is None:
+        return _filas_vacias(), conteo
+    skus = skus.str.strip()
+    candidatos = con_sku & (skus != "")
+
+    cats, con_cat = _texto(df, columnas["categoria"])
+    subcats, con_subcat = _texto(df, columnas["subcategoria"])
+
+    # --- VALIDACIÓN DE CATEGORÍA ---
+    por_categoria = pd.Series(False, index=df.index)
+    textos_cat = None
+    if valid_keywords:
+        textos_cat = cats if cats is not None else pd.Series("", index=df.index)
+        if subcats is not None:
+            textos_cat = textos_cat + (" " + subcats).where(con_subcat, "")
+        por_categoria = candidatos & ~mascara_valida(textos_cat, valid_keywords)
+
+    # --- FILTRADO POR SUFIJO Y LIQUIDACIONES ---
+    descripciones, _ = _texto(df, columnas["descripcion"])
+    if descripciones is None:
+        descripciones = pd.Series("Sin descripción", index=df.index)
+    else:
+        descripciones = descripciones.where(df[columnas["descripcion"]].notna(), "Sin descripción")
+    por_sufijo = skus.str.contains("-", regex=False) | descripciones.str.upper().str.contains("LIQUIDACION|OFERTA", regex=True)
+    por_sufijo &= candidatos & ~por_categoria
+
+    filtrados = por_categoria | por_sufijo
+    conteo["filtrados"] = int(filtrados.sum())
+    if conteo["filtrados"]:
+        primeros = filtrados[filtrados].index[:10]
+        _mostrar_filtrados(skus[primeros], (textos_cat[primeros] if textos_cat is not None else [""] * len(primeros)),
+                           descripciones[primeros], por_categoria[primeros])
+
+    aceptados = candidatos & ~filtrados
+    if columnas["precio"] is None:
+        # La ruta fila a fila falla al leer row[None] y cuenta cada fila como error
+        conteo["errores"] = int(aceptados.sum())
+        return _filas_vacias(), conteo
+
+    sub = df[aceptados]
+    if sub.empty:
+        return _filas_vacias(), conteo
+
+    # --- PRECIOS ---
+    precios, exoticos = _precios_vectorizados(sub[columnas["precio"]])
+    costos = np.round(precios * valor_dolar)
+    ventas = np.round(costos / (1 - margen))
+    exoticos |= precios.notna() & (precios > 0) & ~(ventas.abs() < _LIMITE_EXACTO)
+    con_precio = precios.notna() & (precios > 0) & ~exoticos
+
+    # --- STOCK ---
+    if columnas["stock"]:
+        stocks, stock_exotico = _stocks_vectorizados(sub[columnas["stock"]])
+        exoticos |= con_precio & stock_exotico
+        con_precio &= ~stock_exotico
+    else:
+        stocks = pd.Series(0, index=sub.index, dtype="int64")
+
+    costo_lista = costos.where(con_precio, 0).astype("int64").tolist()
+    venta_lista = ventas.where(con_precio, 0).astype("int64").tolist()
+    stock_lista = stocks.tolist()
+    incluir = con_precio.tolist()
+
+    # Filas exóticas: misma lógica que la referencia, leyendo sólo las columnas de precio y stock
+    crudas = {col: sub[col].astype(object).to_numpy() for col in (columnas["precio"], columnas["stock"]) if col}
+    for pos in np.flatnonzero(exoticos.to_numpy()):
+        try:
+            fila = {col: cruda[pos] for col, cruda in crudas.items()}
+            valores = _valores_fila(fila, columnas, valor_dolar, margen)
+        except Exception:
+            conteo["errores"] += 1
+            continue
+        if valores is not None:
+            costo_lista[pos], venta_lista[pos], stock_lista[pos] = valores
+            incluir[pos] = True
+
+    def columna(serie):
+        return [v for v, ok in zip(serie, incluir) if ok]
+
+    def opcional(textos, presentes):
+        if textos is None:
+            return [None] * sum(incluir)
+        return columna(textos[aceptados].astype(object).where(presentes[aceptados], None).tolist())
+
+    filas = {
+        "sku": columna(skus[aceptados].tolist()),
+        "nombre": columna(descripciones[aceptados].tolist()),
+        "cost_price": columna(costo_lista),
+        "sale_price": columna(venta_lista),
+        "stock": columna(stock_lista),
+        "categoria_csv": opcional(cats, con_cat),
+        "subcategoria_csv": opcional(subcats, con_subcat),
+    }
+    return filas, conteo
+
+
+def normalizar(df, columnas, valid_keywords, valor_dolar, margen):
+    """Normaliza con la ruta configurada en INGESTA_MODO."""
+    if INGESTA_MODO == "filas":
+        return normalizar_filas(df, columnas, valid_keywords, valor_dolar, margen)
+    return normalizar_vectorizado(df, columnas, valid_keywords, valor_dolar, margen)
+
+
+def _escritor_archivo(archivo_csv, categoria):
+    """
+    Escritor del archivo Parquet para el CSV de la categoría, o None si no se archiva
+    (también si ya hay un archivo de la categoría con el mismo contenido).
+    """
+    if not categoria or archivo_precios.es_archivo(archivo_csv) or not archivo_precios.disponible():
+        return None
+    try:
+        hash_origen = hash_archivo(archivo_csv)
+        existente = archivo_precios.ya_archivado(categoria, hash_origen)
+        if existente:
+            print(f"  📦 CSV de '{categoria}' ya archivado en {existente}")
+            return None
+        return archivo_precios.EscritorArchivo(categoria, archivo_csv, hash_origen)
+    except Exception as e:
+        print(f"  ⚠ No se archivará el CSV de '{categoria}': {e}")
+        return None
+
+
+def _bloque_tipado(bloque):
+    """Copia del bloque con precio (float64, NaN = sin precio) y stock (int64) ya parseados, para archivarlo."""
+    columnas = mapear_columnas(bloque.columns)
+    tipado = bloque.copy()
+    if columnas["precio"]:
+        tipado[columnas["precio"]] = parse_prices(bloque[columnas["precio"]])
+    if columnas["stock"]:
+        stocks = parse_stock(bloque[columnas["stock"]])
+        if stocks.dtype == object:
+            # Algún valor no cabe en 64 bits: queda nulo en el archivo
+            stocks = pd.array([v if abs(v) < 2 ** 63 else None for v in stocks], dtype="Int64")
+        tipado[columnas["stock"]] = stocks
+    return tipado
+
+
+def normalizar_csv(archivo_csv, valid_keywords, valor_dolar, margen, categoria=None):
+    """
+    Lee y normaliza el CSV bloque a bloque: en memoria queda un bloque crudo a la vez más las
+    filas ya normalizadas. Devuelve (filas, conteo, filas_leidas).
+    Acepta también un archivo Parquet de archivo_precios (re-ingesta). Con `categoria`, el CSV
+    procesado con éxito queda archivado en Parquet, con precio y stock ya parseados.
+    """
+    filas = _filas_vacias()
+    conteo = {"filtrados": 0, "errores": 0}
+    filas_leidas = 0
+    if archivo_precios.es_archivo(archivo_csv):
+        bloques = archivo_precios.leer_archivo_por_bloques(archivo_csv, FILAS_POR_BLOQUE)
+    else:
+        bloques = leer_csv_por_bloques(archivo_csv)
+    archivo = _escritor_archivo(archivo_csv, categoria)
+    try:
+        for bloque in bloques:
+            filas_leidas += len(bloque)
+            if archivo is not None:
+                try:
+                    archivo.escribir(_bloque_tipado(bloque))
+                except Exception as e:
+                    # El archivo es un registro: si falla, la ingesta sigue sin él
+                    print(f"  ⚠ No se pudo archivar el CSV de '{categoria}': {e}")
+                    archivo.descartar()
+                    archivo = None
+            filas_bloque, conteo_bloque = normalizar(bloque, mapear_columnas(bloque.columns), valid_keywords, valor_dolar, margen)
+            for campo in COLUMNAS_NORMALIZADAS:
+                filas[campo].extend(filas_bloque[campo])
+            conteo["filtrados"] += conteo_bloque["filtrados"]
+            conteo["errores"] += conteo_bloque["errores"]
+    except BaseException:
+        if archivo is not None:
+            archivo.descartar()
+        raise
+
+    if archivo is not None:
+        try:
+            path = archivo.confirmar()
+            if path:
+                print(f"  📦 CSV de '{categoria}' archivado en {path}")
+        except Exception as e:
+            archivo.descartar()
+            print(f"  ⚠ No se pudo archivar el CSV de '{categoria}': {e}")
+    return filas, conteo, filas_leidas
+
+
+def _normalizar_categoria(trabajo):
+    """Tarea de un proceso del pool: (categoria, archivo_csv, keywords, valor_dolar, margen) -> resultado."""
+    categoria, archivo_csv, valid_keywords, valor_dolar, margen = trabajo
+    print(f"  ⏳ Parseando CSV de '{categoria}' (pid {os.getpid()})...")
+    return normalizar_csv(archivo_csv, valid_keywords, valor_dolar, margen, categoria=categoria)
+
+
+def procesos_ingesta(cantidad_trabajos, pedido=None):
+    """Procesos a usar: el pedido (o uno por núcleo hasta el máximo) acotado por trabajos y memoria libre."""
+    pedido = pedido or INGESTA_PROCESOS or min(os.cpu_count() or 1, INGESTA_PROCESOS_MAX)
+    procesos = max(1, min(pedido, cantidad_trabajos))
+    libre = memoria_disponible_mb()
+    if libre is not None:
+        procesos = max(1, min(procesos, int(libre // MB_POR_PROCESO_INGESTA)))
+    return procesos
+
+
+def normalizar_en_paralelo(trabajos, procesos=None):
+    """
+    Parsea y normaliza varios CSV a la vez, uno por proceso (ProcessPoolExecutor).
+    trabajos: lista de (categoria, archivo_csv, keywords, valor_dolar, margen).
+    Devuelve {categoria: (filas, conteo, filas_leidas) o la excepción que la hizo fallar},
+    en el mismo orden de `trabajos`. Con un solo trabajo o un proceso se resuelve en este proceso.
+    """
+    procesos = procesos_ingesta(len(trabajos), procesos)
+    resultados = {}
+    if procesos <= 1:
+        for trabajo in trabajos:
+            try:
+                resultados[trabajo[0]] = _normalizar_categoria(trabajo)
+            except Exception as e:
+                resultados[trabajo[0]] = e
+        return resultados
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = [(trabajo[0], pool.submit(_normalizar_categoria, trabajo)) for trabajo in trabajos]
+        for categoria, futuro in futuros:
+            try:
+                resultados[categoria] = futuro.result()
+            except Exception as e:
+                resultados[categoria] = e
+    return resultados
+
+
+# --- Etapa 3: fusión en el estado ---
+
+def huella_woo(nombre, sale_price, stock, categoria_principal, categoria_csv, subcategoria_csv):
+    """Huella de los campos que se publican en WooCommerce (nombre, precio de venta, stock, categorías)."""
+    contenido = "\x1f".join(str(v) for v in (nombre, sale_price, stock, categoria_principal, categoria_csv, subcategoria_csv))
+    return hashlib.blake2b(contenido.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _asignar(producto, campo, valor):
+    # Sin asignar lo que no cambió, el SKU no queda marcado como modificado en el estado
+    if campo not in producto or producto[campo] != valor:
+        producto[campo] = valor
+
+
+_SIN_CAMPO = object()
+
+
+class HuellasCorrida:
+    """
+    Huella Woo de cada SKU tal como estaba antes de la corrida, compartida por todas las categorías.
+    Un SKU que viene en el CSV de varias categorías se fusiona una vez por cada una y su
+    categoria_principal alterna entre ellas (gana la última, en el orden de config/categories.json);
+    comparando contra la huella previa a la corrida (y no contra la que dejó la categoría anterior)
+    sólo queda pendiente_sync_woo si su contenido final cambió.
+    """
+
+    def __init__(self):
+        # sku -> (huella_woo, pendiente_sync_woo, last_updated) antes de la corrida; None si era nuevo
+        self.previas = {}
+        # sku -> stats de la categoría que lo contó en cambios_woo
+        self.marcados = {}
+
+    def recordar(self, sku, producto, is_new):
+        if sku not in self.previas:
+            self.previas[sku] = None if is_new else tuple(
+                producto.get(campo, _SIN_CAMPO) for campo in ("huella_woo", "pendiente_sync_woo", "last_updated"))
+        return self.previas[sku]
+
+    def marcar(self, sku, stats):
+        anterior = self.marcados.get(sku)
+        if anterior is not stats:
+            if anterior is not None:
+                anterior["cambios_woo"] -= 1
+            stats["cambios_woo"] += 1
+            self.marcados[sku] = stats
+
+    def desmarcar(self, sku, producto):
+        """El SKU volvió a su contenido previo: se restauran los campos que otra categoría había tocado."""
+        anterior = self.marcados.pop(sku, None)
+        if anterior is None:
+            return
+        anterior["cambios_woo"] -= 1
+        for campo, valor in zip(("huella_woo", "pendiente_sync_woo", "last_updated"), self.previas[sku]):
+            if valor is _SIN_CAMPO:
+                producto.pop(campo, None)
+            else:
+                _asignar(producto, campo, valor)
+
+
+def claves_previas(sku):
+    """
+    Claves con que se guardaba un SKU numérico cuando el CSV se leía infiriendo tipos: pandas lo
+    parseaba como int (sin ceros a la izquierda) o como float si la columna traía vacíos ('123.0').
+    """
+    if not (sku.isascii() and sku.isdigit()):
+        return []
+    numero = int(sku)
+    return [clave for clave in (str(numero), str(float(numero))) if clave != sku]
+
+
+def alinear_skus(state, filas, buscar_en_otras=True):
+    """
+    Reemplaza en filas["sku"] los SKUs numéricos que no están en el estado por la clave con que ya
+    se guardaron (claves_previas), para que un producto existente no aparezca como nuevo. Una clave
+    previa que también viene como SKU en el mismo CSV es otro producto y no se toca.
+    Llamar antes de marcar en_csv_reciente y de fusionar_en_estado. Devuelve cuántos se reemplazaron.
+    """
+    skus = filas["sku"]
+    propios = set(skus)
+    alineados = 0
+    for i, sku in enumerate(skus):
+        if sku in state:
+            continue
+        previas = [clave for clave in claves_previas(sku) if clave not in propios]
+        if not previas or buscar_en_otras and find_product(sku) is not None:
+            continue
+        for clave in previas:
+            if clave in state or buscar_en_otras and find_product(clave) is not None:
+                skus[i] = clave
+                alineados += 1
+                break
+    return alineados
+
+
+def fusionar_en_estado(state, filas, category_name, stats, buscar_en_otras=True, huellas=None):
+    """
+    Aplica las filas normalizadas al estado de la categoría (en el orden del CSV).
+    Actualiza stats (procesados/creados/actualizados/cambios_woo/errores) y devuelve los SKUs nuevos.
+    Un SKU queda pendiente_sync_woo (y con last_updated nuevo) sólo si es nuevo o cambió su huella_woo.
+    Con buscar_en_otras=False el estado ya es el catálogo completo y un SKU ausente es nuevo.
+    Al procesar varias categorías en una corrida, todas deben compartir las mismas `huellas`
+    (HuellasCorrida) para que un SKU repetido entre categorías no cuente como cambio.
+    """
+    if huellas is None:
+        huellas = HuellasCorrida()
+    nuevos_skus = []
+    ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for sku, nombre, costo, venta, stock, categoria_csv, subcategoria_csv in zip(*(filas[c] for c in COLUMNAS_NORMALIZADAS)):
+        try:
+            is_new = False
+            if sku not in state and buscar_en_otras:
+                # Puede existir en otra categoría (se mueve a ésta); si no, es nuevo
+                existente = find_product(sku)
+                if existente is not None:
+                    state[sku] = existente
+                else:
+                    is_new = True
+            elif sku not in state:
+                is_new = True
+
+            if is_new:
+                state[sku] = ProductRecord({
+                    "tiene_imagen": False,
+                    "subido_a_woo": False,
+                    "ia_mejorado": False,
+                    "ia_intentos": 0
+                })
+
+            producto = state[sku]
+            previa = huellas.recordar(sku, producto, is_new)
+            _asignar(producto, "sku", sku)
+            _asignar(producto, "nombre", nombre)
+            _asignar(producto, "cost_price", costo)
+            _asignar(producto, "sale_price", venta)
+            _asignar(producto, "stock", stock)
+            _asignar(producto, "categoria_principal", category_name)
+            _asignar(producto, "categoria_csv", categoria_csv)
+            _asignar(producto, "subcategoria_csv", subcategoria_csv)
+            _asignar(producto, "en_csv_reciente", True)
+
+            # Sólo lo que cambió para WooCommerce (respecto de antes de la corrida) queda pendiente de subir
+            huella = huella_woo(nombre, venta, stock, category_name, categoria_csv, subcategoria_csv)
+            if previa is None or previa[0] != huella:
+                if producto.huella_woo != huella:
+                    producto.huella_woo = huella
+                    producto.last_updated = ahora
+                    producto.pendiente_sync_woo = True
+                huellas.marcar(sku, stats)
+            else:
+                huellas.desmarcar(sku, producto)
+
+            if is_new:
+                stats["creados"] += 1
+                nuevos_skus.append(sku)
+            else:
+                stats["actualizados"] += 1
+
+            stats["procesados"] += 1
+        except:
+            stats["errores"] += 1
+    return nuevos_skus
@@ -1,32 +1,10 @@
 # inventory_cleaner.py
 # Gestor de Inventario Inteligente v1.0
 
-import os
-import json
 import time
 from datetime import datetime
-from woocommerce import API
 from sync_bot import init_woocommerce_api
-
-# Configuración de Rutas
-DATA_PATH = "data_activa"
-STATE_FILE = os.path.join(DATA_PATH, "estado_productos.json")
-
-def load_state():
-    if os.path.exists(STATE_FILE):
-        try:
-            with open(STATE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
-
-def save_state(state):
-    try:
-        with open(STATE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(state, f, indent=4, ensure_ascii=False)
-    except Exception as e:
-        print(f"✗ Error al guardar {STATE_FILE}: {e}")
+from state_store import load_state, save_state, query_skus
 
 def get_all_woo_products(wcapi):
     """Obtiene todos los productos publicados de WooCommerce."""
@@ -62,7 +40,7 @@ def run_inventory_cleaner():
     woo_products = get_all_woo_products(wcapi)
     
     skus_in_woo = {p['sku']: p['id'] for p in woo_products if p.get('sku')}
-    skus_in_csv = {sku for sku, data in state.items() if data.get('en_csv_reciente', True)}
+    skus_in_csv = set(query_skus("en_catalogo"))
     
     updates = []
     counters = {
@@ -88,7 +66,7 @@ def run_inventory_cleaner():
             counters["fuera_catalogo"] += 1
             
         elif sku in state:
-            stock = state[sku].get("stock", 0)
+            stock = state[sku].stock
             if stock <= 2:
                 # Stock bajo
                 print(f"  🛡️ SKU {sku} stock crítico ({stock}). Pasando a borrador.")
@@ -109,9 +87,9 @@ def run_inventory_cleaner():
 
     # 2. Regla de Re-activación para SKUs en el estado (que podrían estar en draft)
     for sku, data in state.items():
-        if sku in skus_in_csv and data.get("stock", 0) > 2:
-            if data.get("status_web") == "borrador" or (sku not in skus_in_woo and data.get("woo_id")):
-                woo_id = data.get("woo_id")
+        if sku in skus_in_csv and data.stock > 2:
+            if data.status_web == "borrador" or (sku not in skus_in_woo and data.woo_id):
+                woo_id = data.woo_id
                 if woo_id:
                     print(f"  🚀 SKU {sku} recuperó stock. Re-publicando.")
                     updates.append({"id": woo_id, "status": "publish"})
@@ -17,6 +17,7 @@ from ia_webhook_trigger import run_ia_webhook_trigger
 from generate_stats import generate_daily_snapshot
 from system_health import run_health_check
 from activity_logger import log_activity
+from state_store import query_skus, compact_state
 
 # Importar credenciales
 try:
@@ -92,15 +93,6 @@ def enviar_alerta_emergencia(error):
     except Exception as e:
         print(f"❌ Falló envío de alerta por Telegram: {e}")
 
-def load_state():
-    if os.path.exists(STATE_FILE):
-        try:
-            with open(STATE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
-
 def enviar_reporte_consolidado(resumen, error_critico=None):
     """Envía el reporte final consolidado por email."""
     print("\n📧 Enviando reporte consolidado...")
@@ -147,6 +139,8 @@ def enviar_reporte_consolidado(resumen, error_critico=None):
                     <li>Productos Procesados: {sync.get('stats', {}).get('productos_procesados', 0)}</li>
                     <li>Nuevos SKUs Creados: {sync.get('stats', {}).get('productos_creados', 0)}</li>
                     <li>Actualizados: {sync.get('stats', {}).get('productos_actualizados', 0)}</li>
+                    <li>Con cambios para WooCommerce: {sync.get('stats', {}).get('productos_cambiados_woo', 0)}</li>
+                    <li>Categorías sin cambios (CSV idéntico): {sync.get('stats', {}).get('categorias_sin_cambios', 0)}</li>
                 </ul>
             </div>
         """
@@ -240,7 +234,9 @@ def enviar_reporte_telegram(resumen, error_critico=None):
         texto += f"Estado: {'✅ Completado' if sync.get('status') == 'OK' else '❌ Falló/Pendiente'}\n"
         texto += f"Procesados: {sync.get('stats', {}).get('productos_procesados', 0)}\n"
         texto += f"Nuevos SKUs: {sync.get('stats', {}).get('productos_creados', 0)}\n"
-        texto += f"Actualizados: {sync.get('stats', {}).get('productos_actualizados', 0)}\n\n"
+        texto += f"Actualizados: {sync.get('stats', {}).get('productos_actualizados', 0)}\n"
+        texto += f"Cambios para Woo: {sync.get('stats', {}).get('productos_cambiados_woo', 0)}\n"
+        texto += f"Categorías sin cambios: {sync.get('stats', {}).get('categorias_sin_cambios', 0)}\n\n"
         
         imgs = resumen.get("imagenes", {})
         texto += "🖼️ *FASE B: Imágenes*\n"
@@ -348,10 +344,7 @@ def main():
         # FASE B: Deep Scan de Imágenes
         # Basado en estado: buscamos qué productos en el JSON no tienen imagen
         if mode in ['all', 'images']:
-            state = load_state()
-            skus_sin_imagen = [sku for sku, data in state.items() 
-                               if (not data.get("tiene_imagen") or data.get("placeholder_personalizado")) 
-                               and data.get("stock", 0) > 0]
+            skus_sin_imagen = query_skus("sin_imagen")
             
             if skus_sin_imagen:
                 print(f"\n[FASE B] Iniciando Deep Scan para {len(skus_sin_imagen)} SKUs...")
@@ -364,11 +357,8 @@ def main():
 
         # FASE C: Vinculación WooCommerce y Datos
         if mode in ['all', 'upload', 'resume']:
-            state = load_state()
             # Pendientes: O tienen imagen nueva, o tienen cambios de precio/stock no sincronizados
-            pending_upload = [sku for sku, data in state.items() 
-                             if (data.get("tiene_imagen") and not data.get("subido_a_woo")) 
-                             or data.get("pendiente_sync_woo")]
+            pending_upload = query_skus("pendiente_woo")
             
             # En modo local, forzamos que si tiene imagen local y no esta en woo, vaya a upload
             # Esto ya está cubierto arriba, pero aseguramos
@@ -408,6 +398,8 @@ def main():
         print("\n📈 Actualizando Dashboard de KPIs...")
         log_activity("Actualizando Dashboard y métricas de ROI", "Sistema", "fa-chart-pie")
         run_health_check()
+        # Plegar el journal de cambios en el snapshot antes de generar métricas
+        compact_state()
         generate_daily_snapshot(nuevos_count=nuevos_count, duration=duration)
         
         # Enviar reporte final siempre que haya ocurrido algo o haya un error
@@ -1,6 +1,5 @@
-import os
-import json
 from woocommerce import API
+from state_store import load_state, save_state
 
 try:
     from credentials import WC_URL, WC_CONSUMER_KEY, WC_CONSUMER_SECRET
@@ -8,9 +7,6 @@ except ImportError:
     print("Error cargando credenciales.")
     exit(1)
 
-DATA_PATH = "data_activa"
-STATE_FILE = os.path.join(DATA_PATH, "estado_productos.json")
-
 wcapi = API(
     url=WC_URL,
     consumer_key=WC_CONSUMER_KEY,
@@ -21,13 +17,11 @@ wcapi = API(
 
 def migrate():
     print("🔍 Iniciando migración de estado de IA desde WooCommerce...")
-    if not os.path.exists(STATE_FILE):
+    state = load_state()
+    if not state:
         print("Error: No existe el archivo de estado local.")
         return
 
-    with open(STATE_FILE, 'r', encoding='utf-8') as f:
-        state = json.load(f)
-
     # Filtrar productos subidos
     subidos = [sku for sku, data in state.items() if data.get("subido_a_woo")]
     print(f"Productos subidos a Woo: {len(subidos)}")
@@ -49,8 +43,7 @@ def migrate():
         except:
             continue
 
-    with open(STATE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(state, f, indent=4, ensure_ascii=False)
+    save_state(state)
     
     print(f"✅ Migración finalizada. {count} productos marcados como IA_MEJORADO en el JSON local.")
 
@@ -0,0 +1,59 @@
+# perfil_rapido.py
+# "Perfil rápido" para los Chrome que navegan Intcomex (sync_bot.crear_driver e image_bot.setup_driver).
+# - Carga "eager": driver.get() vuelve con el DOM listo, sin esperar imágenes ni iframes; los
+#   flujos ya esperan sus elementos con WebDriverWait.
+# - Bloqueo por CDP (Network.setBlockedURLs) de imágenes, video/audio, fuentes, hosts de publicidad
+#   y analítica, y de los recursos de los popups promocionales: el popup no llega a cargarse y
+#   close_banners() casi nunca encuentra algo que cerrar.
+# Las hojas de estilo y los scripts propios del sitio se cargan igual (el botón CSV, el login y el
+# encabezado con el dólar los necesitan). El src de las imágenes sigue en el HTML, así que
+# image_bot puede leerlo aunque la imagen no se descargue.
+# PERFIL_RAPIDO=false vuelve al perfil completo; PERFIL_BLOQUEOS_EXTRA agrega patrones (separados por coma).
+
+import os
+
+PERFIL_RAPIDO = os.getenv("PERFIL_RAPIDO", "true").lower() == "true"
+
+BLOQUEO_RECURSOS = [
+    # Imágenes
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    # Video y audio
+    "*.mp4", "*.webm", "*.ogg", "*.mp3", "*.m3u8",
+    # Fuentes
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+]
+BLOQUEO_HOSTS = [
+    # Publicidad y analítica
+    "*google-analytics.com*", "*googletagmanager.com*", "*googlesyndication.com*", "*googleadservices.com*",
+    "*doubleclick.net*", "*facebook.net*", "*facebook.com/tr*", "*hotjar.com*", "*clarity.ms*",
+    "*newrelic.com*", "*nr-data.net*", "*bing.com/bat*", "*linkedin.com/px*", "*tiktok.com*",
+    # Chat y popups promocionales (los que cierra close_banners: .popin_img_img, .popup-close)
+    "*popin*", "*zopim*", "*zendesk.com/embeddable*", "*onesignal.com*",
+]
+
+
+def patrones_bloqueados():
+    extra = [p.strip() for p in os.getenv("PERFIL_BLOQUEOS_EXTRA", "").split(",") if p.strip()]
+    return BLOQUEO_RECURSOS + BLOQUEO_HOSTS + extra
+
+
+def aplicar_opciones(chrome_options, rapido=None):
+    """Opciones de arranque del perfil rápido (antes de crear el driver)."""
+    if PERFIL_RAPIDO if rapido is None else rapido:
+        chrome_options.page_load_strategy = "eager"
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--mute-audio")
+    return chrome_options
+
+
+def aplicar_bloqueos(driver, rapido=None):
+    """Activa el bloqueo de recursos por CDP en el driver ya creado. Devuelve True si quedó activo."""
+    if not (PERFIL_RAPIDO if rapido is None else rapido):
+        return False
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patrones_bloqueados()})
+        return True
+    except Exception as e:
+        print(f"  ⚠ No se pudo activar el bloqueo de recursos del perfil rápido: {e}")
+        return False
@@ -0,0 +1,169 @@
+# pool_navegadores.py
+# Descarga de CSV de categoría con varios navegadores a la vez.
+# El driver ya autenticado es el primer contexto del pool; los demás se crean con la fábrica
+# recibida (sync_bot.crear_driver) y reciben una copia de su sesión, sin repetir el login.
+# Cada contexto toma categorías de una cola común y descarga en su propio directorio
+# (sync_bot.preparar_descarga). Una categoría que falla se reintenta (de preferencia en otro
+# contexto) y un navegador que se cae sale del pool sin afectar a los demás.
+# El tamaño del pool se limita por la memoria disponible del contenedor (cgroup) o del equipo.
+
+import os
+import threading
+
+# Navegadores simultáneos: 0 = automático según memoria (hasta DESCARGA_NAVEGADORES_MAX)
+DESCARGA_NAVEGADORES = int(os.getenv("DESCARGA_NAVEGADORES", "0"))
+DESCARGA_NAVEGADORES_MAX = int(os.getenv("DESCARGA_NAVEGADORES_MAX", "4"))
+# Memoria que se reserva por cada Chrome headless adicional
+MB_POR_NAVEGADOR = int(os.getenv("MB_POR_NAVEGADOR", "500"))
+# Reintentos por categoría después del primer intento
+DESCARGA_REINTENTOS = int(os.getenv("DESCARGA_REINTENTOS", "1"))
+
+
+def _leer_entero(path):
+    try:
+        with open(path, 'r') as f:
+            valor = f.read().strip()
+        return None if valor == "max" else int(valor)
+    except (OSError, ValueError):
+        return None
+
+
+def memoria_disponible_mb():
+    """
+    Memoria libre para nuevos procesos, en MB: límite del cgroup (Docker) menos lo usado si hay
+    límite; si no, MemAvailable del sistema. None si no se puede saber (p. ej. fuera de Linux).
+    """
+    for limite_path, uso_path in (("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+                                  ("/sys/fs/cgroup/memory/memory.limit_in_bytes", "/sys/fs/cgroup/memory/memory.usage_in_bytes")):
+        limite, uso = _leer_entero(limite_path), _leer_entero(uso_path)
+        # cgroup v1 sin límite informa un número enorme
+        if limite and uso is not None and limite < 1 << 50:
+            return max(limite - uso, 0) / (1024 * 1024)
+    try:
+        with open("/proc/meminfo", 'r') as f:
+            for linea in f:
+                if linea.startswith("MemAvailable:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def tamano_pool(cantidad_categorias, pedido=None):
+    """Contextos a usar: el pedido (o el máximo) acotado por categorías y por memoria libre."""
+    pedido = pedido or DESCARGA_NAVEGADORES or DESCARGA_NAVEGADORES_MAX
+    tamano = max(1, min(pedido, cantidad_categorias))
+    libre = memoria_disponible_mb()
+    if libre is not None:
+        # El primer contexto ya existe: sólo los adicionales consumen memoria nueva
+        tamano = max(1, min(tamano, 1 + int(libre // MB_POR_NAVEGADOR)))
+    return tamano
+
+
+def descargar_en_pool(categorias, driver_principal, crear_driver, descargar, clonar_sesion, tamano=None):
+    """
+    Descarga {categoria: url} repartiendo las categorías entre los contextos del pool.
+    descargar(driver, categoria, url) -> ruta o None; clonar_sesion(driver_nuevo) copia la sesión
+    del driver principal. Devuelve ({categoria: ruta}, [categorias_fallidas]). Los drivers
+    adicionales se cierran al terminar; el principal queda abierto (lo cierra quien lo creó).
+    """
+    tamano = tamano or tamano_pool(len(categorias))
+    # (categoria, intento, contexto donde falló); los contextos libres esperan en `cambio`
+    pendientes = [(categoria, 0, None) for categoria in categorias]
+    cambio = threading.Condition()
+    descargadas, fallidas = {}, []
+    # activos: contextos que siguen en el pool; en_curso: categorías tomadas y sin resolver
+    activos, en_curso = [0], [0]
+
+    def tomar(numero):
+        """Siguiente categoría para el contexto, o None si ya no queda nada que pueda reencolarse."""
+        with cambio:
+            while True:
+                for i, (categoria, intento, fallo_en) in enumerate(pendientes):
+                    # El reintento va a otro contexto mientras quede alguno
+                    if fallo_en != numero or activos[0] == 1:
+                        del pendientes[i]
+                        en_curso[0] += 1
+                        return categoria, intento
+                if not pendientes and en_curso[0] == 0:
+                    return None
+                cambio.wait()
+
+    def terminar(categoria, intento, numero):
+        """Reencola la categoría para otro intento o la da por fallida."""
+        if intento < DESCARGA_REINTENTOS:
+            pendientes.append((categoria, intento + 1, numero))
+        else:
+            fallidas.append(categoria)
+
+    def trabajar(numero, driver):
+        try:
+            while True:
+                tomada = tomar(numero)
+                if tomada is None:
+                    return
+                categoria, intento = tomada
+                try:
+                    ruta = descargar(driver, categoria, categorias[categoria])
+                except Exception as e:
+                    print(f"  ✗ [navegador {numero}] {categoria}: {e}")
+                    ruta = None
+                exito = bool(ruta) and os.path.exists(ruta)
+                vivo = exito or _driver_vivo(driver)
+                with cambio:
+                    if exito:
+                        descargadas[categoria] = ruta
+                    else:
+                        terminar(categoria, intento, numero)
+                    en_curso[0] -= 1
+                    cambio.notify_all()
+                if not vivo:
+                    print(f"  ⚠ [navegador {numero}] dejó de responder, sale del pool.")
+                    return
+        finally:
+            with cambio:
+                activos[0] -= 1
+                cambio.notify_all()
+
+    drivers = [driver_principal]
+    for numero in range(1, tamano):
+        nuevo = None
+        try:
+            nuevo = crear_driver()
+            clonar_sesion(nuevo)
+            drivers.append(nuevo)
+        except Exception as e:
+            print(f"  ⚠ No se pudo abrir el navegador {numero + 1} del pool: {e}")
+            if nuevo is not None:
+                try:
+                    nuevo.quit()
+                except Exception:
+                    pass
+            break
+    print(f"  🧭 Descargando {len(categorias)} categorías con {len(drivers)} navegadores...")
+
+    activos[0] = len(drivers)
+    hilos = [threading.Thread(target=trabajar, args=(numero, driver), daemon=True)
+             for numero, driver in enumerate(drivers, start=1)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    for driver in drivers[1:]:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    # Lo que quedó en cola (todos los contextos se cayeron) también falló
+    fallidas.extend(categoria for categoria, _, _ in pendientes)
+    return descargadas, [categoria for categoria in categorias if categoria in fallidas]
+
+
+def _driver_vivo(driver):
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
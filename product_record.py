@@ -0,0 +1,204 @@
+# product_record.py
+# Registro tipado de un SKU del catálogo (estado_productos).
+# Los campos conocidos viven en __slots__ (sin dict por instancia) y los desconocidos en un
+# dict de extras, de modo que el ida y vuelta con JSON no pierde nada.
+# Se comporta como un dict (data.get(...), data["campo"], update, items...) para el código
+# existente, y además permite acceso por atributo (data.stock) en los loops calientes.
+
+from collections.abc import MutableMapping
+
+# Nombres canónicos de los campos de un producto y el valor que se obtiene al leerlos como
+# atributo cuando no están presentes (el mismo default que usan las fases en data.get(...)).
+CAMPOS_PRODUCTO = {
+    # Datos del CSV de Intcomex (sync_bot.sincronizar_csv)
+    "sku": None,
+    "nombre": None,
+    "cost_price": 0,
+    "sale_price": 0,
+    "stock": 0,
+    "categoria_principal": None,
+    "categoria_csv": None,
+    "subcategoria_csv": None,
+    "en_csv_reciente": True,
+    "last_updated": None,
+    "huella_woo": None,
+    # Imágenes (image_bot / image_uploader)
+    "tiene_imagen": False,
+    "imagenes_locales": None,
+    "placeholder_personalizado": False,
+    "subido_a_woo": False,
+    "pendiente_sync_woo": False,
+    "woo_id": None,
+    "woo_media_id": None,
+    "woo_image_url": None,
+    # Visibilidad en la tienda (inventory_cleaner)
+    "status_web": None,
+    "motivo_estado": None,
+    "ultima_sincronizacion": None,
+    # Enriquecimiento IA (ia_webhook_trigger)
+    "ia_mejorado": False,
+    "ia_intentos": 0,
+    "ultima_ia": None,
+    "ultimo_error_ia": None,
+}
+
+_AUSENTE = object()
+
+
+class ProductRecord(MutableMapping):
+    """
+    Producto del catálogo. Un campo de CAMPOS_PRODUCTO no asignado equivale a una clave
+    ausente del dict original; leerlo como atributo devuelve su valor por defecto.
+    Si pertenece a un EstadoRastreado, le avisa antes de cada modificación (para guardar la
+    versión original) y después (para actualizar los índices de pendientes).
+    """
+
+    __slots__ = tuple(CAMPOS_PRODUCTO) + ("_extras", "_estado", "_sku")
+
+    def __init__(self, datos=None, estado=None, sku=None):
+        asignar = object.__setattr__
+        asignar(self, "_extras", None)
+        asignar(self, "_estado", estado)
+        asignar(self, "_sku", sku)
+        if datos:
+            for campo, valor in datos.items():
+                if campo in CAMPOS_PRODUCTO:
+                    asignar(self, campo, valor)
+                else:
+                    if self._extras is None:
+                        asignar(self, "_extras", {})
+                    self._extras[campo] = valor
+
+    # --- Adaptadores JSON ---
+
+    @classmethod
+    def from_dict(cls, datos, estado=None, sku=None):
+        return cls(datos, estado, sku)
+
+    def to_dict(self):
+        """dict plano equivalente (campos conocidos primero, luego los extras)."""
+        leer = object.__getattribute__
+        datos = {}
+        for campo in CAMPOS_PRODUCTO:
+            try:
+                datos[campo] = leer(self, campo)
+            except AttributeError:
+                pass
+        if self._extras:
+            datos.update(self._extras)
+        return datos
+
+    def __reduce__(self):
+        # Copias y pickles salen como dict plano, sin arrastrar el estado completo
+        return (dict, (self.to_dict(),))
+
+    def copy(self):
+        return self.to_dict()
+
+    # --- Acceso por atributo ---
+
+    def __getattr__(self, campo):
+        # Sólo se llama si el slot no está asignado (o el atributo no existe)
+        if campo in CAMPOS_PRODUCTO:
+            return CAMPOS_PRODUCTO[campo]
+        raise AttributeError(campo)
+
+    def __setattr__(self, campo, valor):
+        if campo not in CAMPOS_PRODUCTO:
+            raise AttributeError(f"'{campo}' no es un campo de ProductRecord (usar registro['{campo}'])")
+        self[campo] = valor
+
+    def __delattr__(self, campo):
+        del self[campo]
+
+    def _tocar(self):
+        if self._estado is not None:
+            self._estado._tocar(self._sku)
+
+    def _modificado(self, campo):
+        if self._estado is not None:
+            self._estado._reindexar(self._sku, campo)
+
+    # --- Interfaz de dict ---
+
+    def __getitem__(self, campo):
+        if campo in CAMPOS_PRODUCTO:
+            try:
+                return object.__getattribute__(self, campo)
+            except AttributeError:
+                raise KeyError(campo) from None
+        if self._extras and campo in self._extras:
+            return self._extras[campo]
+        raise KeyError(campo)
+
+    def get(self, campo, default=None):
+        if campo in CAMPOS_PRODUCTO:
+            try:
+                return object.__getattribute__(self, campo)
+            except AttributeError:
+                return default
+        if self._extras:
+            return self._extras.get(campo, default)
+        return default
+
+    def __contains__(self, campo):
+        return self.get(campo, _AUSENTE) is not _AUSENTE
+
+    def __setitem__(self, campo, valor):
+        self._tocar()
+        if campo in CAMPOS_PRODUCTO:
+            object.__setattr__(self, campo, valor)
+        else:
+            if self._extras is None:
+                object.__setattr__(self, "_extras", {})
+            self._extras[campo] = valor
+        self._modificado(campo)
+
+    def __delitem__(self, campo):
+        if campo not in self:
+            raise KeyError(campo)
+        self._tocar()
+        if campo in CAMPOS_PRODUCTO:
+            object.__delattr__(self, campo)
+        else:
+            del self._extras[campo]
+        self._modificado(campo)
+
+    def __iter__(self):
+        leer = object.__getattribute__
+        for campo in CAMPOS_PRODUCTO:
+            try:
+                leer(self, campo)
+            except AttributeError:
+                continue
+            yield campo
+        if self._extras:
+            yield from list(self._extras)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def items(self):
+        return self.to_dict().items()
+
+    def values(self):
+        return self.to_dict().values()
+
+    def __eq__(self, otro):
+        if isinstance(otro, ProductRecord):
+            otro = otro.to_dict()
+        if isinstance(otro, dict):
+            return self.to_dict() == otro
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"ProductRecord({self.to_dict()!r})"
+
+
+def a_json(obj):
+    """Hook default= para json/msgpack: serializa ProductRecord como dict plano."""
+    if isinstance(obj, ProductRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -1,11 +1,7 @@
-import json
-import os
+from state_store import load_state, save_state
 
-STATE_FILE = r"C:\Users\marco\Documents\GitHub\intcomex-bot\data_activa\estado_productos.json"
-if os.path.exists(STATE_FILE):
-    with open(STATE_FILE, 'r', encoding='utf-8') as f:
-        state = json.load(f)
-    
+state = load_state()
+if state:
     count = 0
     for sku, data in state.items():
         # Si no esta en woo pero el flag dice que no hay nada pendiente, corregimos
@@ -14,8 +10,7 @@ if os.path.exists(STATE_FILE):
             count += 1
             
     if count > 0:
-        with open(STATE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(state, f, indent=4, ensure_ascii=False)
+        save_state(state)
         print(f"✅ Reset completado: {count} productos vuelven a estar pendientes de sincronización.")
     else:
         print("✓ No se encontraron productos en estado inconsistente.")
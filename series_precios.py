@@ -0,0 +1,174 @@
+# series_precios.py
+# Serie histórica append-only de precio y stock por SKU.
+# Cada ingesta de un CSV (sync_bot.sincronizar_csv) deja un archivo columnar comprimido
+# data_activa/series_precios/AAAA-MM-DD/<categoria>/HHMMSS.json.gz con las columnas
+# sku / cost_price / sale_price / stock, ordenadas por SKU (búsqueda binaria por SKU).
+# Nunca se reescribe un archivo existente; los días más antiguos que SERIES_RETENCION_DIAS
+# se eliminan completos. El estado "caliente" (estado_productos) no crece con el historial.
+
+import os
+import re
+import json
+import gzip
+import shutil
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from state_store import DATA_PATH, escritura_atomica
+
+SERIES_DIR = os.path.join(DATA_PATH, "series_precios")
+COLUMNAS = ("cost_price", "sale_price", "stock")
+
+# Días de historial que se conservan (0 = sin límite)
+SERIES_RETENCION_DIAS = int(os.getenv("SERIES_RETENCION_DIAS", "365"))
+# Corridas ya descomprimidas que se mantienen en memoria (los archivos nunca cambian)
+SERIES_CACHE = int(os.getenv("SERIES_CACHE", "32"))
+
+_FORMATO_DIA = "%Y-%m-%d"
+_NOMBRE_CORRIDA = re.compile(r"^(\d{6})(?:_(\d+))?\.json\.gz$")
+
+
+def _slug(categoria):
+    return re.sub(r"[^\w]+", "_", str(categoria or "sin_categoria").lower()).strip("_") or "sin_categoria"
+
+
+def registrar_corrida(categoria, skus, cost_prices, sale_prices, stocks, momento=None):
+    """Guarda las observaciones de una ingesta (listas alineadas por posición). Devuelve la ruta escrita."""
+    if not skus:
+        return None
+    momento = momento or datetime.now()
+    directorio = os.path.join(SERIES_DIR, momento.strftime(_FORMATO_DIA), _slug(categoria))
+    path = os.path.join(directorio, f"{momento.strftime('%H%M%S')}.json.gz")
+    sufijo = 1
+    while os.path.exists(path):
+        # Append-only: dos corridas en el mismo segundo no se pisan
+        path = os.path.join(directorio, f"{momento.strftime('%H%M%S')}_{sufijo}.json.gz")
+        sufijo += 1
+    # Orden estable por SKU: un SKU repetido conserva el orden del CSV
+    orden = sorted(range(len(skus)), key=lambda i: skus[i])
+    doc = {
+        "ts": momento.strftime("%Y-%m-%d %H:%M:%S"),
+        "categoria": categoria,
+        "sku": [skus[i] for i in orden],
+        "cost_price": [cost_prices[i] for i in orden],
+        "sale_price": [sale_prices[i] for i in orden],
+        "stock": [stocks[i] for i in orden],
+    }
+    contenido = gzip.compress(json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode('utf-8'))
+    escritura_atomica(path, lambda f: f.write(contenido), binario=True)
+    purgar(momento)
+    return path
+
+
+def purgar(hasta=None, retencion_dias=None):
+    """Elimina los días de historial anteriores a la retención. Devuelve cuántos días se borraron."""
+    retencion_dias = SERIES_RETENCION_DIAS if retencion_dias is None else retencion_dias
+    if retencion_dias <= 0 or not os.path.isdir(SERIES_DIR):
+        return 0
+    limite = (hasta or datetime.now()).date() - timedelta(days=retencion_dias)
+    borrados = 0
+    for nombre in os.listdir(SERIES_DIR):
+        try:
+            dia = datetime.strptime(nombre, _FORMATO_DIA).date()
+        except ValueError:
+            continue
+        if dia < limite:
+            shutil.rmtree(os.path.join(SERIES_DIR, nombre), ignore_errors=True)
+            borrados += 1
+    if borrados:
+        _leer.cache_clear()
+    return borrados
+
+
+def _archivos(desde, hasta, categoria=None):
+    """Archivos de corrida entre dos fechas (inclusive), en orden cronológico (HHMMSS y sufijo _N dentro del día)."""
+    if not os.path.isdir(SERIES_DIR):
+        return []
+    slug = _slug(categoria) if categoria else None
+    archivos = []
+    dia = desde
+    while dia <= hasta:
+        directorio = os.path.join(SERIES_DIR, dia.strftime(_FORMATO_DIA))
+        if os.path.isdir(directorio):
+            del_dia = []
+            for nombre_categoria in os.listdir(directorio):
+                ruta = os.path.join(directorio, nombre_categoria)
+                if (slug is not None and nombre_categoria != slug) or not os.path.isdir(ruta):
+                    continue
+                for nombre in os.listdir(ruta):
+                    corrida = _NOMBRE_CORRIDA.match(nombre)
+                    if corrida:
+                        # Colisiones del mismo segundo por sufijo numérico: _2 antes que _10
+                        del_dia.append(((corrida.group(1), int(corrida.group(2) or 0)), os.path.join(ruta, nombre)))
+            archivos.extend(ruta for _, ruta in sorted(del_dia))
+        dia += timedelta(days=1)
+    return archivos
+
+
+@lru_cache(maxsize=SERIES_CACHE)
+def _leer(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _posicion(doc, sku):
+    """Posición de la primera observación del SKU en la corrida, o None."""
+    skus = doc["sku"]
+    i = bisect_left(skus, sku)
+    return i if i < len(skus) and skus[i] == sku else None
+
+
+def serie_sku(sku, dias=90, categoria=None, hasta=None):
+    """
+    Historial [(ts, cost_price, sale_price, stock), ...] de un SKU en los últimos `dias`.
+    Indicar la categoría limita la lectura a los archivos de esa categoría.
+    """
+    hasta = (hasta or datetime.now()).date()
+    serie = []
+    for path in _archivos(hasta - timedelta(days=dias), hasta, categoria):
+        doc = _leer(path)
+        i = _posicion(doc, sku)
+        if i is not None:
+            serie.append((doc["ts"], doc["cost_price"][i], doc["sale_price"][i], doc["stock"][i]))
+    return serie
+
+
+def skus_con_cambio(columna="stock", fecha=None, dias_atras=7, categoria=None):
+    """
+    SKUs cuyo valor de `columna` cambió durante `fecha` (por defecto hoy), comparando contra
+    la última observación previa (buscada hasta `dias_atras` días antes) y entre corridas del día.
+    Devuelve {sku: (valor_anterior, valor_final_del_dia)}.
+    """
+    if columna not in COLUMNAS:
+        raise ValueError(f"Columna desconocida: {columna}")
+    fecha = (fecha or datetime.now()).date()
+
+    anterior = {}
+    for path in _archivos(fecha - timedelta(days=dias_atras), fecha - timedelta(days=1), categoria):
+        doc = _leer(path)
+        anterior.update(zip(doc["sku"], doc[columna]))
+
+    cambios = {}
+    for path in _archivos(fecha, fecha, categoria):
+        doc = _leer(path)
+        for sku, valor in zip(doc["sku"], doc[columna]):
+            previo = anterior.get(sku)
+            if sku in anterior and previo != valor:
+                inicial = cambios[sku][0] if sku in cambios else previo
+                cambios[sku] = (inicial, valor)
+            anterior[sku] = valor
+    # Descarta los que volvieron al valor inicial dentro del día
+    return {sku: par for sku, par in cambios.items() if par[0] != par[1]}
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        for ts, costo, venta, stock in serie_sku(sys.argv[1]):
+            print(f"{ts} | costo {costo} | venta {venta} | stock {stock}")
+    else:
+        cambios = skus_con_cambio("stock")
+        print(f"📈 {len(cambios)} SKUs cambiaron de stock hoy.")
+        for sku, (antes, despues) in list(cambios.items())[:20]:
+            print(f"  {sku}: {antes} -> {despues}")
@@ -0,0 +1,160 @@
+# sesion_intcomex.py
+# Sesión autenticada de Intcomex guardada en disco, para no repetir el login (y el 2FA por SMS)
+# en cada corrida. Tras un login exitoso se guardan las cookies y el localStorage del navegador en
+# data_activa/sesion_intcomex.json (permisos 600, sólo el dueño), con vencimiento (SESION_TTL_HORAS).
+# La corrida siguiente la valida con una sola petición HTTP autenticada (sin abrir el navegador) y,
+# si el sitio la acepta, la carga en el driver; si la rechaza, se borra y se hace el login completo.
+
+import os
+import re
+import json
+import time
+import hashlib
+from datetime import datetime, timedelta
+
+from state_store import DATA_PATH, escritura_atomica
+from descarga_http import sesion_desde_cookies
+
+SESION_FILE = os.path.join(DATA_PATH, "sesion_intcomex.json")
+SESION_CACHE = os.getenv("SESION_CACHE", "true").lower() == "true"
+SESION_TTL_HORAS = float(os.getenv("SESION_TTL_HORAS", "12"))
+URL_TIENDA = "https://store.intcomex.com/"
+# Campos de cookie que acepta driver.add_cookie
+_CAMPOS_COOKIE = ("name", "value", "domain", "path", "secure", "httpOnly", "expiry", "sameSite")
+_CAMPO_PASSWORD = re.compile(r'<input[^>]+type\s*=\s*[\'"]password[\'"]', re.IGNORECASE)
+
+
+def _huella_usuario(usuario):
+    # La sesión es de un usuario: si cambian las credenciales no se reutiliza
+    return hashlib.sha256(str(usuario).encode('utf-8')).hexdigest()[:16]
+
+
+def guardar_sesion(driver, usuario, path=SESION_FILE):
+    """Guarda las cookies y el localStorage del driver recién autenticado."""
+    if not SESION_CACHE:
+        return
+    try:
+        ahora = datetime.now()
+        try:
+            local_storage = driver.execute_script("return Object.assign({}, window.localStorage);") or {}
+            user_agent = driver.execute_script("return navigator.userAgent")
+        except Exception:
+            local_storage, user_agent = {}, None
+        doc = {
+            "usuario": _huella_usuario(usuario),
+            "guardada": ahora.strftime("%Y-%m-%d %H:%M:%S"),
+            "expira": (ahora + timedelta(hours=SESION_TTL_HORAS)).strftime("%Y-%m-%d %H:%M:%S"),
+            "url": driver.current_url,
+            "user_agent": user_agent,
+            "cookies": driver.get_cookies(),
+            "local_storage": local_storage,
+        }
+        if not os.path.exists(path):
+            # Se crea con permisos 600 antes de escribir: escritura_atomica conserva los del archivo
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT, 0o600))
+        escritura_atomica(path, lambda f: json.dump(doc, f, indent=4, ensure_ascii=False))
+        os.chmod(path, 0o600)
+        print(f"  🔐 Sesión guardada hasta {doc['expira']}")
+    except Exception as e:
+        print(f"  ⚠ No se pudo guardar la sesión: {e}")
+
+
+def invalidar_sesion(path=SESION_FILE):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def cargar_sesion(usuario, path=SESION_FILE):
+    """La sesión guardada si existe, es del usuario y no venció (sin las cookies vencidas), o None."""
+    if not SESION_CACHE or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            doc = json.load(f)
+    except Exception as e:
+        print(f"  ⚠ No se pudo leer la sesión guardada: {e}")
+        invalidar_sesion(path)
+        return None
+    if doc.get("usuario") != _huella_usuario(usuario):
+        print("  ⚠ La sesión guardada es de otro usuario, se descarta.")
+        invalidar_sesion(path)
+        return None
+    if doc.get("expira", "") <= datetime.now().strftime("%Y-%m-%d %H:%M:%S"):
+        print(f"  ⏳ La sesión guardada venció ({doc.get('expira')}).")
+        invalidar_sesion(path)
+        return None
+    ahora = time.time()
+    doc["cookies"] = [c for c in doc.get("cookies", []) if not c.get("expiry") or c["expiry"] > ahora]
+    return doc if doc["cookies"] else None
+
+
+def sesion_valida(doc, url_validacion, timeout=15):
+    """
+    Una petición a una página que exige login: válida si responde 2xx sin redirigir y sin
+    mostrar el formulario de login (campo de contraseña).
+    """
+    sesion = sesion_desde_cookies(doc["cookies"], doc.get("user_agent"), hilos=1)
+    respuesta = sesion.get(url_validacion, allow_redirects=False, timeout=timeout)
+    if not 200 <= respuesta.status_code < 300:
+        return False
+    return not _CAMPO_PASSWORD.search(respuesta.text)
+
+
+def cargar_en_driver(driver, cookies, local_storage=None):
+    """Agrega cookies (formato de driver.get_cookies()) y localStorage al driver."""
+    # Las cookies sólo se pueden agregar estando en el dominio
+    driver.get(URL_TIENDA)
+    for cookie in cookies:
+        try:
+            driver.add_cookie({k: cookie[k] for k in _CAMPOS_COOKIE if k in cookie})
+        except Exception:
+            pass  # cookies de otros dominios (p. ej. el del proveedor de login)
+    if local_storage:
+        driver.execute_script("for (const [k, v] of Object.entries(arguments[0])) { window.localStorage.setItem(k, v); }",
+                              local_storage)
+
+
+def copiar_sesion(origen, destino):
+    """Clona la sesión autenticada de un driver en otro (sin volver a hacer login)."""
+    try:
+        local_storage = origen.execute_script("return Object.assign({}, window.localStorage);") or {}
+    except Exception:
+        local_storage = {}
+    cargar_en_driver(destino, origen.get_cookies(), local_storage)
+
+
+def restaurar_sesion(driver, usuario, url_validacion, path=SESION_FILE):
+    """
+    Carga en el driver la sesión guardada si el sitio todavía la acepta y deja el navegador en
+    `url_validacion` ya autenticado. Devuelve False (y borra la sesión rechazada) si hay que hacer login.
+    """
+    doc = cargar_sesion(usuario, path)
+    if doc is None:
+        return False
+    print(f"🔐 Validando la sesión guardada el {doc.get('guardada')}...")
+    try:
+        if not sesion_valida(doc, url_validacion):
+            print("  ✗ El sitio rechazó la sesión guardada, se hará login completo.")
+            invalidar_sesion(path)
+            return False
+    except Exception as e:
+        # Sin red no se puede saber si sirve: se conserva y se intenta el login normal
+        print(f"  ⚠ No se pudo validar la sesión guardada: {e}")
+        return False
+
+    try:
+        cargar_en_driver(driver, doc["cookies"], doc.get("local_storage"))
+        driver.get(url_validacion)
+        if "login" in driver.current_url.lower():
+            print("  ✗ El navegador no quedó autenticado con la sesión guardada, se hará login completo.")
+            invalidar_sesion(path)
+            return False
+    except Exception as e:
+        print(f"  ⚠ No se pudo cargar la sesión en el navegador: {e}")
+        return False
+
+    print(f"✓ Sesión reutilizada (vence {doc.get('expira')}), sin login ni 2FA.")
+    return True
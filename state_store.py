@@ -0,0 +1,1302 @@
+# state_store.py
+# Capa de persistencia del catálogo de productos (estado_productos).
+# Backends intercambiables: JSON (formato histórico) o SQLite embebido con columnas indexadas.
+# El backend JSON registra los cambios puntuales en un journal append-only que se compacta periódicamente.
+# StateRepository mantiene el catálogo parseado en memoria entre fases del mismo proceso.
+# Las escrituras son atómicas (temporal + fsync + rename) y se serializan entre procesos con un
+# bloqueo de archivo; si otro proceso guardó entre medio, sólo se fusionan los campos propios.
+
+import os
+import re
+import copy
+import json
+import atexit
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+
+from product_record import ProductRecord, a_json
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    import msgpack
+except ImportError:  # Opcional: sin msgpack el snapshot compacto se codifica como JSON minificado
+    msgpack = None
+
+# --- Configuración ---
+DATA_PATH = "data_activa"
+STATE_FILE = os.path.join(DATA_PATH, "estado_productos.json")
+STATE_DB_FILE = os.path.join(DATA_PATH, "estado_productos.db")
+JOURNAL_FILE = os.path.join(DATA_PATH, "estado_productos.journal.jsonl")
+# Conteos de los índices de pendientes (los leen el dashboard y /status de Telegram sin cargar el catálogo)
+INDICES_FILE = os.path.join(DATA_PATH, "indices_estado.json")
+SNAPSHOT_COMPACTO_FILE = os.path.join(DATA_PATH, "estado_productos.snap")
+# Backend particionado: un archivo por categoria_principal + índice SKU -> partición
+PARTICIONES_DIR = os.path.join(DATA_PATH, "estado_particiones")
+
+# Tamaño del journal (bytes) a partir del cual se lanza una compactación en segundo plano
+JOURNAL_MAX_BYTES = int(os.getenv("JOURNAL_MAX_BYTES", 5 * 1024 * 1024))
+
+# Marca para eliminar un campo de un registro dentro de un cambio (ej: {"ultimo_error_ia": CAMPO_ELIMINADO})
+CAMPO_ELIMINADO = object()
+
+# Backend activo: "json" (por defecto), "sqlite" o "particionado"
+STATE_BACKEND = os.getenv("STATE_BACKEND", "json").lower()
+
+# Formato del snapshot del backend JSON: "json" (legible, indent=4) o "compacto"
+# (claves internadas, msgpack si está instalado). La migración entre ambos es automática.
+STATE_FORMAT = os.getenv("STATE_FORMAT", "json").lower()
+
+# Si un guardado modifica más de esta fracción del catálogo se reescribe el snapshot completo
+# en vez de anexar los cambios al journal (ej: sincronizar_csv actualiza todos los SKUs)
+FRACCION_REESCRITURA = 0.2
+
+# Cabecera del snapshot compacto: magia + códec ('m' = msgpack, 'j' = JSON minificado)
+MAGIA_COMPACTO = b"ESTC1"
+
+# Columnas que SQLite replica fuera del JSON del registro para poder indexarlas.
+# Cada una se normaliza con el mismo valor por defecto que usan los bots al hacer data.get(...)
+COLUMNAS_INDEXADAS = {
+    "stock": ("INTEGER", 0),
+    "tiene_imagen": ("INTEGER", False),
+    "subido_a_woo": ("INTEGER", False),
+    "pendiente_sync_woo": ("INTEGER", False),
+    "ia_mejorado": ("INTEGER", False),
+    "categoria_principal": ("TEXT", None),
+    "en_csv_reciente": ("INTEGER", True),
+    "placeholder_personalizado": ("INTEGER", False),
+    "ia_intentos": ("INTEGER", 0),
+}
+
+# Stock igual o menor al que inventory_cleaner pasa el producto a borrador ("stock_seguro")
+STOCK_CRITICO = 2
+
+# Consultas de pendientes compartidas por todas las fases.
+# Cada entrada tiene el predicado Python (backend JSON), su equivalente SQL (backend SQLite)
+# y los campos de los que depende (para re-evaluar los índices sólo cuando cambian).
+CONSULTAS = {
+    # Fase B: productos con stock sin imagen real (o con placeholder)
+    "sin_imagen": (
+        lambda d: (not d.get("tiene_imagen") or d.get("placeholder_personalizado")) and d.get("stock", 0) > 0,
+        "(tiene_imagen = 0 OR placeholder_personalizado = 1) AND stock > 0",
+        ("tiene_imagen", "placeholder_personalizado", "stock"),
+    ),
+    # Fase C: imagen nueva sin subir o cambios de precio/stock sin sincronizar
+    "pendiente_woo": (
+        lambda d: (d.get("tiene_imagen") and not d.get("subido_a_woo")) or d.get("pendiente_sync_woo"),
+        "(tiene_imagen = 1 AND subido_a_woo = 0) OR pendiente_sync_woo = 1",
+        ("tiene_imagen", "subido_a_woo", "pendiente_sync_woo"),
+    ),
+    # Fase E: en Woo, sin enriquecer y con menos de 3 intentos fallidos
+    "pendiente_ia": (
+        lambda d: d.get("subido_a_woo") and not d.get("ia_mejorado", False) and d.get("ia_intentos", 0) < 3,
+        "subido_a_woo = 1 AND ia_mejorado = 0 AND ia_intentos < 3",
+        ("subido_a_woo", "ia_mejorado", "ia_intentos"),
+    ),
+    # Placeholder personalizado: con stock, sin imagen y sin placeholder asignado
+    "sin_placeholder": (
+        lambda d: d.get("stock", 0) > 0 and not d.get("tiene_imagen", False) and not d.get("placeholder_personalizado", False),
+        "stock > 0 AND tiene_imagen = 0 AND placeholder_personalizado = 0",
+        ("stock", "tiene_imagen", "placeholder_personalizado"),
+    ),
+    # Fase D: SKUs presentes en el último CSV descargado
+    "en_catalogo": (
+        lambda d: d.get("en_csv_reciente", True),
+        "en_csv_reciente = 1",
+        ("en_csv_reciente",),
+    ),
+    # Inventario: con stock pero en el umbral de despublicación
+    "stock_bajo": (
+        lambda d: 0 < d.get("stock", 0) <= STOCK_CRITICO,
+        f"stock > 0 AND stock <= {STOCK_CRITICO}",
+        ("stock",),
+    ),
+}
+
+# Índices secundarios que EstadoRastreado mantiene al día en cada modificación
+# (consulta en O(resultados) en vez de recorrer el catálogo)
+INDICES_MANTENIDOS = ("sin_imagen", "pendiente_woo", "pendiente_ia", "sin_placeholder", "stock_bajo")
+
+# campo -> índices que dependen de él
+_DEPENDENCIAS = {}
+for _nombre in INDICES_MANTENIDOS:
+    for _campo in CONSULTAS[_nombre][2]:
+        _DEPENDENCIAS.setdefault(_campo, []).append(_nombre)
+
+
+def _valor_columna(data, campo):
+    """Normaliza el valor de un campo indexado para guardarlo en su columna SQLite."""
+    tipo, default = COLUMNAS_INDEXADAS[campo]
+    valor = data.get(campo, default)
+    if tipo == "TEXT":
+        return valor
+    if isinstance(default, bool):
+        return 1 if valor else 0
+    try:
+        return int(valor or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _firma_archivos(*paths):
+    """Firma (mtime, tamaño) de un conjunto de archivos para detectar escrituras externas."""
+    firma = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            firma.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            firma.append(None)
+    return tuple(firma)
+
+
+def _fsync_directorio(directorio):
+    """Asegura en disco la entrada del directorio tras un rename (no aplica en Windows)."""
+    if fcntl is None:
+        return
+    fd = os.open(directorio, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def escritura_atomica(path, escribir, binario=False):
+    """
+    Escribe un archivo sin dejarlo nunca a medias: escribir(f) vuelca el contenido
+    en un temporal del mismo directorio, se fuerza a disco y recién entonces reemplaza al original.
+    """
+    directorio = os.path.dirname(path) or "."
+    os.makedirs(directorio, exist_ok=True)
+    try:
+        modo = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        modo = 0o644
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directorio)
+    try:
+        with (os.fdopen(fd, 'wb') if binario else os.fdopen(fd, 'w', encoding='utf-8')) as f:
+            escribir(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, modo)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_directorio(directorio)
+
+
+class BloqueoArchivo:
+    """
+    Bloqueo exclusivo entre procesos (advisory) sobre <archivo>.lock.
+    Es reentrante dentro del mismo proceso y serializa también los hilos.
+    """
+
+    def __init__(self, path):
+        self.path = path + ".lock"
+        self._rlock = threading.RLock()
+        self._nivel = 0
+        self._fd = None
+
+    def _bloquear(self, fd):
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print(f"⏳ Estado en uso por otro proceso, esperando {self.path}...")
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            return
+        while True:
+            try:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                print(f"⏳ Estado en uso por otro proceso, esperando {self.path}...")
+
+    def _liberar(self, fd):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    def __enter__(self):
+        self._rlock.acquire()
+        if self._nivel == 0:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    self._bloquear(fd)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            except BaseException:
+                self._rlock.release()
+                raise
+            self._fd = fd
+        self._nivel += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._nivel -= 1
+        if self._nivel == 0:
+            try:
+                self._liberar(self._fd)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._rlock.release()
+        return False
+
+
+_bloqueos = {}
+_bloqueos_mutex = threading.Lock()
+
+def bloqueo_para(path):
+    """Devuelve el bloqueo compartido de un archivo (uno por ruta en todo el proceso)."""
+    clave = os.path.abspath(path)
+    with _bloqueos_mutex:
+        if clave not in _bloqueos:
+            _bloqueos[clave] = BloqueoArchivo(clave)
+        return _bloqueos[clave]
+
+
+def codificar_compacto(state):
+    """
+    Serializa el catálogo con claves internadas: la lista de nombres de campo se guarda
+    una sola vez y cada registro es una lista plana [id_campo, valor, id_campo, valor, ...].
+    """
+    campos = {}
+    filas = []
+    for data in state.values():
+        fila = []
+        for campo, valor in data.items():
+            idx = campos.get(campo)
+            if idx is None:
+                idx = campos[campo] = len(campos)
+            fila.append(idx)
+            fila.append(valor)
+        filas.append(fila)
+    doc = {"campos": list(campos), "skus": list(state), "filas": filas}
+    if msgpack is not None:
+        return MAGIA_COMPACTO + b"m" + msgpack.packb(doc, use_bin_type=True)
+    return MAGIA_COMPACTO + b"j" + json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+
+
+def decodificar_compacto(contenido):
+    """Inversa de codificar_compacto."""
+    if not contenido.startswith(MAGIA_COMPACTO):
+        raise ValueError("el archivo no es un snapshot compacto de estado")
+    codec = contenido[len(MAGIA_COMPACTO):len(MAGIA_COMPACTO) + 1]
+    cuerpo = contenido[len(MAGIA_COMPACTO) + 1:]
+    if codec == b"m":
+        if msgpack is None:
+            raise RuntimeError("el snapshot está en msgpack y el paquete 'msgpack' no está instalado")
+        doc = msgpack.unpackb(cuerpo, raw=False, strict_map_key=False)
+    else:
+        doc = json.loads(cuerpo)
+    campos = doc["campos"]
+    return {
+        sku: {campos[fila[i]]: fila[i + 1] for i in range(0, len(fila), 2)}
+        for sku, fila in zip(doc["skus"], doc["filas"])
+    }
+
+
+def _aplicar_cambios(state, cambios):
+    """
+    Aplica cambios sobre un dict de estado en memoria.
+    cambios = {sku: {campo: valor | CAMPO_ELIMINADO}} o {sku: None} para eliminar el SKU.
+    """
+    for sku, campos in cambios.items():
+        if campos is None:
+            state.pop(sku, None)
+            continue
+        registro = state.setdefault(sku, {})
+        for campo, valor in campos.items():
+            if valor is CAMPO_ELIMINADO:
+                registro.pop(campo, None)
+            else:
+                registro[campo] = valor
+
+
+def _diferencia(original, actual):
+    """Cambio a nivel de campo que lleva un registro de original a actual (None = eliminar el SKU)."""
+    if actual is None:
+        return None
+    if original is None:
+        return dict(actual)
+    campos = {c: v for c, v in actual.items() if c not in original or original[c] != v}
+    campos.update({c: CAMPO_ELIMINADO for c in original if c not in actual})
+    return campos
+
+
+class EstadoRastreado(dict):
+    """
+    Catálogo {sku: registro} que recuerda qué SKUs se modificaron desde la última carga/guardado.
+    Antes del primer cambio de un SKU se guarda una copia de su versión en disco, de modo que
+    cambios() entrega sólo los campos modificados y guardar cuesta O(SKUs tocados).
+    Cada registro es un ProductRecord; los dicts asignados se convierten al vuelo.
+    Los valores anidados (listas/dicts dentro de un registro) deben reasignarse para detectarse.
+    Además mantiene los índices de INDICES_MANTENIDOS: cada modificación re-evalúa sólo
+    los índices que dependen del campo tocado.
+    """
+
+    __slots__ = ("_originales", "_firma", "_indices", "_categoria")
+
+    def __init__(self, datos=None, firma=None, categoria=None):
+        dict.__init__(self)
+        self._originales = {}
+        self._firma = firma
+        # Si no es None, el estado es sólo la partición de esa categoría (ver load_category)
+        self._categoria = categoria
+        for sku, data in (datos or {}).items():
+            dict.__setitem__(self, sku, ProductRecord(data, self, sku))
+        self._indices = {}
+        for nombre in INDICES_MANTENIDOS:
+            predicado = CONSULTAS[nombre][0]
+            self._indices[nombre] = {sku for sku, data in self.items() if predicado(data)}
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+    def _tocar(self, sku):
+        if sku not in self._originales:
+            actual = dict.get(self, sku)
+            if actual is None:
+                self._originales[sku] = None
+                return
+            original = actual.to_dict()
+            for campo, valor in original.items():
+                # Sólo los valores anidados necesitan copia profunda (el resto es inmutable)
+                if isinstance(valor, (list, dict)):
+                    original[campo] = copy.deepcopy(valor)
+            self._originales[sku] = original
+
+    def _reindexar(self, sku, campo=None):
+        """Re-evalúa la pertenencia de un SKU a los índices (todos, o sólo los que dependen de campo)."""
+        nombres = INDICES_MANTENIDOS if campo is None else _DEPENDENCIAS.get(campo, ())
+        registro = dict.get(self, sku)
+        for nombre in nombres:
+            if registro is not None and CONSULTAS[nombre][0](registro):
+                self._indices[nombre].add(sku)
+            else:
+                self._indices[nombre].discard(sku)
+
+    def indice(self, nombre):
+        """SKUs de un índice mantenido (ordenados)."""
+        return sorted(self._indices[nombre])
+
+    def conteos(self):
+        return {nombre: len(skus) for nombre, skus in self._indices.items()}
+
+    def _soltar(self, sku):
+        anterior = dict.get(self, sku)
+        if isinstance(anterior, ProductRecord) and anterior._estado is self:
+            object.__setattr__(anterior, "_estado", None)
+
+    def __setitem__(self, sku, data):
+        self._tocar(sku)
+        if dict.get(self, sku) is data:
+            return
+        self._soltar(sku)
+        if not (isinstance(data, ProductRecord) and data._estado is None):
+            data = ProductRecord(data)
+        object.__setattr__(data, "_estado", self)
+        object.__setattr__(data, "_sku", sku)
+        dict.__setitem__(self, sku, data)
+        self._reindexar(sku)
+
+    def __delitem__(self, sku):
+        self._tocar(sku)
+        self._soltar(sku)
+        dict.__delitem__(self, sku)
+        self._reindexar(sku)
+
+    def __ior__(self, otro):
+        self.update(otro)
+        return self
+
+    def update(self, *args, **kwargs):
+        for sku, data in dict(*args, **kwargs).items():
+            self[sku] = data
+
+    def pop(self, sku, *default):
+        if sku in self:
+            data = dict.__getitem__(self, sku)
+            del self[sku]
+            return data
+        return dict.pop(self, sku, *default)
+
+    def popitem(self):
+        sku = next(reversed(self))
+        return sku, self.pop(sku)
+
+    def setdefault(self, sku, default=None):
+        if sku not in self:
+            self[sku] = default
+        return dict.__getitem__(self, sku)
+
+    def clear(self):
+        for sku in list(self):
+            del self[sku]
+
+    def original(self, sku):
+        """Versión en disco de un SKU (la copia previa al primer cambio, o el registro actual)."""
+        if sku in self._originales:
+            return self._originales[sku]
+        return dict.get(self, sku)
+
+    def sucios(self):
+        return set(self._originales)
+
+    def cambios(self):
+        """Cambios {sku: {campo: valor}} pendientes de guardar ({sku: None} = SKU eliminado)."""
+        cambios = {}
+        for sku, original in self._originales.items():
+            actual = dict.get(self, sku)
+            if actual is None and original is None:
+                continue
+            cambio = _diferencia(original, actual)
+            if cambio != {}:
+                cambios[sku] = cambio
+        return cambios
+
+    def confirmar(self, firma):
+        """Marca el contenido actual como persistido."""
+        self._originales = {}
+        self._firma = firma
+
+    def aplicar_persistidos(self, cambios):
+        """Refleja cambios que ya están en disco sin marcarlos como pendientes."""
+        for sku, campos in cambios.items():
+            if sku in self._originales:
+                base = {sku: self._originales[sku]} if self._originales[sku] is not None else {}
+                _aplicar_cambios(base, {sku: campos})
+                self._originales[sku] = base.get(sku)
+                if dict.get(self, sku) is None:
+                    # El llamador lo eliminó en memoria: prevalece su versión al guardar
+                    continue
+            if campos is None:
+                self._soltar(sku)
+                dict.pop(self, sku, None)
+                self._reindexar(sku)
+                continue
+            registro = dict.get(self, sku)
+            if registro is None:
+                registro = ProductRecord(None, self, sku)
+                dict.__setitem__(self, sku, registro)
+            # Se desconecta el registro mientras se aplica para no marcarlo como pendiente
+            object.__setattr__(registro, "_estado", None)
+            try:
+                for campo, valor in campos.items():
+                    if valor is CAMPO_ELIMINADO:
+                        registro.pop(campo, None)
+                    else:
+                        registro[campo] = valor
+            finally:
+                object.__setattr__(registro, "_estado", self)
+            self._reindexar(sku)
+
+
+def _sincronizar(state, fusionado):
+    """Deja state (mismos objetos por SKU) igual al resultado de una fusión con otro escritor."""
+    for sku in [sku for sku in state if sku not in fusionado]:
+        del state[sku]
+    for sku, data in fusionado.items():
+        registro = state.get(sku)
+        if registro is None:
+            state[sku] = data
+        elif registro != data:
+            registro.clear()
+            registro.update(data)
+
+
+class JsonStateBackend:
+    """
+    Backend histórico: snapshot JSON con el catálogo completo + journal append-only.
+    Cada cambio puntual se anexa como una línea JSONL por SKU con sus campos modificados
+    ({"sku", "campos", "eliminados"}; {"sku", "eliminar": true} elimina el SKU); la compactación
+    pliega el journal dentro del snapshot cuando supera JOURNAL_MAX_BYTES.
+    Con formato="compacto" el snapshot se guarda en .snap (ver codificar_compacto); si sólo
+    existe el snapshot del otro formato se lee ese y la próxima escritura completa lo migra.
+    """
+
+    nombre = "json"
+
+    def __init__(self, path=STATE_FILE, journal_path=JOURNAL_FILE, formato=None):
+        self.path = path
+        self.compacto_path = os.path.splitext(path)[0] + ".snap"
+        self.formato = formato or STATE_FORMAT
+        self.journal_path = journal_path
+        # Journal rotado mientras se compacta (se re-aplica si la compactación se interrumpe)
+        self.compactando_path = journal_path + ".compactando"
+        # Un único bloqueo cubre snapshot y journal (entre procesos y entre hilos)
+        self.bloqueo = bloqueo_para(path)
+        self._hilo_compactacion = None
+        # Funciones (firma_antes, firma_despues) que se llaman al terminar cada compactación, con el
+        # bloqueo tomado: el contenido no cambia, sólo los archivos (ver StateRepository._compactado)
+        self.al_compactar = []
+
+    def firma(self):
+        return _firma_archivos(self.path, self.compacto_path, self.compactando_path, self.journal_path)
+
+    def tiene_journal(self):
+        return os.path.exists(self.journal_path) or os.path.exists(self.compactando_path)
+
+    def _rutas_snapshot(self):
+        """(snapshot del formato configurado, snapshot del otro formato)."""
+        if self.formato == "compacto":
+            return self.compacto_path, self.path
+        return self.path, self.compacto_path
+
+    def _leer_snapshot(self):
+        for path in self._rutas_snapshot():
+            if not os.path.exists(path):
+                continue
+            if path == self.compacto_path:
+                with open(path, 'rb') as f:
+                    return decodificar_compacto(f.read())
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def _escribir_snapshot(self, state):
+        destino, anterior = self._rutas_snapshot()
+        if destino == self.compacto_path:
+            contenido = codificar_compacto(state)
+            escritura_atomica(destino, lambda f: f.write(contenido), binario=True)
+        else:
+            escritura_atomica(destino, lambda f: json.dump(state, f, indent=4, ensure_ascii=False, default=a_json))
+        if os.path.exists(anterior):
+            # Migración completada: un único snapshot vigente
+            os.remove(anterior)
+            print(f"📦 Snapshot de estado migrado a formato '{self.formato}' ({os.path.basename(destino)}).")
+
+    def _reproducir_journal(self, state, path):
+        """Re-aplica sobre state los registros de un journal. Una última línea truncada se descarta."""
+        if not os.path.exists(path):
+            return 0
+        aplicados = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    reg = json.loads(linea)
+                except ValueError:
+                    print(f"⚠ Registro incompleto descartado en {path}")
+                    continue
+                if reg.get("eliminar"):
+                    cambio = None
+                else:
+                    cambio = dict(reg.get("campos", {}))
+                    cambio.update({campo: CAMPO_ELIMINADO for campo in reg.get("eliminados", ())})
+                _aplicar_cambios(state, {reg["sku"]: cambio})
+                aplicados += 1
+        return aplicados
+
+    def load(self):
+        with self.bloqueo:
+            state = self._leer_snapshot()
+            self._reproducir_journal(state, self.compactando_path)
+            self._reproducir_journal(state, self.journal_path)
+            return state
+
+    def save(self, state):
+        """Escritura completa: el snapshot nuevo reemplaza al anterior y al journal pendiente."""
+        with self.bloqueo:
+            self._escribir_snapshot(state)
+            for path in (self.compactando_path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def apply(self, cambios):
+        """Anexa los cambios al journal (una línea por SKU modificado) y fuerza su escritura a disco."""
+        if not cambios:
+            return
+        with self.bloqueo:
+            os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+            with open(self.journal_path, 'a+b') as f:
+                # Si una escritura anterior quedó a medias, cerrar esa línea antes de anexar
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+                lineas = []
+                for sku, campos in cambios.items():
+                    if campos is None:
+                        reg = {"sku": sku, "eliminar": True}
+                    else:
+                        reg = {"sku": sku, "campos": {c: v for c, v in campos.items() if v is not CAMPO_ELIMINADO}}
+                        eliminados = [c for c, v in campos.items() if v is CAMPO_ELIMINADO]
+                        if eliminados:
+                            reg["eliminados"] = eliminados
+                    lineas.append(json.dumps(reg, ensure_ascii=False, default=a_json) + "\n")
+                f.write("".join(lineas).encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.getsize(self.journal_path) >= JOURNAL_MAX_BYTES:
+                self.compact(en_segundo_plano=True)
+
+    def compact(self, en_segundo_plano=False):
+        """Pliega el journal en el snapshot. En segundo plano se ejecuta en un hilo aparte."""
+        if en_segundo_plano:
+            if self._hilo_compactacion and self._hilo_compactacion.is_alive():
+                return
+            self._hilo_compactacion = threading.Thread(target=self.compact, name="compactacion-estado")
+            self._hilo_compactacion.start()
+            return
+
+        with self.bloqueo:
+            firma_antes = self.firma()
+            if os.path.exists(self.journal_path) and not os.path.exists(self.compactando_path):
+                os.replace(self.journal_path, self.compactando_path)
+            if not os.path.exists(self.compactando_path):
+                return
+            state = self._leer_snapshot()
+            aplicados = self._reproducir_journal(state, self.compactando_path)
+            self._escribir_snapshot(state)
+            os.remove(self.compactando_path)
+            print(f"🗜️ Journal de estado compactado ({aplicados} cambios plegados en el snapshot).")
+            firma_despues = self.firma()
+            for avisar in self.al_compactar:
+                avisar(firma_antes, firma_despues)
+
+    def query(self, nombre):
+        predicado = CONSULTAS[nombre][0]
+        return [sku for sku, data in self.load().items() if predicado(data)]
+
+
+class SQLiteStateBackend:
+    """
+    Backend SQLite: una fila por SKU con el registro completo en JSON y
+    los flags de las fases replicados en columnas indexadas.
+    """
+
+    nombre = "sqlite"
+
+    def __init__(self, path=STATE_DB_FILE, json_path=STATE_FILE):
+        self.path = path
+        self.json_path = json_path
+        self.bloqueo = bloqueo_para(path)
+        self._conn = None
+
+    def firma(self):
+        return _firma_archivos(self.path, self.path + "-wal")
+
+    def _conectar(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._crear_esquema()
+            self._migrar_desde_json()
+        return self._conn
+
+    def _crear_esquema(self):
+        columnas = ", ".join(f"{campo} {tipo}" for campo, (tipo, _) in COLUMNAS_INDEXADAS.items())
+        with self._conn:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS productos (sku TEXT PRIMARY KEY, datos TEXT NOT NULL, {columnas})")
+            for campo in COLUMNAS_INDEXADAS:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_productos_{campo} ON productos ({campo})")
+
+    def _migrar_desde_json(self):
+        """Importa el snapshot JSON (o compacto) la primera vez que se usa la base de datos."""
+        vacia = self._conn.execute("SELECT 1 FROM productos LIMIT 1").fetchone() is None
+        origen = JsonStateBackend(self.json_path)
+        if vacia and any(os.path.exists(p) for p in origen._rutas_snapshot()):
+            print(f"📦 Migrando {self.json_path} -> {self.path}...")
+            state = origen.load()
+            with self._conn:
+                self._upsert(state)
+            print(f"✓ {len(state)} SKUs migrados a SQLite.")
+
+    def _fila(self, sku, data):
+        return (sku, json.dumps(data, ensure_ascii=False, default=a_json)) + tuple(_valor_columna(data, c) for c in COLUMNAS_INDEXADAS)
+
+    def _upsert(self, registros):
+        campos = ["sku", "datos"] + list(COLUMNAS_INDEXADAS)
+        asignaciones = ", ".join(f"{c} = excluded.{c}" for c in campos[1:])
+        self._conn.executemany(
+            f"INSERT INTO productos ({', '.join(campos)}) VALUES ({', '.join('?' * len(campos))}) "
+            f"ON CONFLICT(sku) DO UPDATE SET {asignaciones}",
+            (self._fila(sku, data) for sku, data in registros.items())
+        )
+
+    def load(self):
+        conn = self._conectar()
+        return {sku: json.loads(datos) for sku, datos in conn.execute("SELECT sku, datos FROM productos ORDER BY rowid")}
+
+    def save(self, state):
+        """Escribe sólo las filas cuyo contenido cambió y elimina los SKUs que ya no están."""
+        with self.bloqueo:
+            conn = self._conectar()
+            actuales = dict(conn.execute("SELECT sku, datos FROM productos"))
+            cambiados = {sku: data for sku, data in state.items()
+                         if actuales.get(sku) != json.dumps(data, ensure_ascii=False, default=a_json)}
+            eliminados = [(sku,) for sku in actuales if sku not in state]
+            with conn:
+                if cambiados:
+                    self._upsert(cambiados)
+                if eliminados:
+                    conn.executemany("DELETE FROM productos WHERE sku = ?", eliminados)
+
+    def apply(self, cambios):
+        """Actualiza únicamente las filas de los SKUs modificados."""
+        if not cambios:
+            return
+        with self.bloqueo, self._conectar() as conn:
+            eliminados = [(sku,) for sku, campos in cambios.items() if campos is None]
+            if eliminados:
+                conn.executemany("DELETE FROM productos WHERE sku = ?", eliminados)
+            modificados = [sku for sku, campos in cambios.items() if campos is not None]
+            actuales = {}
+            for i in range(0, len(modificados), 500):
+                lote = modificados[i:i + 500]
+                filas = conn.execute(f"SELECT sku, datos FROM productos WHERE sku IN ({', '.join('?' * len(lote))})", lote)
+                actuales.update({sku: json.loads(datos) for sku, datos in filas})
+            _aplicar_cambios(actuales, {sku: cambios[sku] for sku in modificados})
+            if actuales:
+                self._upsert(actuales)
+
+    def compact(self, en_segundo_plano=False):
+        """SQLite no usa journal propio: los cambios ya se escriben por fila."""
+        pass
+
+    def counts(self):
+        """Conteos de los índices mantenidos (y total) resueltos con los índices SQL."""
+        conn = self._conectar()
+        conteos = {nombre: conn.execute(f"SELECT COUNT(*) FROM productos WHERE {CONSULTAS[nombre][1]}").fetchone()[0]
+                   for nombre in INDICES_MANTENIDOS}
+        conteos["total"] = conn.execute("SELECT COUNT(*) FROM productos").fetchone()[0]
+        return conteos
+
+    def query(self, nombre):
+        where = CONSULTAS[nombre][1]
+        conn = self._conectar()
+        return [sku for (sku,) in conn.execute(f"SELECT sku FROM productos WHERE {where} ORDER BY rowid")]
+
+
+class PartitionedStateBackend:
+    """
+    Backend particionado por categoria_principal: un JSON por categoría en PARTICIONES_DIR
+    más un índice {sku: partición} que permite ubicar cualquier SKU sin leer las demás.
+    Ingerir el CSV de una categoría lee y escribe sólo su partición (y la de origen si un
+    SKU cambia de categoría). Si un SKU quedara en dos particiones tras una interrupción,
+    prevalece la que indica el índice (que se escribe al final).
+    """
+
+    nombre = "particionado"
+    SIN_CATEGORIA = "_sin_categoria"
+
+    def __init__(self, directorio=PARTICIONES_DIR, json_path=STATE_FILE):
+        self.directorio = directorio
+        self.json_path = json_path
+        self.indice_path = os.path.join(directorio, "indice_skus.json")
+        self.bloqueo = bloqueo_para(self.indice_path)
+        self._indice = None
+        self._firma_indice = None
+        self._migrado = False
+
+    def particion(self, categoria):
+        """Nombre de archivo (sin extensión) de la partición de una categoría."""
+        if not categoria:
+            return self.SIN_CATEGORIA
+        return re.sub(r"[^\w]+", "_", str(categoria).lower()).strip("_") or self.SIN_CATEGORIA
+
+    def _ruta(self, particion):
+        return os.path.join(self.directorio, f"{particion}.json")
+
+    def _particiones_en_disco(self):
+        if not os.path.isdir(self.directorio):
+            return []
+        return sorted(f[:-5] for f in os.listdir(self.directorio)
+                      if f.endswith(".json") and f != os.path.basename(self.indice_path))
+
+    def firma(self):
+        return _firma_archivos(self.indice_path, *(self._ruta(p) for p in self._particiones_en_disco()))
+
+    def _migrar_desde_json(self):
+        """Reparte el snapshot JSON (o compacto) en particiones la primera vez que se usa."""
+        if self._migrado:
+            return
+        self._migrado = True
+        origen = JsonStateBackend(self.json_path)
+        if os.path.exists(self.indice_path) or not any(os.path.exists(p) for p in origen._rutas_snapshot()):
+            return
+        print(f"📦 Migrando {self.json_path} -> {self.directorio}/ (una partición por categoría)...")
+        state = origen.load()
+        self.save(state)
+        print(f"✓ {len(state)} SKUs repartidos en {len(self._particiones_en_disco())} particiones.")
+
+    def _leer_indice(self):
+        self._migrar_desde_json()
+        firma = _firma_archivos(self.indice_path)
+        if self._indice is None or firma != self._firma_indice:
+            try:
+                with open(self.indice_path, 'r', encoding='utf-8') as f:
+                    self._indice = json.load(f)
+            except FileNotFoundError:
+                self._indice = {}
+            self._firma_indice = firma
+        return self._indice
+
+    def _escribir_indice(self, indice):
+        escritura_atomica(self.indice_path, lambda f: json.dump(indice, f, ensure_ascii=False))
+        self._indice = indice
+        self._firma_indice = _firma_archivos(self.indice_path)
+
+    def _leer_particion(self, particion):
+        try:
+            with open(self._ruta(particion), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _escribir_particion(self, particion, datos):
+        if not datos:
+            if os.path.exists(self._ruta(particion)):
+                os.remove(self._ruta(particion))
+            return
+        escritura_atomica(self._ruta(particion), lambda f: json.dump(datos, f, ensure_ascii=False, default=a_json))
+
+    def firma_particion(self, categoria):
+        return _firma_archivos(self._ruta(self.particion(categoria)))
+
+    def load_partition(self, categoria):
+        """SKUs de una categoría leyendo sólo su partición."""
+        with self.bloqueo:
+            indice = self._leer_indice()
+            particion = self.particion(categoria)
+            return {sku: data for sku, data in self._leer_particion(particion).items()
+                    if indice.get(sku, particion) == particion and data.get("categoria_principal") == categoria}
+
+    def get(self, sku):
+        """Registro de un SKU en cualquier partición (vía índice), o None."""
+        with self.bloqueo:
+            particion = self._leer_indice().get(sku)
+            if particion is None:
+                return None
+            return self._leer_particion(particion).get(sku)
+
+    def load(self):
+        with self.bloqueo:
+            indice = self._leer_indice()
+            state = {}
+            for particion in self._particiones_en_disco():
+                for sku, data in self._leer_particion(particion).items():
+                    if indice.get(sku, particion) == particion:
+                        state[sku] = data
+            return state
+
+    def save(self, state):
+        """Reescritura completa: reparte el catálogo en particiones y rehace el índice."""
+        with self.bloqueo:
+            particiones = {}
+            indice = {}
+            for sku, data in state.items():
+                particion = self.particion(data.get("categoria_principal"))
+                particiones.setdefault(particion, {})[sku] = data
+                indice[sku] = particion
+            os.makedirs(self.directorio, exist_ok=True)
+            for particion, datos in particiones.items():
+                self._escribir_particion(particion, datos)
+            for particion in self._particiones_en_disco():
+                if particion not in particiones:
+                    os.remove(self._ruta(particion))
+            self._escribir_indice(indice)
+
+    def apply(self, cambios):
+        """Aplica los cambios leyendo y escribiendo sólo las particiones afectadas."""
+        if not cambios:
+            return
+        with self.bloqueo:
+            indice = dict(self._leer_indice())
+            cargadas = {}
+
+            def particion(nombre):
+                if nombre not in cargadas:
+                    cargadas[nombre] = self._leer_particion(nombre)
+                return cargadas[nombre]
+
+            modificadas = set()
+            for sku, campos in cambios.items():
+                origen = indice.get(sku)
+                if campos is None:
+                    if origen is not None:
+                        particion(origen).pop(sku, None)
+                        modificadas.add(origen)
+                        del indice[sku]
+                    continue
+                registro = particion(origen).get(sku) if origen is not None else None
+                tmp = {sku: registro} if registro is not None else {}
+                _aplicar_cambios(tmp, {sku: campos})
+                destino = self.particion(tmp[sku].get("categoria_principal"))
+                if origen is not None and origen != destino:
+                    particion(origen).pop(sku, None)
+                    modificadas.add(origen)
+                particion(destino)[sku] = tmp[sku]
+                modificadas.add(destino)
+                indice[sku] = destino
+
+            os.makedirs(self.directorio, exist_ok=True)
+            for nombre in modificadas:
+                self._escribir_particion(nombre, cargadas[nombre])
+            if indice != self._indice:
+                self._escribir_indice(indice)
+
+    def compact(self, en_segundo_plano=False):
+        """Las particiones se escriben completas en cada cambio: no hay journal que compactar."""
+        pass
+
+    def query(self, nombre):
+        predicado = CONSULTAS[nombre][0]
+        return [sku for sku, data in self.load().items() if predicado(data)]
+
+
+class StateRepository:
+    """
+    Punto único de acceso al catálogo para todas las fases.
+    Mantiene el estado parseado en memoria (EstadoRastreado) y sólo vuelve a leerlo del backend
+    si otro proceso lo modificó (la firma mtime/tamaño de sus archivos cambió).
+
+    Al guardar un EstadoRastreado sólo se persisten los SKUs modificados. Si la firma en disco ya
+    no es la leída, otro escritor intervino: en vez de reescribir el catálogo completo se aplican
+    únicamente los campos que este proceso cambió y el dict del llamador se actualiza con la fusión.
+    """
+
+    def __init__(self, backend, indices_path=INDICES_FILE):
+        self.backend = backend
+        self.indices_path = indices_path
+        self._state = None
+        self._conteos_publicados = None
+        # Cambios registrados con update_many desde la última publicación de los conteos
+        self._conteos_pendientes = False
+        # {firma previa: firma tras compactar} de las compactaciones del backend en este proceso
+        self._firmas_compactadas = {}
+        if isinstance(backend, JsonStateBackend):
+            backend.al_compactar.append(self._compactado)
+
+    def _compactado(self, firma_antes, firma_despues):
+        """
+        Una compactación sólo reorganiza los archivos: si la copia en memoria estaba al día con
+        la firma previa, lo sigue estando con la nueva (no hay que releer ni fusionar al guardar).
+        """
+        if firma_antes == firma_despues:
+            return
+        self._firmas_compactadas[firma_antes] = firma_despues
+        if self._state is not None and self._state._firma == firma_antes:
+            self._state._firma = firma_despues
+
+    def _firma_actualizada(self, firma):
+        """La firma leída, avanzada por las compactaciones que hubo desde entonces."""
+        while firma in self._firmas_compactadas:
+            firma = self._firmas_compactadas[firma]
+        return firma
+
+    def _cache_vigente(self):
+        return self._state is not None and self.backend.firma() == self._state._firma
+
+    def invalidate(self):
+        """Descarta la copia en memoria (la próxima lectura vuelve al backend)."""
+        self._state = None
+
+    def load(self):
+        if self._cache_vigente():
+            return self._state
+        with self.backend.bloqueo:
+            firma = self.backend.firma()
+            self._state = EstadoRastreado(self.backend.load(), firma)
+        return self._state
+
+    def save(self, state):
+        if isinstance(state, EstadoRastreado) and state._categoria is not None:
+            # Partición de una categoría: nunca reemplaza el catálogo completo
+            return self.save_category(state)
+        with self.backend.bloqueo:
+            firma_disco = self.backend.firma()
+            if isinstance(state, EstadoRastreado) and state._firma is not None:
+                concurrente = firma_disco != self._firma_actualizada(state._firma)
+                if (not concurrente and isinstance(self.backend, JsonStateBackend)
+                        and len(state._originales) > len(state) * FRACCION_REESCRITURA):
+                    self.backend.save(state)
+                    self._adoptar(state)
+                    return
+                cambios = state.cambios()
+                if not cambios:
+                    return
+                self.backend.apply(cambios)
+            else:
+                # dict plano (ej: catálogo reconstruido): se compara contra la última versión leída
+                base = self._state
+                concurrente = base is not None and firma_disco != base._firma
+                if not concurrente:
+                    self.backend.save(state)
+                    self._adoptar(state)
+                    return
+                cambios = {}
+                for sku in set(state) | set(base):
+                    original = base.original(sku)
+                    if original is None and sku not in state:
+                        continue
+                    cambio = _diferencia(original, state.get(sku))
+                    if cambio != {}:
+                        cambios[sku] = cambio
+                self.backend.apply(cambios)
+            if concurrente:
+                print(f"🔀 El estado fue modificado por otro proceso: fusionando {len(cambios)} SKUs propios.")
+                _sincronizar(state, self.backend.load())
+            self._adoptar(state)
+
+    def _adoptar(self, state):
+        firma = self.backend.firma()
+        if isinstance(state, EstadoRastreado):
+            state.confirmar(firma)
+            self._state = state
+        else:
+            self._state = EstadoRastreado(state, firma)
+
+    def load_category(self, categoria):
+        """
+        Estado con sólo los SKUs de una categoría. En el backend particionado se lee únicamente
+        su partición; en los demás es una vista filtrada de la copia en memoria.
+        Se guarda con save()/save_category(), que persiste sólo los cambios (nunca el catálogo completo).
+        """
+        if isinstance(self.backend, PartitionedStateBackend) and not self._cache_vigente():
+            return EstadoRastreado(self.backend.load_partition(categoria), self.backend.firma_particion(categoria), categoria)
+        state = self.load()
+        datos = {sku: data.to_dict() for sku, data in state.items() if data.categoria_principal == categoria}
+        return EstadoRastreado(datos, state._firma, categoria)
+
+    def save_category(self, state):
+        """
+        Persiste los cambios de una categoría. En el backend JSON, si se modificó más de
+        FRACCION_REESCRITURA de la categoría (ej: la ingesta de su CSV) se reescribe el snapshot
+        completo con los cambios aplicados en vez de anexarlos al journal.
+        """
+        cambios = state.cambios()
+        if (cambios and isinstance(self.backend, JsonStateBackend)
+                and len(cambios) > len(state) * FRACCION_REESCRITURA):
+            with self.backend.bloqueo:
+                completo = self.load()
+                # Con cambios sin guardar en la copia compartida no se puede escribir el snapshot
+                # sin persistirlos también: se sigue por el journal
+                if not completo._originales:
+                    completo.aplicar_persistidos(cambios)
+                    self.backend.save(completo)
+                    self._adoptar(completo)
+                    state.confirmar(state._firma)
+                    return
+        self.update_many(cambios)
+        state.confirmar(state._firma)
+
+    def find_product(self, sku):
+        """Registro (dict) de un SKU en cualquier categoría, o None. Usa el índice de SKUs si está particionado."""
+        if isinstance(self.backend, PartitionedStateBackend) and not self._cache_vigente():
+            return self.backend.get(sku)
+        registro = self.load().get(sku)
+        return registro.to_dict() if registro is not None else None
+
+    def update_many(self, cambios):
+        """Persiste cambios por SKU {sku: {campo: valor}} y los refleja en la copia en memoria."""
+        if not cambios:
+            return
+        with self.backend.bloqueo:
+            vigente = self._cache_vigente()
+            self.backend.apply(cambios)
+            self._conteos_pendientes = True
+            if not vigente:
+                self.invalidate()
+                return
+            self._state.aplicar_persistidos(cambios)
+            self._state._firma = self.backend.firma()
+
+    def update(self, sku, campos):
+        self.update_many({sku: campos})
+
+    def set_many(self, skus, campos):
+        """Asigna los mismos campos a un conjunto de SKUs en una sola escritura."""
+        self.update_many({sku: dict(campos) for sku in skus})
+
+    def compact(self):
+        with self.backend.bloqueo:
+            if isinstance(self.backend, JsonStateBackend) and self._cache_vigente():
+                # La copia en memoria ya incluye el journal: basta con reescribir el snapshot sin re-parsear
+                if self.backend.tiene_journal():
+                    self.backend.save(self._state)
+                    self._state.confirmar(self.backend.firma())
+                return
+            self.backend.compact()
+
+    def query(self, nombre):
+        # Índice mantenido en memoria: O(resultados). Si no hay copia vigente, SQLite consulta
+        # su índice sin cargar el catálogo; en JSON se carga (y se indexa) una sola vez
+        if nombre in INDICES_MANTENIDOS and (self._cache_vigente() or not isinstance(self.backend, SQLiteStateBackend)):
+            return self.load().indice(nombre)
+        if isinstance(self.backend, SQLiteStateBackend):
+            return self.backend.query(nombre)
+        predicado = CONSULTAS[nombre][0]
+        return [sku for sku, data in self.load().items() if predicado(data)]
+
+    def counts(self):
+        """Tamaño de cada índice mantenido (carga el catálogo si no está en memoria)."""
+        return self.load().conteos()
+
+    def publish_counts(self, solo_pendientes=False):
+        """
+        Escribe INDICES_FILE si los conteos cambiaron desde la última publicación.
+        Con solo_pendientes=True no hace nada si no hubo update_many desde entonces.
+        """
+        if solo_pendientes and not self._conteos_pendientes:
+            return
+        self._conteos_pendientes = False
+        if self._cache_vigente():
+            conteos = self._state.conteos()
+            conteos["total"] = len(self._state)
+        elif isinstance(self.backend, SQLiteStateBackend):
+            conteos = self.backend.counts()
+        else:
+            return
+        if conteos == self._conteos_publicados:
+            return
+        datos = {"actualizado": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "conteos": conteos}
+        escritura_atomica(self.indices_path, lambda f: json.dump(datos, f, indent=4, ensure_ascii=False))
+        self._conteos_publicados = conteos
+
+
+_backend = None
+_repositorio = None
+
+def get_backend():
+    """Devuelve (y crea la primera vez) el backend configurado en STATE_BACKEND."""
+    global _backend
+    if _backend is None:
+        if STATE_BACKEND == "sqlite":
+            _backend = SQLiteStateBackend()
+        elif STATE_BACKEND == "particionado":
+            _backend = PartitionedStateBackend()
+        else:
+            _backend = JsonStateBackend()
+    return _backend
+
+def get_repository():
+    """Devuelve el StateRepository compartido por todas las fases del proceso."""
+    global _repositorio
+    if _repositorio is None or _repositorio.backend is not get_backend():
+        _repositorio = StateRepository(get_backend())
+    return _repositorio
+
+
+# --- API pública usada por todas las fases ---
+
+def load_state():
+    """Carga el estado completo de los productos (desde memoria si no cambió en disco)."""
+    try:
+        return get_repository().load()
+    except Exception as e:
+        print(f"⚠ Error al cargar el estado ({get_backend().nombre}): {e}")
+        return {}
+
+def save_state(state):
+    """
+    Guarda el estado completo de los productos en el backend configurado.
+    Retorna True si quedó escrito; False si falló (el error se informa por consola).
+    """
+    try:
+        get_repository().save(state)
+    except Exception as e:
+        print(f"✗ Error al guardar el estado ({get_backend().nombre}): {e}")
+        return False
+    try:
+        get_repository().publish_counts()
+    except Exception as e:
+        print(f"⚠ Error al publicar los conteos de índices: {e}")
+    return True
+
+def update_fields(sku, campos):
+    """
+    Persiste sólo los campos modificados de un SKU (ej: dentro de un loop por producto),
+    sin reescribir el catálogo completo. Usa CAMPO_ELIMINADO para borrar un campo.
+    """
+    apply_changes({sku: campos})
+
+def apply_changes(cambios):
+    """
+    Persiste un lote de cambios {sku: {campo: valor}} ({sku: None} elimina el SKU).
+    Los conteos de INDICES_FILE quedan pendientes hasta publish_index_counts() (o el próximo save_state).
+    """
+    try:
+        get_repository().update_many(cambios)
+    except Exception as e:
+        print(f"✗ Error al registrar cambios de estado ({get_backend().nombre}): {e}")
+
+def publish_index_counts():
+    """
+    Publica los conteos de INDICES_FILE si hubo cambios con apply_changes/update_fields desde la
+    última publicación. Las fases que actualizan SKU por SKU la llaman una vez al terminar.
+    """
+    try:
+        if _repositorio is not None:
+            _repositorio.publish_counts(solo_pendientes=True)
+    except Exception as e:
+        print(f"⚠ Error al publicar los conteos de índices ({get_backend().nombre}): {e}")
+
+# Si una fase termina sin publicar (ej: se interrumpió), los conteos pendientes se escriben al salir
+atexit.register(publish_index_counts)
+
+def set_many(skus, campos):
+    """Asigna los mismos campos a un conjunto de SKUs con una única escritura incremental."""
+    apply_changes({sku: dict(campos) for sku in skus})
+
+def load_category(categoria):
+    """Carga sólo los SKUs de una categoría (en el backend particionado, sólo su archivo)."""
+    try:
+        return get_repository().load_category(categoria)
+    except Exception as e:
+        print(f"⚠ Error al cargar la categoría '{categoria}' ({get_backend().nombre}): {e}")
+        return EstadoRastreado(categoria=categoria)
+
+def find_product(sku):
+    """Busca un SKU en todo el catálogo (vía índice de SKUs en el backend particionado)."""
+    try:
+        return get_repository().find_product(sku)
+    except Exception as e:
+        print(f"⚠ Error al buscar SKU {sku} ({get_backend().nombre}): {e}")
+        return None
+
+def compact_state():
+    """Compacta el journal de cambios dentro del snapshot (no-op en SQLite)."""
+    try:
+        get_repository().compact()
+        get_repository().publish_counts()
+    except Exception as e:
+        print(f"⚠ Error al compactar el estado ({get_backend().nombre}): {e}")
+
+def read_index_counts(path=INDICES_FILE):
+    """Lee los últimos conteos publicados (sin cargar el catálogo). None si aún no existen."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠ Error al leer {path}: {e}")
+        return None
+
+def query_skus(nombre):
+    """
+    Devuelve los SKUs que cumplen una de las consultas de CONSULTAS
+    (ej: "sin_imagen", "pendiente_woo"). En SQLite es una búsqueda por índice.
+    """
+    try:
+        return get_repository().query(nombre)
+    except Exception as e:
+        print(f"⚠ Error en consulta '{nombre}' ({get_backend().nombre}): {e}")
+        return []
@@ -8,23 +8,33 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.chrome.options import Options as ChromeOptions
 from woocommerce import API
-import pandas as pd
 import time
 import os
 import re
 import json
 import logging
-import glob
-import io
-from pathlib import Path
+import shutil
 from datetime import datetime
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from webdriver_manager.chrome import ChromeDriverManager
 import random
-import sys
 import platform
+from state_store import save_state, load_state, load_category
+from series_precios import registrar_corrida
+from archivo_precios import ultimo_archivo
+from descarga_http import DESCARGA_HTTP, sesion_desde_driver, descargar_csvs_http
+from sesion_intcomex import restaurar_sesion, guardar_sesion, copiar_sesion
+from pool_navegadores import descargar_en_pool
+import perfil_rapido
+import esperas
+# clean_price_to_float y extract_stock_number se re-exportan: vivían aquí antes de ingesta_csv
+from ingesta_csv import clean_price_to_float, extract_stock_number  # noqa: F401
+from ingesta_csv import (
+    normalizar_csv, normalizar_en_paralelo, alinear_skus, fusionar_en_estado, HuellasCorrida,
+    cargar_cache_csv, guardar_cache_csv, firma_csv, csv_sin_cambios, registrar_en_cache
+)
 
 # Detectar Sistema Operativo para atajos de teclado
 OS_TYPE = platform.system()
@@ -85,17 +95,26 @@ LOGIN_USERNAME_FIELD_SELECTOR = (By.ID, "UserName")
 LOGIN_PASSWORD_FIELD_SELECTOR = (By.ID, "Password")
 LOGIN_BUTTON_SELECTOR = (By.ID, "LoginButton")
 DOWNLOAD_BUTTON_SELECTOR = (By.CSS_SELECTOR, "a.priceListButtom[href*='Csv']")
+# Elemento del encabezado con el tipo de cambio ("US$1 = CLP$902")
+DOLAR_SELECTOR = (By.XPATH, "//*[contains(text(), 'US$1') or contains(text(), 'CLP$')]")
 
 # --- Constantes de Filtrado ---
 MIN_STOCK = 0  # Restricción de stock eliminada por solicitud del usuario
 MIN_PRICE_COST = 0  # Restricción de precio eliminada por solicitud del usuario
 MARGIN_PERCENTAGE = 0.20  # 20% de margen
 
+# --- Configuración de Ingesta ---
+# true: todos los CSV descargados se parsean a la vez (un proceso por CSV) y el estado se guarda una sola vez
+INGESTA_PARALELA = os.getenv("INGESTA_PARALELA", "true").lower() == "true"
+
 # --- Configuración de Descargas ---
 DATA_PATH = "data_activa"
 DOWNLOAD_DIR = os.path.join(os.getcwd(), "downloads")
-STATE_FILE = os.path.join(DATA_PATH, "estado_productos.json")
 MAPA_IMAGENES_PATH = os.path.join(DATA_PATH, "mapa_imagenes.json")
+# Cada descarga con el navegador se guarda primero en su propio subdirectorio (ver preparar_descarga)
+DOWNLOAD_EN_CURSO_DIR = os.path.join(DOWNLOAD_DIR, ".en_curso")
+DESCARGA_PARCIAL = (".crdownload", ".tmp")
+ESPERA_DESCARGA_INTERVALO = 0.2
 os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 os.makedirs(DATA_PATH, exist_ok=True)
 
@@ -104,88 +123,8 @@ logging.getLogger('selenium').setLevel(logging.WARNING)
 logging.getLogger('urllib3').setLevel(logging.WARNING)
 
 
-# --- Funciones de Persistencia ---
-
-def load_state():
-    """Carga el estado de los productos desde el archivo JSON."""
-    if os.path.exists(STATE_FILE):
-        try:
-            with open(STATE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"⚠ Error al cargar {STATE_FILE}: {e}")
-            return {}
-    return {}
-
-def save_state(state):
-    """Guarda el estado de los productos en el archivo JSON."""
-    try:
-        with open(STATE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(state, f, indent=4, ensure_ascii=False)
-    except Exception as e:
-        print(f"✗ Error al guardar {STATE_FILE}: {e}")
-
 # --- Funciones de Utilidad ---
 
-def clean_price_to_float(price_text):
-    """
-    Convierte un texto de precio CLP (ej: "$ 150.000" o "$150.000" o "487,50") a float.
-    Intcomex usa formato con coma decimal (ej: "487,50").
-    
-    Args:
-        price_text: String con el precio (ej: "487,50" o "$150.000")
-    
-    Returns:
-        float: Precio como número, o None si no se puede convertir
-    """
-    if pd.isna(price_text) or price_text is None:
-        return None
-    
-    try:
-        # Convertir a string si es número
-        price_str = str(price_text).strip()
-        
-        # Si ya es un número, retornarlo
-        if isinstance(price_text, (int, float)):
-            return float(price_text)
-        
-        # Remover símbolos de moneda y espacios (USD, CLP, $)
-        cleaned = re.sub(r'[\$\sCLPUSD]', '', price_str, flags=re.IGNORECASE)
-        
-        # Detectar si usa coma decimal o punto decimal
-        # Si tiene coma y punto, el punto es separador de miles y la coma es decimal
-        if ',' in cleaned and '.' in cleaned:
-            # Formato: "1.234,56" -> punto es miles, coma es decimal
-            cleaned = cleaned.replace('.', '')  # Remover puntos (miles)
-            cleaned = cleaned.replace(',', '.')  # Coma -> punto decimal
-        elif ',' in cleaned and '.' not in cleaned:
-            # Solo tiene coma: puede ser decimal (ej: "487,50") o miles
-            # Si hay más de una coma o la coma está antes del último grupo de 3 dígitos, es separador de miles
-            parts = cleaned.split(',')
-            if len(parts) == 2 and len(parts[1]) <= 2:
-                # Es formato decimal: "487,50"
-                cleaned = cleaned.replace(',', '.')
-            else:
-                # Es separador de miles: "1,234"
-                cleaned = cleaned.replace(',', '')
-        else:
-            # Solo tiene punto o nada: puede ser miles o decimal
-            # Si el punto está antes de los últimos 3 dígitos, probablemente es separador de miles
-            if '.' in cleaned:
-                parts = cleaned.split('.')
-                if len(parts) == 2 and len(parts[1]) <= 2:
-                    # Es formato decimal: "487.50"
-                    pass  # Ya tiene punto decimal
-                else:
-                    # Es separador de miles: "1.234"
-                    cleaned = cleaned.replace('.', '')
-        
-        return float(cleaned)
-    except (ValueError, AttributeError, TypeError) as e:
-        print(f"⚠ Error al convertir precio '{price_text}' a float: {e}")
-        return None
-
-
 def calculate_sale_price(cost_price):
     """
     Calcula el precio de venta con margen del 20%.
@@ -202,61 +141,6 @@ def calculate_sale_price(cost_price):
     return cost_price / (1 - MARGIN_PERCENTAGE)
 
 
-def extract_stock_number(stock_text):
-    """
-    Extrae el número de stock de un texto (ej: "Disponible: 100 unidades" o "Más de 20").
-    Si el texto contiene "más de X", retorna X.
-    """
-    if stock_text is None:
-        return 0
-    
-    if isinstance(stock_text, (int, float)):
-        return int(stock_text)
-        
-    try:
-        text = str(stock_text).lower().strip()
-        
-        # Buscar el primer número en el texto
-        nums = re.findall(r'\d+', text)
-        if nums:
-            return int(nums[0])
-            
-        # Si no hay números pero dice algo de disponibilidad
-        if 'disponible' in text or 'en stock' in text:
-            return 1 # Asumir al menos 1 si no hay número pero indica disponibilidad
-            
-        return 0
-    except:
-        return 0
-
-
-def detect_csv_encoding(file_path):
-    """
-    Detecta el encoding correcto del CSV de Intcomex.
-    Intcomex suele usar 'latin-1', 'utf-16', 'utf-8' o 'iso-8859-1'.
-    
-    Args:
-        file_path: Ruta al archivo CSV
-    
-    Returns:
-        str: Encoding detectado
-    """
-    encodings = ['latin-1', 'utf-16', 'utf-8', 'iso-8859-1', 'cp1252']
-    
-    for encoding in encodings:
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                f.read(1024)  # Leer una muestra
-            print(f"✓ Encoding detectado: {encoding}")
-            return encoding
-        except (UnicodeDecodeError, UnicodeError):
-            continue
-    
-    # Si ninguno funciona, intentar utf-8 con errores ignorados
-    print("⚠ No se pudo detectar encoding, usando utf-8 con errores ignorados")
-    return 'utf-8'
-
-
 # --- Funciones de WooCommerce ---
 
 def init_woocommerce_api():
@@ -492,11 +376,9 @@ def login_intcomex(driver, username, password):
         print("⌨️  Escribiendo credenciales...")
         user_field.clear()
         user_field.send_keys(username)
-        time.sleep(1)
         
         pass_field.clear()
         pass_field.send_keys(password)
-        time.sleep(1)
         
         # Encontrar y clickear botón de login
         login_btn = None
@@ -521,16 +403,16 @@ def login_intcomex(driver, username, password):
             
         # Validar acceso y manejar posible 2FA
         print("🔍 Validando acceso...")
-        time.sleep(5)
+        # El formulario se reemplaza al navegar: hasta que eso pase (o se llegue al sitio) no hay nada que revisar
+        esperas.esperar(driver, "login_envio", lambda d: EC.staleness_of(pass_field)(d) or _login_exitoso(d.current_url))
+        esperas.documento_listo(driver)
         
         # Ciclo para detectar 2FA o éxito de login (hasta 90 segundos de espera total)
         attempts_2fa = 0
         max_attempts_2fa = 3  # Limitar a máximo 3 solicitudes de código 2FA
         for check_attempt in range(30):
-            current_url = driver.current_url.lower()
-            
             # Check de éxito
-            if "login" not in current_url and "account" not in current_url and "ad" not in current_url:
+            if _login_exitoso(driver.current_url):
                 print(f"✓ Inicio de sesión exitoso: {driver.current_url}")
                 return True
                 
@@ -553,7 +435,7 @@ def login_intcomex(driver, username, password):
                         if btn_enviar:
                             print(f"🖱️ Haciendo clic en botón de envío/reenvío ({btn_enviar.text or btn_enviar.get_attribute('id')})...")
                             driver.execute_script("arguments[0].click();", btn_enviar)
-                            time.sleep(3)
+                            esperas.esperar(driver, "2fa_envio", EC.visibility_of_element_located((By.ID, "verificationCode")))
                     except Exception as e:
                         print(f"Nota: No se pudo clickear automáticamente en 'Enviar/Reenviar Código' ({e}). Hazlo manual si es necesario.")
                         
@@ -603,7 +485,6 @@ def login_intcomex(driver, username, password):
                         if casilla_codigo:
                             casilla_codigo.clear()
                             casilla_codigo.send_keys(codigo_sms)
-                            time.sleep(1)
                             
                             # Clic en el botón de Verificar / Continuar
                             botones_verificar = driver.find_elements(By.XPATH, "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZÁÉÍÓÚ', 'abcdefghijklmnopqrstuvwxyzáéíóú'), 'verificar')] | //button[@id='verifyCode'] | //button[@id='continue']")
@@ -611,7 +492,7 @@ def login_intcomex(driver, username, password):
                             if btn_verificar:
                                 print("🖱️ Enviando el código...")
                                 driver.execute_script("arguments[0].click();", btn_verificar)
-                                time.sleep(5)
+                                esperas.esperar(driver, "2fa_verificacion", lambda d: EC.staleness_of(btn_verificar)(d) or _login_exitoso(d.current_url))
                                 # Volver a ciclar para chequear el éxito
                                 continue
                             else:
@@ -627,7 +508,8 @@ def login_intcomex(driver, username, password):
             except Exception as inner_e:
                 pass
             
-            time.sleep(3)
+            # Vuelve a revisar apenas el sitio redirige (o tras el timeout del paso)
+            esperas.esperar(driver, "login_confirmacion", lambda d: _login_exitoso(d.current_url))
             
         print("✗ No se pudo confirmar el inicio de sesión después de esperar.")
         return False
@@ -639,45 +521,82 @@ def login_intcomex(driver, username, password):
 
 
 
-def wait_for_download(category_name, timeout=30):
+def _login_exitoso(url):
+    url = url.lower()
+    return "login" not in url and "account" not in url and "ad" not in url
+
+
+def iniciar_sesion_intcomex(driver, username, password):
     """
-    Espera activamente hasta que aparezca un nuevo archivo CSV en la carpeta downloads.
-    
+    Reutiliza la sesión guardada (sesion_intcomex.py) si Intcomex la sigue aceptando; si no, hace
+    el login completo (login_intcomex) y guarda la nueva sesión. Retorna True si quedó autenticado.
+    """
+    url_validacion = next(iter(URLS.values()), LOGIN_URL)
+    if restaurar_sesion(driver, username, url_validacion):
+        return True
+    if login_intcomex(driver, username, password):
+        guardar_sesion(driver, username)
+        return True
+    return False
+
+
+def preparar_descarga(driver, category_name):
+    """
+    Crea un directorio vacío sólo para la descarga de esta categoría y le indica a Chrome (CDP
+    Browser.setDownloadBehavior) que guarde ahí. Devuelve la ruta.
+    Si el driver no acepta el comando lanza una excepción: varios navegadores del pool descargan
+    a la vez y en un directorio compartido uno podría tomar el CSV de otra categoría.
+    """
+    directorio = os.path.join(DOWNLOAD_EN_CURSO_DIR, re.sub(r"[^\w]+", "_", category_name))
+    shutil.rmtree(directorio, ignore_errors=True)
+    os.makedirs(directorio, exist_ok=True)
+    try:
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior",
+                               {"behavior": "allow", "downloadPath": directorio})
+    except Exception as e:
+        shutil.rmtree(directorio, ignore_errors=True)
+        raise Exception(f"no se pudo fijar el directorio de descarga por CDP: {e}")
+    return directorio
+
+
+def _descarga_terminada(directorio):
+    """
+    Archivo ya completo en el directorio, o None. Chrome escribe en '<nombre>.crdownload' y lo
+    renombra al terminar, así que un archivo con su nombre final está completo.
+    """
+    nombres = [e.name for e in os.scandir(directorio) if e.is_file()]
+    if any(n.endswith(DESCARGA_PARCIAL) for n in nombres):
+        return None
+    terminados = [os.path.join(directorio, n) for n in nombres if n.lower().endswith(".csv")]
+    return max(terminados, key=os.path.getmtime) if terminados else None
+
+
+def wait_for_download(category_name, directorio, timeout=30):
+    """
+    Espera hasta que Chrome termine de escribir el CSV en el directorio propio de la descarga
+    (preparar_descarga) y lo deja como downloads/<categoria>.csv.
+
     Args:
         category_name: Nombre de la categoría para el nombre del archivo
+        directorio: Directorio propio de la descarga
         timeout: Tiempo máximo de espera en segundos
-    
+
     Returns:
         str: Ruta del archivo descargado, o None si timeout
     """
     print(f"  ⏳ Esperando descarga del CSV...")
-    
-    # Obtener lista de archivos antes de la descarga
-    initial_files = set(glob.glob(os.path.join(DOWNLOAD_DIR, "*.csv")))
-    
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        current_files = set(glob.glob(os.path.join(DOWNLOAD_DIR, "*.csv")))
-        new_files = current_files - initial_files
-        
-        if new_files:
-            # Tomar el archivo más reciente
-            downloaded_file = max(new_files, key=os.path.getctime)
-            
-            # Esperar un poco más para asegurar que el archivo se complete
-            time.sleep(2)
-            
-            # Renombrar archivo
+
+    inicio = time.time()
+    while time.time() - inicio < timeout:
+        downloaded_file = _descarga_terminada(directorio)
+        if downloaded_file:
             new_name = os.path.join(DOWNLOAD_DIR, f"{category_name}.csv")
-            if os.path.exists(new_name):
-                os.remove(new_name)  # Eliminar si ya existe
-            
-            os.rename(downloaded_file, new_name)
-            print(f"  ✓ CSV descargado y renombrado: {new_name}")
+            os.replace(downloaded_file, new_name)
+            shutil.rmtree(directorio, ignore_errors=True)
+            print(f"  ✓ CSV descargado en {time.time() - inicio:.1f}s y renombrado: {new_name}")
             return new_name
-        
-        time.sleep(1)
-    
+        time.sleep(ESPERA_DESCARGA_INTERVALO)
+
     print(f"  ✗ Timeout esperando descarga del CSV")
     return None
 
@@ -704,7 +623,7 @@ def close_banners(driver):
                         print(f"  🗙 Cerrando popup/banner detectado (intento {attempt+1})...")
                         driver.execute_script("arguments[0].click();", popup)
                         found_any = True
-                        time.sleep(1)
+                        esperas.esperar(driver, "banner_cierre", EC.invisibility_of_element(popup))
             except:
                 continue
     return found_any
@@ -717,9 +636,9 @@ def download_category_csv(driver, category_name, category_url):
         print(f"\n📥 Procesando categoría: {category_name}")
         print(f"   URL: {category_url}")
         
-        # Navegar a la categoría
-        driver.get(category_url)
-        time.sleep(4)  # Esperar un poco más
+        # Navegar a la categoría y esperar el botón CSV (o el DOM listo si la página no lo trae)
+        esperas.cargar_pagina(driver, category_url, "categoria_carga",
+                              lambda d: d.find_elements(*DOWNLOAD_BUTTON_SELECTOR) or d.execute_script("return document.readyState") == "complete")
         
         # 1. Validar que la URL cargada sea la correcta o contenga el segmento esperado
         # Intcomex a veces redirige si hay errores de sesión o banners
@@ -728,17 +647,19 @@ def download_category_csv(driver, category_name, category_url):
         if segmento_esperado not in current_url and "login" not in current_url:
             print(f"  ⚠ Advertencia: URL actual ({current_url}) no parece coincidir con la esperada ({segmento_esperado})")
             print(f"  🔄 Re-navegando para asegurar fidelidad...")
-            driver.get(category_url)
-            time.sleep(3)
+            esperas.cargar_pagina(driver, category_url, "categoria_carga",
+                                  lambda d: d.find_elements(*DOWNLOAD_BUTTON_SELECTOR) or d.execute_script("return document.readyState") == "complete")
 
         # 2. Cerrar banners publicitarios
         close_banners(driver)
         
         # Buscar y hacer click en el botón de descarga
-        wait = WebDriverWait(driver, 15)
+        directorio = preparar_descarga(driver, category_name)
         try:
             # Buscar el botón de descarga
-            download_button = wait.until(EC.presence_of_element_located(DOWNLOAD_BUTTON_SELECTOR))
+            download_button = esperas.esperar(driver, "boton_csv", EC.presence_of_element_located(DOWNLOAD_BUTTON_SELECTOR))
+            if download_button is None:
+                raise Exception("el botón CSV no apareció en la página")
             print(f"  ✓ Botón de descarga encontrado")
             
             # Re-confirmar que no haya aparecido un banner justo antes del click
@@ -746,14 +667,14 @@ def download_category_csv(driver, category_name, category_url):
             
             # Hacer scroll y click
             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", download_button)
-            time.sleep(1)
+            esperas.esperar(driver, "boton_csv_clic", EC.element_to_be_clickable(download_button))
             
             # Click "seguro" usando JS
             print(f"  🖱️  Haciendo clic en botón de descarga...")
             driver.execute_script("arguments[0].click();", download_button)
             
-            # Esperar a que aparezca el archivo descargado
-            csv_file = wait_for_download(category_name, timeout=40)
+            # Esperar a que Chrome termine de escribir el archivo
+            csv_file = wait_for_download(category_name, directorio, timeout=40)
             return csv_file
             
         except Exception as e:
@@ -765,6 +686,13 @@ def download_category_csv(driver, category_name, category_url):
         return None
 
 
+def resolver_url_csv_navegador(driver, category_url):
+    """URL del botón CSV de una categoría leída con el navegador (respaldo de descarga_http)."""
+    driver.get(category_url)
+    boton = WebDriverWait(driver, 15).until(EC.presence_of_element_located(DOWNLOAD_BUTTON_SELECTOR))
+    return boton.get_attribute("href")
+
+
 def obtener_dolar_web(driver):
     """
     Extrae el valor del dólar del encabezado del sitio web de Intcomex.
@@ -781,12 +709,6 @@ def obtener_dolar_web(driver):
     try:
         print(f"  💵 Buscando valor del dólar en el sitio web...")
         
-        # Esperar a que la página cargue completamente
-        time.sleep(2)
-        
-        # Obtener el HTML completo de la página
-        page_source = driver.page_source
-        
         # Buscar patrones comunes donde aparece el tipo de cambio
         # Patrones a buscar: "US$1 = CLP$902", "US$1 = $902", "CLP$902", etc.
         patterns = [
@@ -798,6 +720,12 @@ def obtener_dolar_web(driver):
             r'Tasa[:\s]+(\d+(?:[.,]\d+)?)',          # Tasa: 902.50
         ]
         
+        # Esperar a que el encabezado muestre el tipo de cambio (lo completa un script de la página)
+        esperas.esperar(driver, "dolar", EC.presence_of_element_located(DOLAR_SELECTOR))
+        
+        # Obtener el HTML completo de la página
+        page_source = driver.page_source
+        
         for pattern in patterns:
             matches = re.findall(pattern, page_source, re.IGNORECASE)
             if matches:
@@ -816,7 +744,7 @@ def obtener_dolar_web(driver):
         # Si no se encontró con regex, intentar buscar en elementos específicos del DOM
         try:
             selectors_dolar = [
-                (By.XPATH, "//*[contains(text(), 'US$1') or contains(text(), 'CLP$')]"),
+                DOLAR_SELECTOR,
                 (By.CSS_SELECTOR, "[class*='exchange']"),
                 (By.CSS_SELECTOR, "[class*='tasa']"),
                 (By.CSS_SELECTOR, "[class*='dolar']"),
@@ -919,154 +847,170 @@ def enviar_reporte(descargas_exitosas, errores_descarga, total_stats):
         print(f"❌ Error al enviar el correo: {e}")
 
 
-def sincronizar_csv(archivo_csv, category_name, valor_dolar):
+def sincronizar_csv(archivo_csv, category_name, valor_dolar, huellas=None):
     """
-    Procesa un CSV descargado y actualiza el estado local (estado_productos.json).
+    Procesa un CSV descargado y actualiza el estado local (estado_productos).
+    Sólo carga y guarda los SKUs de la categoría (su partición con STATE_BACKEND=particionado).
     Ya no sincroniza directamente con WooCommerce (Fase A).
+    Al procesar varias categorías, `huellas` (HuellasCorrida) se comparte entre las llamadas: los
+    cambios_woo de las stats ya devueltas se corrigen si una categoría posterior reclama el SKU.
+    Si el estado no se pudo guardar lanza una excepción: la categoría cuenta como fallida.
     """
-    stats = {"procesados": 0, "creados": 0, "actualizados": 0, "filtrados": 0, "errores": 0}
-    nuevos_skus = []
-    
-    state = load_state()
+    stats = {"procesados": 0, "creados": 0, "actualizados": 0, "cambios_woo": 0, "filtrados": 0, "errores": 0}
     
-    # Resetear 'en_csv_reciente' a False para todos los SKUs de esta categoría antes de procesar
-    print(f"  🔄 Limpiando estado de catálogo ('en_csv_reciente' = False) para la categoría '{category_name}'...")
-    for sku, data in state.items():
-        if data.get("categoria_principal") == category_name:
-            data["en_csv_reciente"] = False
+    state = load_category(category_name)
     print(f"  💵 Usando valor del dólar: ${valor_dolar:,.2f} CLP")
     
-    # Lectura ULTRA robusta
-    try:
-        with open(archivo_csv, 'r', encoding='utf-16') as f:
-            lines = f.readlines()
-        
-        header_idx = -1
-        for i, line in enumerate(lines[:20]):
-            l = line.lower()
-            if 'sku' in l or 'categoría' in l or 'nombre' in l:
-                header_idx = i
-                break
-        
-        if header_idx == -1:
-            raise Exception("No se encontró la fila de cabecera en el CSV")
+    # Palabras clave para validar esta categoría específica
+    valid_keywords = CATEGORY_VALIDATION.get(category_name, [])
 
-        csv_content = "".join(lines[header_idx:])
-        df = pd.read_csv(io.StringIO(csv_content), sep='\t', decimal=',', on_bad_lines='skip', engine='python')
-        
+    # Lectura por bloques; precio, stock y filtros como operaciones de columna (ver ingesta_csv.py)
+    try:
+        filas, conteo, filas_leidas = normalizar_csv(archivo_csv, valid_keywords, valor_dolar, MARGIN_PERCENTAGE,
+                                                    categoria=category_name)
     except Exception as e:
         print(f"  ❌ Fallo crítico en lectura de CSV: {e}")
         return stats
 
-    if df.empty:
+    if not filas_leidas:
         return stats
-    
-    df = df.dropna(subset=[df.columns[0]])
-    
-    # Mapeo de columnas
-    sku_col = next((col for col in df.columns if 'sku' in str(col).lower()), None)
-    price_col = next((col for col in df.columns if 'precio' in str(col).lower()), None)
-    stock_col = next((col for col in df.columns if any(x in str(col).lower() for x in ['disponibilidad', 'existencia', 'disponibil'])), None)
-    desc_col = next((col for col in df.columns if any(x in str(col).lower() for x in ['nombre', 'descripción'])), None)
-    attr_col = next((col for col in df.columns if 'atrib' in str(col).lower()), None)
-    cat_col = next((col for col in df.columns if 'categor' in str(col).lower() and 'sub' not in str(col).lower()), None)
-    subcat_col = next((col for col in df.columns if 'subcategor' in str(col).lower()), None)
 
-    # Palabras clave para validar esta categoría específica
-    valid_keywords = CATEGORY_VALIDATION.get(category_name, [])
+    stats["filas_leidas"] = filas_leidas
+    stats["filtrados"] += conteo["filtrados"]
+    stats["errores"] += conteo["errores"]
 
-    for idx, row in df.iterrows():
-        try:
-            sku = str(row[sku_col]).strip() if sku_col and pd.notna(row[sku_col]) else None
-            if not sku: continue
-            
-            # --- VALIDACIÓN DE CATEGORÍA ---
-            if valid_keywords:
-                cat_text = ""
-                if cat_col and pd.notna(row[cat_col]): 
-                    cat_text += str(row[cat_col])
-                if subcat_col and pd.notna(row[subcat_col]): 
-                    cat_text += " " + str(row[subcat_col])
-                
-                # Si no hay ninguna palabra clave en el texto de categoría, saltar
-                if not any(kw.lower() in cat_text.lower() for kw in valid_keywords):
-                    # Opcional: Loguear solo los primeros fallos para no saturar
-                    if stats["filtrados"] < 3:
-                        print(f"    ⚠ Filtrado por categoría incorrecta: SKU {sku} ({cat_text[:30]}...)")
-                    stats["filtrados"] += 1
-                    continue
-            # -------------------------------
-            
-            description = str(row[desc_col]) if desc_col and pd.notna(row[desc_col]) else "Sin descripción"
-            
-            # --- FILTRADO GENERALIZADO POR SUFIJO Y LIQUIDACIONES ---
-            sku_upper = sku.upper()
-            name_upper = description.upper()
-            
-            # Excluir SKUs con sufijos especiales (ej: -B1, -RC, -EX, -S)
-            # Buscamos la presencia de un guión que indica una variante
-            is_special_suffix = '-' in sku_upper
-            
-            # Excluir Liquidaciones y Ofertas (términos solicitados por el usuario)
-            is_liquidation = 'LIQUIDACION' in name_upper or 'OFERTA' in name_upper
-            
-            if is_special_suffix or is_liquidation:
-                if stats["filtrados"] < 10: # Loguear algunos ejemplos más
-                    motivo = f"Sufijo especial ({sku_upper})" if is_special_suffix else "Liquidación/Oferta"
-                    print(f"    🚫 Filtrado por {motivo}: SKU {sku} - {description[:40]}...")
-                stats["filtrados"] += 1
-                continue
-            # --------------------------------------------------------
-            
-            precio_usd = clean_price_to_float(row[price_col])
-            if precio_usd is None or precio_usd <= 0: continue
-            
-            precio_costo_clp = round(precio_usd * valor_dolar)
-            precio_venta_clp = round(precio_costo_clp / (1 - MARGIN_PERCENTAGE))
-            
-            stock = extract_stock_number(row[stock_col]) if stock_col and pd.notna(row[stock_col]) else 0
-            description = str(row[desc_col]) if desc_col and pd.notna(row[desc_col]) else "Sin descripción"
-            
-            # Actualizar estado
-            is_new = sku not in state
-            
-            if is_new:
-                state[sku] = {
-                    "tiene_imagen": False,
-                    "subido_a_woo": False,
-                    "ia_mejorado": False,
-                    "ia_intentos": 0
-                }
-            
-            state[sku].update({
-                "sku": sku,
-                "nombre": description,
-                "cost_price": precio_costo_clp,
-                "sale_price": precio_venta_clp,
-                "stock": stock,
-                "categoria_principal": category_name,
-                "categoria_csv": str(row[cat_col]) if cat_col and pd.notna(row[cat_col]) else None,
-                "subcategoria_csv": str(row[subcat_col]) if subcat_col and pd.notna(row[subcat_col]) else None,
-                "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "pendiente_sync_woo": True,
-                "en_csv_reciente": True
-            })
-            
-            if is_new:
-                stats["creados"] += 1
-                nuevos_skus.append(sku)
-            else:
-                stats["actualizados"] += 1
-                
-            stats["procesados"] += 1
-        except:
-            stats["errores"] += 1
+    # SKUs numéricos guardados con la clave que les daba la lectura anterior ('123', '123.0')
+    alineados = alinear_skus(state, filas)
+    if alineados:
+        print(f"  🔑 {alineados} SKUs numéricos asociados a su clave existente en el estado")
+
+    # 'en_csv_reciente' = False para los SKUs de esta categoría que ya no vienen en el CSV
+    print(f"  🔄 Limpiando estado de catálogo ('en_csv_reciente' = False) para la categoría '{category_name}'...")
+    presentes = set(filas["sku"])
+    for sku, data in state.items():
+        if sku not in presentes and data.en_csv_reciente:
+            data.en_csv_reciente = False
+
+    nuevos_skus = fusionar_en_estado(state, filas, category_name, stats, huellas=huellas)
+    print(f"  ✓ {stats['cambios_woo']} SKUs con cambios para WooCommerce (de {stats['procesados']} procesados)")
+
+    # Sin el estado guardado la categoría cuenta como fallida: su CSV no entra a cache_csv
+    if not save_state(state):
+        raise Exception(f"no se pudo guardar el estado de '{category_name}'")
+
+    try:
+        # Observaciones de esta corrida para la serie histórica de precio/stock
+        registrar_corrida(category_name, filas["sku"], filas["cost_price"], filas["sale_price"], filas["stock"])
+    except Exception as e:
+        print(f"  ⚠ No se pudo registrar la serie de precios de '{category_name}': {e}")
 
-    save_state(state)
     return stats, nuevos_skus
 
+def sincronizar_csvs(descargas, valor_dolar):
+    """
+    Procesa varios CSV descargados ({categoria: archivo}) con un solo guardado del estado.
+    Los CSV se parsean en paralelo (ingesta_csv.normalizar_en_paralelo) y las filas se fusionan
+    aquí en el orden de `descargas` (el de config/categories.json). Si un SKU aparece en varias
+    categorías gana la última en ese orden, igual que al procesarlas una por una.
+    Retorna ({categoria: stats}, nuevos_skus, categorias_fallidas). Si el estado no se pudo guardar
+    lanza una excepción (ninguna categoría se registra en cache_csv).
+    """
+    trabajos = [(cat_name, csv_path, CATEGORY_VALIDATION.get(cat_name, []), valor_dolar, MARGIN_PERCENTAGE)
+                for cat_name, csv_path in descargas.items()]
+    print(f"  ⏳ Parseando {len(trabajos)} CSVs en paralelo...")
+    resultados = normalizar_en_paralelo(trabajos)
+
+    validos = {}
+    fallidas = []
+    for cat_name, resultado in resultados.items():
+        if isinstance(resultado, Exception):
+            print(f"  ❌ Fallo crítico en lectura de CSV de '{cat_name}': {resultado}")
+            fallidas.append(cat_name)
+        elif not resultado[2]:
+            print(f"  ⚠ CSV de '{cat_name}' sin filas.")
+            fallidas.append(cat_name)
+        else:
+            validos[cat_name] = resultado
+
+    stats_por_categoria = {}
+    nuevos_skus = []
+    if not validos:
+        return stats_por_categoria, nuevos_skus, fallidas
+
+    state = load_state()
+
+    # 'en_csv_reciente' = False para los SKUs de estas categorías que ya no vienen en ningún CSV
+    print(f"  🔄 Limpiando estado de catálogo ('en_csv_reciente' = False) para {len(validos)} categorías...")
+    presentes = set()
+    for filas, _, _ in validos.values():
+        alinear_skus(state, filas, buscar_en_otras=False)
+        presentes.update(filas["sku"])
+    for sku, data in state.items():
+        if data.categoria_principal in validos and sku not in presentes and data.en_csv_reciente:
+            data.en_csv_reciente = False
+    print(f"  💵 Usando valor del dólar: ${valor_dolar:,.2f} CLP")
+
+    huellas = HuellasCorrida()
+    for cat_name, (filas, conteo, filas_leidas) in validos.items():
+        stats = {"procesados": 0, "creados": 0, "actualizados": 0, "cambios_woo": 0,
+                 "filtrados": conteo["filtrados"], "errores": conteo["errores"], "filas_leidas": filas_leidas}
+        nuevos_skus.extend(fusionar_en_estado(state, filas, cat_name, stats, buscar_en_otras=False, huellas=huellas))
+        stats_por_categoria[cat_name] = stats
+    # cambios_woo se cuenta en la categoría que se queda con el SKU: se informa al terminar todas
+    for cat_name, stats in stats_por_categoria.items():
+        print(f"  ✓ {cat_name}: {stats['creados']} nuevos, {stats['actualizados']} actualizados, "
+              f"{stats['cambios_woo']} con cambios para WooCommerce, {stats['filtrados']} filtrados")
+
+    if not save_state(state):
+        raise Exception(f"no se pudo guardar el estado de {len(validos)} categorías")
+
+    for cat_name, (filas, _, _) in validos.items():
+        try:
+            # Observaciones de esta corrida para la serie histórica de precio/stock
+            registrar_corrida(cat_name, filas["sku"], filas["cost_price"], filas["sale_price"], filas["stock"])
+        except Exception as e:
+            print(f"  ⚠ No se pudo registrar la serie de precios de '{cat_name}': {e}")
+
+    return stats_por_categoria, nuevos_skus, fallidas
+
 # --- Funciones de Ejecución ---
 
+def crear_driver(rapido=None):
+    """
+    Chrome (headless según HEADLESS) configurado para descargar en DOWNLOAD_DIR.
+    Con el perfil rápido (perfil_rapido.py, PERFIL_RAPIDO) carga eager y sin imágenes, fuentes ni publicidad.
+    """
+    is_headless = os.getenv("HEADLESS", "true").lower() == "true"
+
+    chrome_options = ChromeOptions()
+    if is_headless:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--log-level=3")
+    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-logging"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+
+    prefs = {
+        "download.default_directory": DOWNLOAD_DIR,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "safebrowsing.enabled": True
+    }
+    chrome_options.add_experimental_option("prefs", prefs)
+    perfil_rapido.aplicar_opciones(chrome_options, rapido)
+
+    service = ChromeService(ChromeDriverManager().install())
+    service.log_path = "NUL"
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    driver.maximize_window()
+    perfil_rapido.aplicar_bloqueos(driver, rapido)
+    return driver
+
+
 def run_sync_bot(driver=None, skip_download=False):
     """
     Ejecuta el bot de sincronización completo.
@@ -1080,39 +1024,16 @@ def run_sync_bot(driver=None, skip_download=False):
     if not driver:
         must_close_driver = True
         print("🌐 Inicializando navegador...")
-        is_headless = os.getenv("HEADLESS", "true").lower() == "true"
-        
-        chrome_options = ChromeOptions()
-        if is_headless:
-            chrome_options.add_argument("--headless=new")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--log-level=3")
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-logging"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        prefs = {
-            "download.default_directory": DOWNLOAD_DIR,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": True
-        }
-        chrome_options.add_experimental_option("prefs", prefs)
-        
-        service = ChromeService(ChromeDriverManager().install())
-        service.log_path = "NUL"
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver.maximize_window()
+        driver = crear_driver()
 
     total_stats = {
         "categorias_procesadas": 0,
         "categorias_fallidas": 0,
+        "categorias_sin_cambios": 0,
         "productos_procesados": 0,
         "productos_creados": 0,
         "productos_actualizados": 0,
+        "productos_cambiados_woo": 0,
         "productos_filtrados": 0,
         "errores": 0
     }
@@ -1126,7 +1047,13 @@ def run_sync_bot(driver=None, skip_download=False):
             print("\n📂 MODO LOCAL: Saltando login y descargas. Usando archivos existentes...")
             for cat_name in URLS.keys():
                 csv_path = os.path.join(DOWNLOAD_DIR, f"{cat_name}.csv")
-                if os.path.exists(csv_path):
+                # El último Parquet archivado se lee más rápido que el TSV UTF-16, salvo que
+                # en downloads/ haya un CSV más nuevo (sin archivar)
+                archivado = ultimo_archivo(cat_name)
+                if archivado and (not os.path.exists(csv_path) or os.path.getmtime(archivado) >= os.path.getmtime(csv_path)):
+                    print(f"  📦 {cat_name}: usando el archivo Parquet {archivado}")
+                    descargas_exitosas[cat_name] = archivado
+                elif os.path.exists(csv_path):
                     descargas_exitosas[cat_name] = csv_path
                 else:
                     print(f"  ⚠ CSV local no encontrado para: {cat_name}")
@@ -1137,7 +1064,7 @@ def run_sync_bot(driver=None, skip_download=False):
             max_intentos = 3
             for intento in range(1, max_intentos + 1):
                 print(f"🤖 Intento de login #{intento} de {max_intentos}...")
-                if login_intcomex(driver, USERNAME, PASSWORD):
+                if iniciar_sesion_intcomex(driver, USERNAME, PASSWORD):
                     login_success = True
                     break
                 else:
@@ -1155,17 +1082,31 @@ def run_sync_bot(driver=None, skip_download=False):
             valor_dolar = obtener_dolar_web(driver)
             
             print("\nPASO 1.3: DESCARGA DE CSVs")
-            for cat_name, cat_url in URLS.items():
+            pendientes = dict(URLS)
+            if DESCARGA_HTTP:
+                # Con la sesión ya autenticada los CSV se bajan por HTTP, todos a la vez;
+                # el navegador queda sólo para las categorías que fallen
                 try:
-                    csv_file = download_category_csv(driver, cat_name, cat_url)
-                    if csv_file and os.path.exists(csv_file):
-                        descargas_exitosas[cat_name] = csv_file
-                    else:
-                        errores_descarga.append(cat_name)
+                    sesion = sesion_desde_driver(driver)
+                    descargadas, fallidas = descargar_csvs_http(
+                        sesion, URLS, DOWNLOAD_DIR, resolver=lambda cat, url: resolver_url_csv_navegador(driver, url))
+                    descargas_exitosas.update(descargadas)
+                    pendientes = {cat: URLS[cat] for cat in fallidas}
+                    if pendientes:
+                        print(f"  🔄 {len(pendientes)} categorías se descargarán con el navegador: {', '.join(pendientes)}")
                 except Exception as e:
-                    print(f"  ⚠ Error descargando {cat_name}: {e}")
-                    errores_descarga.append(cat_name)
-                time.sleep(2)
+                    print(f"  ⚠ Descarga HTTP no disponible, se usa el navegador: {e}")
+
+            if pendientes:
+                # Varios navegadores con la sesión clonada del principal, cada uno con su directorio de descarga
+                descargadas, fallidas = descargar_en_pool(
+                    pendientes, driver, crear_driver, download_category_csv,
+                    clonar_sesion=lambda nuevo: copiar_sesion(driver, nuevo))
+                descargas_exitosas.update(descargadas)
+                errores_descarga.extend(fallidas)
+
+            # Mismo orden que config/categories.json (define qué categoría gana si un SKU se repite)
+            descargas_exitosas = {cat: descargas_exitosas[cat] for cat in URLS if cat in descargas_exitosas}
 
     except Exception as e:
         print(f"\n✗ Error crítico en descargas: {e}")
@@ -1175,6 +1116,7 @@ def run_sync_bot(driver=None, skip_download=False):
         if must_close_driver:
             print("\n🔒 Cerrando navegador...")
             driver.quit()
+        esperas.resumen_esperas("ESPERAS DEL NAVEGADOR (FASE 1)")
 
     # FASE 2: ACTUALIZACIÓN DE ESTADO LOCAL
     if descargas_exitosas:
@@ -1182,27 +1124,76 @@ def run_sync_bot(driver=None, skip_download=False):
         print("FASE 2: ACTUALIZACIÓN DE ESTADO LOCAL (JSON)")
         print("="*60)
         
+        # CSVs idénticos al último procesado (mismo dólar): no se parsean ni tocan el estado
+        cache_csv = cargar_cache_csv()
+        firmas = {}
+        por_procesar = {}
         for cat_name, csv_path in descargas_exitosas.items():
             try:
-                print(f"\n🚀 Procesando CSV: {cat_name}")
-                stats, nuevos_skus = sincronizar_csv(csv_path, cat_name, valor_dolar)
-                
+                firma = firma_csv(csv_path, CATEGORY_VALIDATION.get(cat_name, []), valor_dolar, MARGIN_PERCENTAGE)
+            except Exception as e:
+                print(f"  ⚠ No se pudo calcular el hash de {csv_path}: {e}")
+                por_procesar[cat_name] = csv_path
+                continue
+            if csv_sin_cambios(cache_csv, cat_name, firma):
+                print(f"  ⏭ {cat_name}: CSV sin cambios desde {cache_csv[cat_name].get('procesado')}, se omite.")
+                total_stats["categorias_sin_cambios"] += 1
+            else:
+                firmas[cat_name] = firma
+                por_procesar[cat_name] = csv_path
+
+        if INGESTA_PARALELA and len(por_procesar) > 1:
+            try:
+                stats_por_categoria, nuevos_skus, fallidas = sincronizar_csvs(por_procesar, valor_dolar)
+                total_stats["categorias_fallidas"] += len(fallidas)
+                for cat_name, stats in stats_por_categoria.items():
+                    total_stats["categorias_procesadas"] += 1
+                    total_stats["productos_procesados"] += stats.get("procesados", 0)
+                    total_stats["productos_creados"] += stats.get("creados", 0)
+                    total_stats["productos_actualizados"] += stats.get("actualizados", 0)
+                    total_stats["productos_cambiados_woo"] += stats.get("cambios_woo", 0)
+                    total_stats["errores"] += stats.get("errores", 0)
+                    if cat_name in firmas:
+                        registrar_en_cache(cache_csv, cat_name, firmas[cat_name], stats)
+                todos_los_nuevos_skus.extend(nuevos_skus)
+            except Exception as e:
+                total_stats["categorias_fallidas"] += len(por_procesar)
+                print(f"  ✗ Error procesando los CSVs en paralelo: {e}")
+        else:
+            # Las stats se suman al final: una categoría posterior puede corregir los cambios_woo
+            # de una anterior si ambas traen el mismo SKU
+            huellas = HuellasCorrida()
+            stats_por_categoria = {}
+            for cat_name, csv_path in por_procesar.items():
+                try:
+                    print(f"\n🚀 Procesando CSV: {cat_name}")
+                    stats, nuevos_skus = sincronizar_csv(csv_path, cat_name, valor_dolar, huellas=huellas)
+                    stats_por_categoria[cat_name] = stats
+                    todos_los_nuevos_skus.extend(nuevos_skus)
+
+                except Exception as e:
+                    total_stats["categorias_fallidas"] += 1
+                    print(f"  ✗ Error procesando {cat_name}: {e}")
+
+            for cat_name, stats in stats_por_categoria.items():
                 total_stats["categorias_procesadas"] += 1
                 total_stats["productos_procesados"] += stats.get("procesados", 0)
                 total_stats["productos_creados"] += stats.get("creados", 0)
                 total_stats["productos_actualizados"] += stats.get("actualizados", 0)
+                total_stats["productos_cambiados_woo"] += stats.get("cambios_woo", 0)
                 total_stats["errores"] += stats.get("errores", 0)
-                todos_los_nuevos_skus.extend(nuevos_skus)
-                
-            except Exception as e:
-                total_stats["categorias_fallidas"] += 1
-                print(f"  ✗ Error procesando {cat_name}: {e}")
+                if cat_name in firmas:
+                    registrar_en_cache(cache_csv, cat_name, firmas[cat_name], stats)
+
+        if firmas:
+            guardar_cache_csv(cache_csv)
 
     total_stats["categorias_fallidas"] += len(errores_descarga)
     
     print("\n" + "="*60)
     print("✅ FASE A FINALIZADA (ESTADO ACTUALIZADO)")
     print(f"Nuevos en JSON: {total_stats['productos_creados']} | Actualizados en JSON: {total_stats['productos_actualizados']}")
+    print(f"Con cambios para WooCommerce: {total_stats['productos_cambiados_woo']} | Categorías sin cambios: {total_stats['categorias_sin_cambios']}")
     print("="*60)
     
     return total_stats, todos_los_nuevos_skus
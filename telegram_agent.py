@@ -9,6 +9,7 @@ import json
 import socket
 import requests
 from datetime import datetime, timedelta
+from state_store import read_index_counts
 
 # Importar credenciales (usar un archivo dummy si no existe para evitar errores)
 try:
@@ -101,6 +102,16 @@ def send_status(message):
         except Exception as e:
             msg += f"\n(No se pudo leer el estado: {e})"
 
+        # Pendientes del catálogo (conteos publicados por los índices del estado, sin cargarlo)
+        indices = read_index_counts()
+        if indices:
+            c = indices.get("conteos", {})
+            msg += f"\n\n📦 *Catálogo* ({c.get('total', 0)} SKUs, act. {indices.get('actualizado', '?')}):\n"
+            msg += f"- Sin imagen: {c.get('sin_imagen', 0)}\n"
+            msg += f"- Pendientes Woo: {c.get('pendiente_woo', 0)}\n"
+            msg += f"- Pendientes IA: {c.get('pendiente_ia', 0)}\n"
+            msg += f"- Stock bajo: {c.get('stock_bajo', 0)}\n"
+
         bot.reply_to(message, msg, parse_mode="Markdown")
 
 @bot.message_handler(commands=['run_now'])
@@ -0,0 +1,65 @@
+# test_archivo_precios.py
+# Archivo Parquet de las listas de precios: tipos, re-ingesta equivalente, sin duplicados y retención.
+#
+# Uso: pytest test_archivo_precios.py -v
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pandas")
+pq = pytest.importorskip("pyarrow.parquet")
+
+import archivo_precios
+import ingesta_csv
+from generador_csv import generar_csv
+
+CATEGORIA = "Notebooks"
+KEYWORDS = ["Notebook", "Portátiles"]
+
+
+@pytest.fixture(autouse=True)
+def archivo_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(archivo_precios, "ARCHIVO_DIR", str(tmp_path / "archivo"))
+    monkeypatch.setattr(archivo_precios, "ARCHIVAR_CSV", True)
+    return str(tmp_path / "archivo")
+
+
+@pytest.fixture
+def csv(tmp_path):
+    return generar_csv(str(tmp_path / "Notebooks.csv"), 3000, semilla=11)
+
+
+def test_archivo_tipado_y_reingesta_equivalente(csv):
+    desde_csv = ingesta_csv.normalizar_csv(csv, KEYWORDS, 950.0, 0.2, categoria=CATEGORIA)
+    archivos = archivo_precios.listar_archivos(CATEGORIA)
+    assert len(archivos) == 1
+
+    esquema = pq.read_schema(archivos[0])
+    assert str(esquema.field("Precio").type) == "double"
+    assert str(esquema.field("Disponibilidad").type) == "int64"
+    assert str(esquema.field("Sku").type) == "string"
+
+    desde_parquet = ingesta_csv.normalizar_csv(archivos[0], KEYWORDS, 950.0, 0.2, categoria=CATEGORIA)
+    assert desde_parquet == desde_csv
+    assert archivo_precios.metadatos(archivos[0])["hash_origen"] == ingesta_csv.hash_archivo(csv)
+
+
+def test_mismo_csv_no_se_archiva_dos_veces(csv, tmp_path):
+    ingesta_csv.normalizar_csv(csv, KEYWORDS, 950.0, 0.2, categoria=CATEGORIA)
+    ingesta_csv.normalizar_csv(csv, KEYWORDS, 950.0, 0.2, categoria=CATEGORIA)
+    assert len(archivo_precios.listar_archivos(CATEGORIA)) == 1
+
+    otro = generar_csv(str(tmp_path / "Notebooks_2.csv"), 3000, semilla=11, variacion=0.1)
+    ingesta_csv.normalizar_csv(otro, KEYWORDS, 950.0, 0.2, categoria=CATEGORIA)
+    assert len(archivo_precios.listar_archivos(CATEGORIA)) == 2
+
+
+def test_retencion(archivo_dir):
+    hoy = datetime(2026, 5, 5)
+    for dia in (hoy - timedelta(days=200), hoy - timedelta(days=10)):
+        os.makedirs(os.path.join(archivo_dir, dia.strftime("%Y-%m-%d")))
+
+    assert archivo_precios.purgar(hoy, retencion_dias=180) == 1
+    assert os.listdir(archivo_dir) == [(hoy - timedelta(days=10)).strftime("%Y-%m-%d")]
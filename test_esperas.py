@@ -0,0 +1,124 @@
+# test_esperas.py
+# Esperas explícitas de los flujos Selenium con un driver falso: terminan apenas se cumple la
+# condición, devuelven None al vencer y el resumen acumula las mediciones por paso.
+#
+# Uso: pytest test_esperas.py -v
+
+import json
+import time
+
+import pytest
+
+pytest.importorskip("selenium")
+
+import esperas
+
+
+class DriverFalso:
+    """readyState, conteo de recursos y URL que avanzan con el tiempo, como una página real."""
+
+    def __init__(self, listo_en=0.0, recursos=(), url="about:blank"):
+        self.inicio = time.perf_counter()
+        self.listo_en = listo_en
+        self.recursos = list(recursos)  # [(segundos, cantidad)]: cantidad de recursos desde ese momento
+        self.current_url = url
+        self.visitadas = []
+
+    def transcurrido(self):
+        return time.perf_counter() - self.inicio
+
+    def get(self, url):
+        self.inicio = time.perf_counter()
+        self.current_url = url
+        self.visitadas.append(url)
+
+    def execute_script(self, script):
+        if "readyState" in script:
+            return "complete" if self.transcurrido() >= self.listo_en else "loading"
+        if "getEntriesByType" in script:
+            return max([cantidad for desde, cantidad in self.recursos if self.transcurrido() >= desde] or [0])
+        raise AssertionError(f"script inesperado: {script}")
+
+
+@pytest.fixture(autouse=True)
+def registro_limpio(monkeypatch):
+    monkeypatch.setattr(esperas, "ESPERA_INTERVALO", 0.01)
+    esperas._registro.clear()
+    yield
+    esperas._registro.clear()
+
+
+def test_espera_termina_apenas_se_cumple():
+    driver = DriverFalso(listo_en=0.1)
+
+    inicio = time.perf_counter()
+    assert esperas.documento_listo(driver, timeout=5) is True
+    assert time.perf_counter() - inicio < 1
+
+    (segundos, cumplida), = esperas._registro["documento"]
+    assert cumplida and 0.05 <= segundos < 1
+
+
+def test_espera_vencida_devuelve_none():
+    driver = DriverFalso(listo_en=60)
+
+    assert esperas.esperar(driver, "boton_csv", lambda d: d.execute_script("return document.readyState") == "complete",
+                           timeout=0.2) is None
+    (segundos, cumplida), = esperas._registro["boton_csv"]
+    assert not cumplida and segundos >= 0.2
+
+
+def test_devuelve_el_valor_de_la_condicion():
+    driver = DriverFalso()
+    assert esperas.esperar(driver, "boton_csv", lambda d: {"elemento": 1}, timeout=1) == {"elemento": 1}
+
+
+def test_red_inactiva_espera_que_paren_los_pedidos():
+    driver = DriverFalso(recursos=[(0, 3), (0.1, 5), (0.2, 8)])
+
+    assert esperas.red_inactiva(driver, quieto=0.15, timeout=5)
+    (segundos, _), = esperas._registro["red_inactiva"]
+    assert segundos >= 0.35  # último recurso a los 0.2s + 0.15s sin cambios
+
+
+def test_cargar_pagina_con_condicion():
+    driver = DriverFalso(listo_en=0.05)
+    intentos = []
+
+    def boton(d):
+        intentos.append(d.execute_script("return document.readyState"))
+        return len(intentos) >= 3 and "boton"
+
+    assert esperas.cargar_pagina(driver, "https://store.intcomex.com/Notebooks", "categoria_carga", boton, timeout=5) == "boton"
+    assert driver.visitadas == ["https://store.intcomex.com/Notebooks"]
+    assert set(intentos) == {"complete"}  # la condición no se evalúa antes del DOM listo
+
+
+def test_timeout_por_variable_de_entorno(monkeypatch):
+    monkeypatch.setenv("ESPERA_CATEGORIA_CARGA", "20")
+    assert esperas.timeout_paso("categoria_carga") == 20
+    monkeypatch.setenv("ESPERA_CATEGORIA_CARGA", "veinte")
+    assert esperas.timeout_paso("categoria_carga") == esperas.TIMEOUTS["categoria_carga"]
+    assert esperas.timeout_paso("paso_desconocido", 7) == 7
+
+
+def test_resumen_acumula_historial(tmp_path):
+    path = str(tmp_path / "esperas.json")
+    for segundos in (0.5, 1.0, 1.5):
+        esperas.registrar("boton_csv", segundos, True)
+    esperas.registrar("dolar", esperas.timeout_paso("dolar"), False)
+
+    resumen = esperas.resumen_esperas("PRUEBA", path=path)
+
+    assert resumen["boton_csv"]["esperas"] == 3
+    assert resumen["boton_csv"]["promedio_s"] == 1.0
+    assert resumen["boton_csv"]["timeout_sugerido_s"] == 3.0
+    assert resumen["dolar"]["timeouts"] == 1
+    assert resumen["dolar"]["timeout_sugerido_s"] == resumen["dolar"]["timeout_s"]
+    assert esperas._registro == {}
+
+    esperas.registrar("boton_csv", 0.2, True)
+    esperas.resumen_esperas("PRUEBA", path=path)
+    with open(path, 'r', encoding='utf-8') as f:
+        historial = json.load(f)
+    assert [list(corrida["pasos"]) for corrida in historial] == [["boton_csv", "dolar"], ["boton_csv"]]
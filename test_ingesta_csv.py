@@ -0,0 +1,213 @@
+# test_ingesta_csv.py
+# Fusión de las filas normalizadas en el estado: un SKU que viene en el CSV de varias
+# categorías no debe quedar pendiente_sync_woo en cada corrida si su contenido no cambió.
+#
+# Uso: pytest test_ingesta_csv.py -v
+
+import pytest
+
+pytest.importorskip("pandas")
+
+import ingesta_csv
+import state_store
+from state_store import EstadoRastreado, JsonStateBackend, StateRepository, load_category, load_state, save_state
+from ingesta_csv import (COLUMNAS_NORMALIZADAS, HuellasCorrida, alinear_skus, claves_previas, fusionar_en_estado,
+                         leer_csv_por_bloques, mapear_columnas, normalizar_filas, normalizar_vectorizado)
+from generador_csv import generar_csv
+
+# SKU2 y SKU3 vienen en más de una categoría; gana la última en este orden
+CATEGORIAS = {
+    "Notebooks": ["SKU1", "SKU2", "SKU3"],
+    "Gamer": ["SKU2", "SKU4"],
+    "Empresariales": ["SKU3", "SKU2", "SKU5"],
+}
+
+
+def _filas(skus, precios=None):
+    precios = precios or {}
+    filas = {campo: [] for campo in COLUMNAS_NORMALIZADAS}
+    for sku in skus:
+        venta = precios.get(sku, 100000)
+        for campo, valor in zip(COLUMNAS_NORMALIZADAS, (sku, f"Producto {sku}", venta * 0.8, venta, 5, "Computadores", "Notebooks")):
+            filas[campo].append(valor)
+    return filas
+
+
+def _stats():
+    return {"procesados": 0, "creados": 0, "actualizados": 0, "cambios_woo": 0, "errores": 0}
+
+
+def _corrida_completa(state, precios=None):
+    """Como sync_bot.sincronizar_csvs: todas las categorías sobre el catálogo completo."""
+    huellas = HuellasCorrida()
+    stats = {}
+    for categoria, skus in CATEGORIAS.items():
+        stats[categoria] = _stats()
+        fusionar_en_estado(state, _filas(skus, precios), categoria, stats[categoria], buscar_en_otras=False, huellas=huellas)
+    return stats
+
+
+def _corrida_por_categoria(precios=None):
+    """Como el loop secuencial de sync_bot: carga y guarda sólo la categoría de cada CSV."""
+    huellas = HuellasCorrida()
+    stats = {}
+    for categoria, skus in CATEGORIAS.items():
+        state = load_category(categoria)
+        stats[categoria] = _stats()
+        fusionar_en_estado(state, _filas(skus, precios), categoria, stats[categoria], huellas=huellas)
+        save_state(state)
+    return stats
+
+
+def _sincronizado_con_woo(state):
+    for data in state.values():
+        data.pendiente_sync_woo = False
+
+
+@pytest.fixture
+def repositorio(tmp_path, monkeypatch):
+    backend = JsonStateBackend(str(tmp_path / "estado.json"), str(tmp_path / "estado.journal.jsonl"))
+    monkeypatch.setattr(state_store, "_backend", backend)
+    monkeypatch.setattr(state_store, "_repositorio", StateRepository(backend, str(tmp_path / "indices.json")))
+    return backend
+
+
+def test_reingesta_identica_catalogo_completo_sin_cambios():
+    state = EstadoRastreado()
+    primera = _corrida_completa(state)
+    assert sum(s["cambios_woo"] for s in primera.values()) == 5
+    assert primera["Empresariales"]["cambios_woo"] == 3  # se queda con SKU2 y SKU3
+    assert state["SKU2"].categoria_principal == "Empresariales"
+    _sincronizado_con_woo(state)
+    state.confirmar(None)
+
+    segunda = _corrida_completa(state)
+
+    assert sum(s["cambios_woo"] for s in segunda.values()) == 0
+    assert state.cambios() == {}
+    assert state.indice("pendiente_woo") == []
+
+
+def test_cambio_en_sku_repetido_se_cuenta_una_vez():
+    state = EstadoRastreado()
+    _corrida_completa(state)
+    _sincronizado_con_woo(state)
+    state.confirmar(None)
+
+    stats = _corrida_completa(state, precios={"SKU2": 120000})
+
+    assert sum(s["cambios_woo"] for s in stats.values()) == 1
+    assert stats["Empresariales"]["cambios_woo"] == 1
+    assert state.indice("pendiente_woo") == ["SKU2"]
+    assert set(state.cambios()) == {"SKU2"}
+
+
+def test_reingesta_identica_por_categoria_sin_cambios(repositorio):
+    _corrida_por_categoria()
+    state = load_state()
+    _sincronizado_con_woo(state)
+    save_state(state)
+    antes = {sku: data.to_dict() for sku, data in load_state().items()}
+
+    stats = _corrida_por_categoria()
+
+    assert sum(s["cambios_woo"] for s in stats.values()) == 0
+    despues = {sku: data.to_dict() for sku, data in load_state().items()}
+    assert despues == antes
+    assert despues["SKU3"]["categoria_principal"] == "Empresariales"
+
+
+# --- SKUs numéricos guardados por la lectura anterior (tipos inferidos por pandas) ---
+
+def test_claves_previas():
+    assert claves_previas("00123") == ["123", "123.0"]
+    assert claves_previas("123") == ["123.0"]
+    assert claves_previas("SKU1") == claves_previas("0x12") == claves_previas("١٢") == []
+
+
+def test_sku_numerico_conserva_su_clave_existente():
+    state = EstadoRastreado()
+    _corrida_completa(state)
+    for clave in ("123", "456.0", "777"):
+        fusionar_en_estado(state, _filas([clave]), "Notebooks", _stats(), buscar_en_otras=False)
+    _sincronizado_con_woo(state)
+    state.confirmar(None)
+
+    # "0777" y "777" vienen ambos: son productos distintos
+    filas = _filas(["00123", "456", "0777", "777", "0999"])
+    assert alinear_skus(state, filas, buscar_en_otras=False) == 2
+    assert filas["sku"] == ["123", "456.0", "0777", "777", "0999"]
+
+    stats = _stats()
+    nuevos = fusionar_en_estado(state, filas, "Notebooks", stats, buscar_en_otras=False)
+    assert nuevos == ["0777", "0999"]
+    assert stats["creados"] == 2 and stats["actualizados"] == 3
+    assert "00123" not in state and "456" not in state
+
+
+def test_sku_numerico_de_otra_categoria(repositorio):
+    state = load_category("Gamer")
+    fusionar_en_estado(state, _filas(["123"]), "Gamer", _stats())
+    save_state(state)
+
+    state = load_category("Notebooks")
+    filas = _filas(["00123"])
+    assert alinear_skus(state, filas) == 1
+    assert fusionar_en_estado(state, filas, "Notebooks", _stats()) == []
+    save_state(state)
+    assert sorted(load_state()) == ["123"]
+    assert load_state()["123"].categoria_principal == "Notebooks"
+
+
+# --- Ruta vectorizada vs fila a fila ---
+
+# Precios y stocks que el generador no produce: separadores de miles al revés, espacios,
+# infinitos, dígitos no ASCII, números que no caben en 64 bits, negativos y texto suelto
+PRECIOS_SUCIOS = ["1,234.56", "  12,5  ", "USD1.234", "inf", "1e400", "-15,00", "٣٤٥", "nan", "$", "12.345.678",
+                  "0,001", "1.2.3", "N/A", "9" * 30]
+STOCKS_SUCIOS = ["Más de 99999999999999999999", "١٢", "DISPONIBLE", "En Stock", "-3", "abc", "  7  ", "Más de 1.000",
+                 "0", "1e3", "Disponible: 5"]
+
+
+def _csv_con_filas_sucias(path):
+    generar_csv(path, 3000, semilla=3)
+    filas = []
+    for i, precio in enumerate(PRECIOS_SUCIOS * 2):
+        stock = STOCKS_SUCIOS[i % len(STOCKS_SUCIOS)]
+        filas.append(["Computadores", "Notebooks", f"SUCIO{i:03d}", "MPN-1", f"Notebook Sucio {i}", "", precio, "USD", stock])
+    # Sin BOM: el archivo ya lo trae al comienzo
+    with open(path, "a", encoding="utf-16-le", newline="") as f:
+        f.write("\n".join("\t".join(fila) for fila in filas) + "\n")
+    return path
+
+
+def test_vectorizado_igual_a_filas(tmp_path, capsys):
+    path = _csv_con_filas_sucias(str(tmp_path / "Notebooks.csv"))
+    bloques = list(leer_csv_por_bloques(path, filas_por_bloque=1000))
+    assert len(bloques) > 1
+
+    for bloque in bloques:
+        columnas = mapear_columnas(bloque.columns)
+        referencia = normalizar_filas(bloque, columnas, ["Notebook", "Portátiles"], 950.5, 0.2)
+        vectorizado = normalizar_vectorizado(bloque, columnas, ["Notebook", "Portátiles"], 950.5, 0.2)
+        assert vectorizado == referencia
+
+    ultimo = bloques[-1]
+    sucios = ultimo[mapear_columnas(ultimo.columns)["sku"]].str.startswith("SUCIO")
+    assert sucios.sum() == 2 * len(PRECIOS_SUCIOS)
+    capsys.readouterr()
+
+
+def test_procesos_de_ingesta_acotados_por_memoria(monkeypatch):
+    monkeypatch.setattr(ingesta_csv, "INGESTA_PROCESOS", 0)
+    monkeypatch.setattr(ingesta_csv.os, "cpu_count", lambda: 32)
+    monkeypatch.setattr(ingesta_csv, "memoria_disponible_mb", lambda: None)
+    assert ingesta_csv.procesos_ingesta(10) == ingesta_csv.INGESTA_PROCESOS_MAX
+    assert ingesta_csv.procesos_ingesta(2) == 2
+
+    monkeypatch.setattr(ingesta_csv, "memoria_disponible_mb", lambda: 2.5 * ingesta_csv.MB_POR_PROCESO_INGESTA)
+    assert ingesta_csv.procesos_ingesta(10) == 2
+    assert ingesta_csv.procesos_ingesta(10, pedido=8) == 2
+
+    monkeypatch.setattr(ingesta_csv, "memoria_disponible_mb", lambda: 100)
+    assert ingesta_csv.procesos_ingesta(10) == 1
@@ -0,0 +1,89 @@
+# test_parsers.py
+# Equivalencia (basada en propiedades) entre los parsers escalares de precio/stock y sus
+# versiones vectorizadas parse_prices / parse_stock de ingesta_csv.
+#
+# Uso: pytest test_parsers.py -v
+
+import math
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+hypothesis = pytest.importorskip("hypothesis")
+from hypothesis import given, settings, strategies as st
+
+from ingesta_csv import clean_price_to_float, extract_stock_number, parse_prices, parse_stock
+
+# Piezas con las que se arman los textos: formatos reales de Intcomex y ruido
+DIGITOS = st.text(alphabet="0123456789", min_size=1, max_size=7)
+PRECIOS_FORMATO = st.one_of(
+    st.builds(lambda e, d: f"{e},{d}", DIGITOS, st.text(alphabet="0123456789", max_size=3)),     # 487,50
+    st.builds(lambda a, b, d: f"$ {a}.{b},{d}", DIGITOS, DIGITOS, DIGITOS),                        # $ 1.234,56
+    st.builds(lambda a, b: f"{a}.{b}", DIGITOS, DIGITOS),                                          # 1.234 / 487.50
+    st.builds(lambda m, a: f"{m} {a}", st.sampled_from(["USD", "CLP", "usd", "$"]), DIGITOS),
+)
+TEXTO_LIBRE = st.text(alphabet="0123456789.,$ CLPUSDusdeinfa-_٣", max_size=12)
+PRECIOS = st.one_of(PRECIOS_FORMATO, TEXTO_LIBRE, st.floats(allow_nan=True), st.integers(-10**6, 10**6), st.none())
+
+STOCKS_FORMATO = st.one_of(
+    st.builds(lambda n: f"Más de {n}", DIGITOS),
+    st.builds(lambda n: f"Disponible: {n} unidades", DIGITOS),
+    st.sampled_from(["Disponible", "En stock", "Agotado", "", "  EN STOCK  ", "٣ unidades"]),
+)
+STOCKS = st.one_of(STOCKS_FORMATO, st.text(max_size=10), DIGITOS,
+                   st.floats(allow_nan=False, allow_infinity=False, min_value=-1e12, max_value=1e12), st.none())
+
+
+def _iguales(a, b):
+    if a is None or (isinstance(a, float) and math.isnan(a)):
+        return b is None or (isinstance(b, float) and math.isnan(b))
+    return a == b
+
+
+@settings(max_examples=300, deadline=None)
+@given(st.lists(PRECIOS, max_size=30))
+def test_parse_prices_equivale_a_clean_price_to_float(valores):
+    esperado = [clean_price_to_float(v) for v in valores]
+    obtenido = parse_prices(pd.Series(valores, dtype=object)).tolist()
+    assert all(_iguales(e, o) for e, o in zip(esperado, obtenido))
+
+
+@settings(max_examples=300, deadline=None)
+@given(st.lists(st.floats(allow_nan=True, allow_infinity=False), max_size=30))
+def test_parse_prices_columna_numerica(valores):
+    esperado = [clean_price_to_float(v) for v in valores]
+    obtenido = parse_prices(pd.Series(valores, dtype="float64")).tolist()
+    assert all(_iguales(e, o) for e, o in zip(esperado, obtenido))
+
+
+@settings(max_examples=300, deadline=None)
+@given(st.lists(STOCKS, max_size=30))
+def test_parse_stock_equivale_a_extract_stock_number(valores):
+    # La ingesta sólo llama a extract_stock_number con valores no nulos y usa 0 en los nulos
+    esperado = [extract_stock_number(v) if v is not None else 0 for v in valores]
+    assert parse_stock(pd.Series(valores, dtype=object)).tolist() == esperado
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("1.234,56", 1234.56),
+    ("487,50", 487.5),
+    ("$ 150.000", 150000.0),
+    ("$150.000", 150000.0),
+    ("1,234", 1234.0),
+    ("USD 487.50", 487.5),
+    ("Consultar", None),
+])
+def test_formatos_de_precio(texto, esperado):
+    assert clean_price_to_float(texto) == esperado
+    assert _iguales(esperado, parse_prices(pd.Series([texto])).iloc[0])
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("Más de 20", 20),
+    ("Disponible: 100 unidades", 100),
+    ("Disponible", 1),
+    ("Agotado", 0),
+])
+def test_formatos_de_stock(texto, esperado):
+    assert extract_stock_number(texto) == esperado
+    assert parse_stock(pd.Series([texto])).iloc[0] == esperado
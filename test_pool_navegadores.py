@@ -0,0 +1,153 @@
+# test_pool_navegadores.py
+# Reparto de categorías entre los navegadores del pool: reintentos en otro contexto y
+# navegadores que dejan de responder. Drivers y descargas falsos (sin Chrome).
+#
+# Uso: pytest test_pool_navegadores.py -v
+
+import threading
+
+import pytest
+
+import pool_navegadores
+from pool_navegadores import descargar_en_pool
+
+
+class DriverFalso:
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.vivo = True
+        self.cerrado = False
+
+    @property
+    def current_url(self):
+        if not self.vivo:
+            raise ConnectionError("chrome not reachable")
+        return "https://store.intcomex.com/"
+
+    def quit(self):
+        self.cerrado = True
+
+
+class DescargaFalsa:
+    """descargar(driver, categoria, url): escribe el CSV salvo que `fallar` diga lo contrario."""
+
+    def __init__(self, directorio, fallar=lambda driver, categoria, intentos: False, contextos=None):
+        self.directorio = directorio
+        self.fallar = fallar
+        self.llamadas = []
+        self.cerrojo = threading.Lock()
+        # Con `contextos`, ninguna descarga termina hasta que cada contexto tomó su primera categoría
+        self.barrera = threading.Barrier(contextos) if contextos else None
+
+    def __call__(self, driver, categoria, url):
+        with self.cerrojo:
+            intentos = sum(1 for _, cat in self.llamadas if cat == categoria)
+            primera = all(nombre != driver.nombre for nombre, _ in self.llamadas)
+            self.llamadas.append((driver.nombre, categoria))
+        if self.barrera is not None and primera:
+            self.barrera.wait(timeout=5)
+        if not driver.vivo:
+            raise ConnectionError("chrome not reachable")
+        if self.fallar(driver, categoria, intentos):
+            return None
+        ruta = self.directorio / f"{categoria}.csv"
+        ruta.write_text("Sku\tPrecio\n", encoding="utf-8")
+        return str(ruta)
+
+    def contextos(self, categoria):
+        return [nombre for nombre, cat in self.llamadas if cat == categoria]
+
+
+CATEGORIAS = {cat: f"https://store.intcomex.com/{cat}" for cat in ("Notebooks", "Monitores", "Tablets", "Scanners", "Desktop")}
+
+
+def _pool(descarga, tamano, principal=None):
+    principal = principal or DriverFalso("principal")
+    creados = []
+
+    def crear_driver():
+        creados.append(DriverFalso(f"extra{len(creados) + 1}"))
+        return creados[-1]
+
+    descargadas, fallidas = descargar_en_pool(CATEGORIAS, principal, crear_driver, descarga,
+                                              clonar_sesion=lambda driver: None, tamano=tamano)
+    return descargadas, fallidas, principal, creados
+
+
+@pytest.fixture(autouse=True)
+def un_reintento(monkeypatch):
+    monkeypatch.setattr(pool_navegadores, "DESCARGA_REINTENTOS", 1)
+
+
+def test_todas_las_categorias_se_descargan(tmp_path):
+    descarga = DescargaFalsa(tmp_path)
+
+    descargadas, fallidas, principal, creados = _pool(descarga, tamano=3)
+
+    assert sorted(descargadas) == sorted(CATEGORIAS)
+    assert fallidas == []
+    assert len(descarga.llamadas) == len(CATEGORIAS)
+    assert [driver.cerrado for driver in creados] == [True, True]
+    assert not principal.cerrado
+
+
+def test_reintento_en_otro_contexto(tmp_path):
+    descarga = DescargaFalsa(tmp_path, fallar=lambda driver, categoria, intentos: categoria == "Tablets" and intentos == 0)
+
+    descargadas, fallidas, _, _ = _pool(descarga, tamano=2)
+
+    assert "Tablets" in descargadas and fallidas == []
+    primero, segundo = descarga.contextos("Tablets")
+    assert primero != segundo
+
+
+def test_con_un_solo_contexto_el_reintento_vuelve_al_mismo(tmp_path):
+    descarga = DescargaFalsa(tmp_path, fallar=lambda driver, categoria, intentos: categoria == "Tablets" and intentos == 0)
+
+    descargadas, fallidas, _, _ = _pool(descarga, tamano=1)
+
+    assert sorted(descargadas) == sorted(CATEGORIAS) and fallidas == []
+    assert descarga.contextos("Tablets") == ["principal", "principal"]
+
+
+def test_reintentos_agotados(tmp_path):
+    descarga = DescargaFalsa(tmp_path, fallar=lambda driver, categoria, intentos: categoria in ("Tablets", "Desktop"),
+                             contextos=3)
+
+    descargadas, fallidas, _, _ = _pool(descarga, tamano=3)
+
+    assert fallidas == ["Tablets", "Desktop"]
+    assert sorted(descargadas) == ["Monitores", "Notebooks", "Scanners"]
+    for categoria in fallidas:
+        intentos = descarga.contextos(categoria)
+        assert len(intentos) == 2 and intentos[0] != intentos[1]
+
+
+def test_navegador_caido_sale_del_pool(tmp_path):
+    def caer(driver, categoria, intentos):
+        if driver.nombre == "extra1":
+            driver.vivo = False
+            return True
+        return False
+    descarga = DescargaFalsa(tmp_path, fallar=caer, contextos=3)
+
+    descargadas, fallidas, _, _ = _pool(descarga, tamano=3)
+
+    assert sorted(descargadas) == sorted(CATEGORIAS) and fallidas == []
+    # Tomó una sola categoría y esa se reintentó en otro contexto
+    perdida = [cat for nombre, cat in descarga.llamadas if nombre == "extra1"]
+    assert len(perdida) == 1
+    assert descarga.contextos(perdida[0])[1] != "extra1"
+
+
+def test_todos_los_navegadores_caidos(tmp_path):
+    def caer(driver, categoria, intentos):
+        driver.vivo = False
+        return True
+    descarga = DescargaFalsa(tmp_path, fallar=caer, contextos=2)
+
+    descargadas, fallidas, _, _ = _pool(descarga, tamano=2)
+
+    assert descargadas == {}
+    assert sorted(fallidas) == sorted(CATEGORIAS)
+    assert len(descarga.llamadas) == 2
@@ -0,0 +1,75 @@
+# test_series_precios.py
+# Serie histórica de precio/stock: consulta por SKU, filtro exacto por categoría y retención.
+#
+# Uso: pytest test_series_precios.py -v
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import series_precios
+from series_precios import registrar_corrida, serie_sku, skus_con_cambio, purgar
+
+AYER = datetime(2026, 5, 4, 10, 0, 0)
+HOY = datetime(2026, 5, 5, 10, 0, 0)
+
+
+@pytest.fixture(autouse=True)
+def series_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(series_precios, "SERIES_DIR", str(tmp_path / "series"))
+    series_precios._leer.cache_clear()
+    yield str(tmp_path / "series")
+    series_precios._leer.cache_clear()
+
+
+def _corrida(categoria, precios, momento, stock=5):
+    skus = list(precios)
+    return registrar_corrida(categoria, skus, [p * 0.8 for p in precios.values()], list(precios.values()),
+                             [stock] * len(skus), momento=momento)
+
+
+def test_serie_sku_en_corridas_ordenadas():
+    _corrida("Notebooks", {"Z9": 300, "A1": 100, "M5": 200}, AYER)
+    _corrida("Notebooks", {"M5": 250, "A1": 100}, HOY)
+
+    assert serie_sku("M5", hasta=HOY) == [
+        ("2026-05-04 10:00:00", 160.0, 200, 5),
+        ("2026-05-05 10:00:00", 200.0, 250, 5),
+    ]
+    assert serie_sku("Z9", hasta=HOY) == [("2026-05-04 10:00:00", 240.0, 300, 5)]
+    assert serie_sku("NO-EXISTE", hasta=HOY) == []
+
+
+def test_filtro_de_categoria_exacto():
+    # "monitores_2" no debe confundirse con la segunda corrida del mismo segundo de "monitores"
+    _corrida("Monitores", {"A1": 100}, HOY)
+    _corrida("Monitores", {"A1": 110}, HOY)
+    _corrida("Monitores 2", {"A1": 999}, HOY)
+
+    assert [obs[2] for obs in serie_sku("A1", categoria="Monitores", hasta=HOY)] == [100, 110]
+    assert [obs[2] for obs in serie_sku("A1", categoria="Monitores 2", hasta=HOY)] == [999]
+
+
+def test_colisiones_del_mismo_segundo_en_orden_numerico():
+    for precio in range(100, 112):
+        _corrida("Monitores", {"A1": precio}, HOY)
+
+    assert [obs[2] for obs in serie_sku("A1", categoria="Monitores", hasta=HOY)] == list(range(100, 112))
+    assert skus_con_cambio("sale_price", fecha=HOY) == {"A1": (100, 111)}
+
+
+def test_skus_con_cambio():
+    _corrida("Notebooks", {"A1": 100, "B2": 200}, AYER)
+    _corrida("Notebooks", {"A1": 100, "B2": 250}, HOY)
+
+    assert skus_con_cambio("sale_price", fecha=HOY) == {"B2": (200, 250)}
+
+
+def test_retencion(series_dir):
+    _corrida("Notebooks", {"A1": 100}, HOY - timedelta(days=30))
+    _corrida("Notebooks", {"A1": 110}, HOY)
+
+    assert purgar(HOY, retencion_dias=10) == 1
+    assert sorted(os.listdir(series_dir)) == [HOY.strftime("%Y-%m-%d")]
+    assert [obs[2] for obs in serie_sku("A1", dias=60, hasta=HOY)] == [110]
@@ -0,0 +1,302 @@
+# test_state_store.py
+# Persistencia del catálogo (state_store): journal, guardado por categoría y backends.
+#
+# Uso: pytest test_state_store.py -v
+
+import json
+import os
+
+import pytest
+
+import state_store
+from product_record import ProductRecord
+from state_store import (CAMPO_ELIMINADO, JsonStateBackend, PartitionedStateBackend, SQLiteStateBackend,
+                         StateRepository)
+
+BACKENDS = ("json", "compacto", "sqlite", "particionado")
+
+
+def _catalogo(n, categoria="Notebooks"):
+    return {f"SKU{i}": {"sku": f"SKU{i}", "stock": i, "categoria_principal": categoria} for i in range(n)}
+
+
+def _lineas(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f]
+
+
+def _crear_backend(nombre, directorio):
+    """Backend nuevo sobre los archivos de `directorio` (dos llamadas = dos escritores sobre el mismo estado)."""
+    json_path = str(directorio / "estado.json")
+    if nombre == "sqlite":
+        return SQLiteStateBackend(str(directorio / "estado.db"), json_path)
+    if nombre == "particionado":
+        return PartitionedStateBackend(str(directorio / "particiones"), json_path)
+    return JsonStateBackend(json_path, str(directorio / "estado.journal.jsonl"), formato=nombre)
+
+
+@pytest.fixture(params=BACKENDS)
+def nombre_backend(request):
+    return request.param
+
+
+@pytest.fixture
+def json_backend(tmp_path):
+    return JsonStateBackend(str(tmp_path / "estado.json"), str(tmp_path / "estado.journal.jsonl"))
+
+
+@pytest.fixture
+def repositorio(tmp_path, json_backend):
+    return StateRepository(json_backend, str(tmp_path / "indices.json"))
+
+
+@pytest.fixture
+def repositorio_global(repositorio, monkeypatch):
+    """El repositorio de prueba como el que usan load_state/apply_changes/..."""
+    monkeypatch.setattr(state_store, "_backend", repositorio.backend)
+    monkeypatch.setattr(state_store, "_repositorio", repositorio)
+    return repositorio
+
+
+def test_journal_una_linea_por_sku(json_backend):
+    json_backend.save(_catalogo(2))
+    json_backend.apply({"SKU0": {"stock": 7, "nombre": "Nuevo", "categoria_principal": CAMPO_ELIMINADO}, "SKU1": None})
+
+    assert _lineas(json_backend.journal_path) == [
+        {"sku": "SKU0", "campos": {"stock": 7, "nombre": "Nuevo"}, "eliminados": ["categoria_principal"]},
+        {"sku": "SKU1", "eliminar": True},
+    ]
+    assert json_backend.load() == {"SKU0": {"sku": "SKU0", "stock": 7, "nombre": "Nuevo"}}
+
+
+def test_guardar_categoria_casi_completa_reescribe_snapshot(repositorio, json_backend):
+    json_backend.save(dict(_catalogo(10), MON1={"sku": "MON1", "stock": 1, "categoria_principal": "Monitores"}))
+    state = repositorio.load_category("Notebooks")
+    for data in state.values():
+        data.stock += 100
+
+    repositorio.save(state)
+
+    assert not os.path.exists(json_backend.journal_path)
+    with open(json_backend.path, 'r', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    assert snapshot["SKU3"]["stock"] == 103
+    assert snapshot["MON1"]["stock"] == 1
+    assert repositorio.load()["SKU3"].stock == 103
+    assert state.cambios() == {}
+
+
+def test_guardar_pocos_cambios_de_categoria_usa_journal(repositorio, json_backend):
+    json_backend.save(_catalogo(10))
+    state = repositorio.load_category("Notebooks")
+    state["SKU3"].stock = 50
+
+    repositorio.save(state)
+
+    assert _lineas(json_backend.journal_path) == [{"sku": "SKU3", "campos": {"stock": 50}}]
+    assert json_backend.load()["SKU3"]["stock"] == 50
+
+
+def test_guardar_categoria_no_persiste_cambios_ajenos(repositorio, json_backend):
+    json_backend.save(_catalogo(10))
+    compartido = repositorio.load()
+    compartido["SKU0"].nombre = "Sin guardar"  # cambio pendiente de otra fase del proceso
+    state = repositorio.load_category("Notebooks")
+    for data in state.values():
+        data.stock += 100
+
+    repositorio.save(state)
+
+    assert "nombre" not in json_backend.load()["SKU0"]
+    assert json_backend.load()["SKU0"]["stock"] == 100
+    assert len(_lineas(json_backend.journal_path)) == 10
+
+
+def test_conteos_se_publican_al_terminar_la_fase(repositorio_global):
+    repositorio_global.backend.save(_catalogo(5))
+    state_store.load_state()
+    for sku in ("SKU1", "SKU2", "SKU3"):
+        state_store.update_fields(sku, {"stock": 1})
+    assert not os.path.exists(repositorio_global.indices_path)
+
+    state_store.publish_index_counts()
+
+    publicados = state_store.read_index_counts(repositorio_global.indices_path)
+    assert publicados["conteos"]["stock_bajo"] == 3
+    assert publicados["conteos"]["total"] == 5
+    mtime = os.stat(repositorio_global.indices_path).st_mtime_ns
+    state_store.publish_index_counts()  # sin cambios pendientes no se reescribe
+    assert os.stat(repositorio_global.indices_path).st_mtime_ns == mtime
+
+
+def test_ida_y_vuelta(nombre_backend, tmp_path):
+    catalogo = dict(_catalogo(3), MON1={"sku": "MON1", "stock": 4, "categoria_principal": "Monitores",
+                                        "imagenes_locales": ["a.jpg"], "precio": 1.5})
+    _crear_backend(nombre_backend, tmp_path).save(catalogo)
+
+    backend = _crear_backend(nombre_backend, tmp_path)
+    assert backend.load() == catalogo
+
+    backend.apply({"SKU1": {"stock": 9, "categoria_principal": CAMPO_ELIMINADO}, "NUEVO": {"sku": "NUEVO", "stock": 1}})
+    esperado = dict(catalogo, SKU1={"sku": "SKU1", "stock": 9}, NUEVO={"sku": "NUEVO", "stock": 1})
+    assert _crear_backend(nombre_backend, tmp_path).load() == esperado
+
+
+def test_snapshot_compacto_en_disco(tmp_path):
+    backend = _crear_backend("compacto", tmp_path)
+    backend.save(_catalogo(3))
+
+    assert os.path.exists(backend.compacto_path)
+    assert not os.path.exists(backend.path)
+    with open(backend.compacto_path, 'rb') as f:
+        assert f.read().startswith(state_store.MAGIA_COMPACTO)
+
+
+def test_eliminar_sku_persiste(nombre_backend, tmp_path):
+    _crear_backend(nombre_backend, tmp_path).save(_catalogo(10))
+    repo = StateRepository(_crear_backend(nombre_backend, tmp_path), str(tmp_path / "indices.json"))
+    state = repo.load()
+    del state["SKU3"]
+    repo.save(state)
+
+    assert "SKU3" not in _crear_backend(nombre_backend, tmp_path).load()
+
+    _crear_backend(nombre_backend, tmp_path).apply({"SKU4": None})
+    restantes = _crear_backend(nombre_backend, tmp_path).load()
+    assert sorted(restantes) == sorted(f"SKU{i}" for i in range(10) if i not in (3, 4))
+
+
+def test_dos_escritores_fusionan_skus_distintos(nombre_backend, tmp_path):
+    _crear_backend(nombre_backend, tmp_path).save(_catalogo(10))
+    uno = StateRepository(_crear_backend(nombre_backend, tmp_path), str(tmp_path / "indices_1.json"))
+    otro = StateRepository(_crear_backend(nombre_backend, tmp_path), str(tmp_path / "indices_2.json"))
+    state_uno = uno.load()
+    state_otro = otro.load()
+
+    state_uno["SKU1"].stock = 100
+    uno.save(state_uno)
+    state_otro["SKU2"].nombre = "Del otro proceso"
+    otro.save(state_otro)
+
+    persistido = _crear_backend(nombre_backend, tmp_path).load()
+    assert persistido["SKU1"]["stock"] == 100
+    assert persistido["SKU2"]["nombre"] == "Del otro proceso"
+    assert persistido["SKU2"]["stock"] == 2
+    # El segundo escritor quedó con la fusión en memoria
+    assert state_otro["SKU1"].stock == 100
+
+
+def test_journal_con_ultima_linea_a_medias(json_backend):
+    json_backend.save(_catalogo(3))
+    json_backend.apply({"SKU0": {"stock": 50}})
+    with open(json_backend.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"sku": "SKU1", "campos": {"sto')  # el proceso murió a mitad de la escritura
+
+    assert json_backend.load() == dict(_catalogo(3), SKU0={"sku": "SKU0", "stock": 50, "categoria_principal": "Notebooks"})
+
+    # La siguiente escritura empieza en una línea nueva y la parcial se sigue descartando
+    json_backend.apply({"SKU2": {"stock": 70}})
+    estado = json_backend.load()
+    assert (estado["SKU0"]["stock"], estado["SKU1"]["stock"], estado["SKU2"]["stock"]) == (50, 1, 70)
+
+    json_backend.compact()
+    assert not json_backend.tiene_journal()
+    assert json_backend.load() == estado
+
+
+def test_sku_cambia_de_particion(tmp_path):
+    backend = _crear_backend("particionado", tmp_path)
+    backend.save(dict(_catalogo(3), MON1={"sku": "MON1", "stock": 1, "categoria_principal": "Monitores"}))
+
+    backend.apply({"SKU1": {"categoria_principal": "Monitores"}})
+
+    reabierto = _crear_backend("particionado", tmp_path)
+    assert sorted(reabierto.load_partition("Notebooks")) == ["SKU0", "SKU2"]
+    assert sorted(reabierto.load_partition("Monitores")) == ["MON1", "SKU1"]
+    assert "SKU1" not in reabierto._leer_particion("notebooks")
+    with open(reabierto.indice_path, 'r', encoding='utf-8') as f:
+        assert json.load(f)["SKU1"] == "monitores"
+    assert reabierto.get("SKU1")["categoria_principal"] == "Monitores"
+
+
+def test_sku_cambia_de_particion_desde_la_categoria(tmp_path):
+    backend = _crear_backend("particionado", tmp_path)
+    backend.save(_catalogo(5))
+    repo = StateRepository(backend, str(tmp_path / "indices.json"))
+    state = repo.load_category("Notebooks")
+
+    state["SKU4"].categoria_principal = "Gamer"
+    repo.save(state)
+
+    reabierto = _crear_backend("particionado", tmp_path)
+    assert sorted(reabierto.load_partition("Gamer")) == ["SKU4"]
+    assert "SKU4" not in reabierto.load_partition("Notebooks")
+    assert len(reabierto.load()) == 5
+
+
+def test_save_state_informa_si_fallo(repositorio_global, monkeypatch):
+    repositorio_global.backend.save(_catalogo(3))
+    state = state_store.load_state()
+    state["SKU1"].stock = 40
+    assert state_store.save_state(state) is True
+
+    def sin_espacio(*args):
+        raise OSError("No space left on device")
+    monkeypatch.setattr(repositorio_global.backend, "apply", sin_espacio)
+    monkeypatch.setattr(repositorio_global.backend, "save", sin_espacio)
+    state["SKU2"].stock = 50
+
+    assert state_store.save_state(state) is False
+    assert repositorio_global.backend.load()["SKU2"]["stock"] == 2
+
+
+def test_el_repositorio_entrega_product_record(nombre_backend, tmp_path):
+    # Las fases (generate_stats, image_uploader, ...) leen los campos como atributos
+    _crear_backend(nombre_backend, tmp_path).save(dict(_catalogo(2), MON1={"sku": "MON1", "categoria_principal": "Monitores"}))
+    repo = StateRepository(_crear_backend(nombre_backend, tmp_path), str(tmp_path / "indices.json"))
+
+    for state in (repo.load(), repo.load_category("Notebooks")):
+        assert state and all(isinstance(data, ProductRecord) for data in state.values())
+    state = repo.load()
+    assert (state["SKU1"].stock, state["MON1"].stock, state["MON1"].subido_a_woo) == (1, 0, False)
+
+    state["NUEVO"] = {"sku": "NUEVO", "stock": 3}
+    assert isinstance(state["NUEVO"], ProductRecord) and state["NUEVO"].stock == 3
+
+
+def test_update_fields_refresca_el_estado_en_memoria(repositorio_global):
+    repositorio_global.backend.save(_catalogo(3))
+    state = state_store.load_state()
+
+    state_store.update_fields("SKU1", {"tiene_imagen": False, "imagenes_locales": []})
+
+    assert state["SKU1"].imagenes_locales == [] and state["SKU1"].tiene_imagen is False
+    assert state.cambios() == {}  # ya está en el journal: un save_state posterior no lo repite
+    assert _lineas(repositorio_global.backend.journal_path) == [
+        {"sku": "SKU1", "campos": {"tiene_imagen": False, "imagenes_locales": []}}]
+
+
+def test_compactacion_propia_no_cuenta_como_otro_escritor(repositorio, json_backend, monkeypatch, capsys):
+    json_backend.save(_catalogo(50))
+    monkeypatch.setattr(state_store, "JOURNAL_MAX_BYTES", 1)  # cada cambio dispara una compactación
+    state = repositorio.load()
+    lecturas = []
+    cargar = json_backend.load
+    monkeypatch.setattr(json_backend, "load", lambda: lecturas.append(1) or cargar())
+
+    for i in range(5):
+        repositorio.update_many({f"SKU{i}": {"stock": 100 + i}})
+        json_backend._hilo_compactacion.join()  # compactación en segundo plano del mismo proceso
+    assert "compactado" in capsys.readouterr().out
+    assert repositorio.load() is state
+
+    state["SKU10"].nombre = "Cambio posterior"
+    repositorio.save(state)
+
+    assert lecturas == []  # ni recarga ni fusión con "otro proceso"
+    assert "🔀" not in capsys.readouterr().out
+    persistido = JsonStateBackend(json_backend.path, json_backend.journal_path).load()
+    assert persistido["SKU10"]["nombre"] == "Cambio posterior"
+    assert [persistido[f"SKU{i}"]["stock"] for i in range(5)] == [100, 101, 102, 103, 104]
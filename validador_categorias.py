@@ -0,0 +1,50 @@
+# validador_categorias.py
+# Validación de categoría por palabras clave (CATEGORY_VALIDATION de config/categories.json),
+# compartida por la ingesta del CSV (ingesta_csv) y cleanup_state.py.
+# Un producto pertenece a la categoría si su texto de categoría/subcategoría contiene alguna de
+# las palabras clave (sin distinguir mayúsculas). Las palabras de cada categoría se compilan una
+# sola vez en una única expresión regular de alternativas.
+
+import os
+import re
+import json
+from functools import lru_cache
+
+CONFIG_PATH = os.path.join("config", "categories.json")
+
+
+def cargar_validacion(path=CONFIG_PATH):
+    """{categoria: [palabras clave]} desde config/categories.json ({} si no se puede leer)."""
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("CATEGORY_VALIDATION", {})
+        except Exception as e:
+            print(f"⚠ Error al cargar {path}: {e}")
+    return {}
+
+
+@lru_cache(maxsize=None)
+def _patron(palabras):
+    # Palabras en minúsculas y escapadas: se compara contra el texto ya pasado a minúsculas,
+    # con la misma semántica que `kw.lower() in texto.lower()`
+    return re.compile("|".join(re.escape(kw.lower()) for kw in palabras))
+
+
+def patron(valid_keywords):
+    """Expresión compilada (y cacheada) para una lista de palabras clave."""
+    return _patron(tuple(valid_keywords))
+
+
+def es_valida(texto, valid_keywords):
+    """True si el texto contiene alguna palabra clave (o si la categoría no tiene reglas)."""
+    if not valid_keywords:
+        return True
+    return patron(valid_keywords).search(texto.lower()) is not None
+
+
+def mascara_valida(textos, valid_keywords):
+    """Versión vectorizada de es_valida sobre una Series de textos (sin nulos)."""
+    if not valid_keywords:
+        return textos.map(lambda _: True).astype(bool)
+    return textos.str.lower().str.contains(patron(valid_keywords).pattern, regex=True)